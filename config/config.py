@@ -1,19 +1,94 @@
-from dotenv import load_dotenv
 import os
 
+from config.env import load_env
+
+load_env()
+
 
 class Config:
-    load_dotenv()
     ACCOUNT_NUMBER = int(os.getenv("ACCOUNT_NUMBER"))
     PASSWORD = os.getenv("PASSWORD")
     SERVER = os.getenv("SERVER")
     SYMBOL = "EURUSD_i"
+    # Symbols traded concurrently by the scheduler
+    SYMBOLS = ["EURUSD_i"]
     LOT_SIZE = 0.01
     TIMEFRAME = "M1"
     TP_PIPS = 10
     SL_PIPS = 5
     CHECK_INTERVAL = 45
     SLEEP_AFTER_TRADE = 45
+    # Seconds to wait after an order is rejected before checking for a signal again
+    RETRY_AFTER_REJECT = 5
+    # Sends per signal when the broker requotes or rejects the filling type
+    ORDER_MAX_ATTEMPTS = 3
+    # Maximum price deviation accepted on market orders (in points)
+    DEVIATION_POINTS = 50
+    # Update indicators bar by bar instead of recomputing the whole window
+    STREAMING_INDICATORS = False
+    # Indicator series cached per bar and shared by strategies on the same symbol (0 disables)
+    INDICATOR_CACHE_SIZE = 256
+    # "pandas" or "numpy" (array kernels in core/kernels.py, same results to ~1e-12)
+    INDICATOR_ENGINE = "pandas"
+    # Hand strategies bars as a core.bars.BarSeries (arrays reused every cycle) instead of a
+    # new DataFrame; set False for strategies that need the full pandas API
+    BAR_SERIES = True
+    # Timeframes resampled from TIMEFRAME bars for strategies to confirm on, e.g. ["H1"]
+    HIGHER_TIMEFRAMES = []
+    # Bars kept per symbol for incremental rate fetches (None re-downloads every cycle)
+    RATES_BUFFER_SIZE = 500
+    # Local bar history used for warm-up and backtests (None disables recording)
+    HISTORY_DIR = "history"
+    WARMUP_BARS = 5000
+    # Streaming indicator state and buffered bars are saved here on shutdown and every
+    # SNAPSHOT_INTERVAL seconds, and restored at startup (None disables)
+    SNAPSHOT_PATH = "state/snapshot.pkl"
+    SNAPSHOT_INTERVAL = 300
+    # Snapshots older than this (seconds) are ignored and the bot warms up from scratch
+    SNAPSHOT_MAX_AGE = 86400
+    # Threads available for blocking MT5/Telegram calls
+    EXECUTOR_WORKERS = 4
+    # Size lots from SL_PIPS and equity and check every order against the portfolio limits
+    # below (False trades LOT_SIZE and waits while the symbol has an open position)
+    RISK_ENABLED = False
+    # Fraction of equity lost if the stop loss is hit
+    RISK_PER_TRADE = 0.01
+    # Net notional per currency, as a multiple of equity
+    MAX_CURRENCY_EXPOSURE = 30.0
+    # Margin in use, as a fraction of equity
+    MAX_MARGIN_USAGE = 0.3
+    # Correlation-weighted net lots over a symbol and the symbols correlated with it
+    MAX_CORRELATED_LOTS = 1.0
+    # Pairwise correlations, e.g. {("EURUSD_i", "GBPUSD_i"): 0.85}
+    CORRELATIONS = {}
+    MAX_POSITIONS_PER_SYMBOL = 1
+    # Market screener (python -m utils.screen): MT5 symbol group filter (None for every
+    # symbol), closed bars per symbol, fetch threads and the number of candidates reported
+    SCREENER_GROUP = None
+    SCREENER_BARS = 100
+    SCREENER_WORKERS = 16
+    SCREENER_TOP = 10
+    # Leave out symbols whose spread exceeds this fraction of the mean bar range
+    SCREENER_MAX_SPREAD_RATIO = 0.5
+    # Seconds before cached symbol specs (point, stops level, volume limits) are reloaded
+    SYMBOL_CACHE_TTL = 3600
+    # Log records below LOG_LEVEL are dropped before formatting; the rest are written by a
+    # background thread to a rotating file (None disables it) and the console
+    LOG_LEVEL = "INFO"
+    LOG_FILE = "logs/trading_bot.log"
+    LOG_MAX_BYTES = 10_000_000
+    LOG_BACKUPS = 5
+    LOG_CONSOLE = True
+    # One JSON object per line in the log file instead of key=value text
+    LOG_JSON = False
+    # Stage latency histograms and MT5 call counters, dumped every METRICS_DUMP_INTERVAL seconds
+    METRICS_ENABLED = True
+    METRICS_DUMP_INTERVAL = 300
+    METRICS_DUMP_PATH = "metrics.json"
+    # Port for a local JSON metrics endpoint (None disables it)
+    METRICS_PORT = None
+    # Seconds between stack samples of the trading loop (None disables the profiler)
+    PROFILER_INTERVAL = None
 
     # Convert MT5 timeframe string to MT5 constant
     TIMEFRAMES = {
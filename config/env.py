@@ -0,0 +1,11 @@
+from dotenv import load_dotenv
+
+_loaded = False
+
+
+def load_env():
+    """Read .env into the environment once per process; later calls do nothing."""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
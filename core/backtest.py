@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from core.order import OrderManager
+
+
+class BacktestResult:
+    def __init__(self, trades, equity, initial_balance):
+        self.trades = trades
+        self.equity = equity
+        self.initial_balance = initial_balance
+
+    def summary(self):
+        """Return headline statistics for the run."""
+        trades = self.trades
+        if trades.empty:
+            return {"trades": 0, "net_profit": 0.0, "win_rate": 0.0,
+                    "profit_factor": 0.0, "max_drawdown": 0.0}
+
+        profits = trades['profit'].to_numpy()
+        gross_profit = profits[profits > 0].sum()
+        gross_loss = -profits[profits < 0].sum()
+        balance = np.concatenate(([self.initial_balance], self.equity.to_numpy()))
+        drawdown = np.maximum.accumulate(balance) - balance
+
+        return {
+            "trades": len(trades),
+            "net_profit": float(profits.sum()),
+            "win_rate": float((profits > 0).mean()),
+            "profit_factor": float(gross_profit / gross_loss) if gross_loss else float('inf'),
+            "max_drawdown": float(drawdown.max()),
+        }
+
+
+class Backtester:
+    """Replay a strategy over historical bars.
+
+    Signals for every bar come from ``strategy.generate_signal_arrays`` in one
+    vectorized pass. Like ``TradingBot``, only one position is held at a time:
+    a signal on bar ``i`` fills at the open of bar ``i + 1`` (ask for buys,
+    bid for sells) with TP/SL from ``OrderManager.calculate_stops``. Bars are
+    bid prices as returned by MT5; the ask is bid plus the bar's ``spread``
+    column (in points) or ``spread_points`` when given. ``run(df, start)``
+    only warms the indicators on the bars before ``start``: no trade opens on
+    their signals.
+    """
+
+    def __init__(self, strategy, lot_size, tp_pips, sl_pips, point=0.00001, stops_level=0,
+                 spread_points=None, contract_size=100000, initial_balance=10000.0):
+        self.strategy = strategy
+        self.lot_size = lot_size
+        self.tp_pips = tp_pips
+        self.sl_pips = sl_pips
+        self.point = point
+        self.stops_level = stops_level
+        self.spread_points = spread_points
+        self.contract_size = contract_size
+        self.initial_balance = initial_balance
+
+    def _spread(self, df):
+        if self.spread_points is not None:
+            return np.full(len(df), self.spread_points * self.point)
+        if 'spread' in df:
+            return df['spread'].to_numpy(dtype=float) * self.point
+        return np.zeros(len(df))
+
+    @staticmethod
+    def _find_exit(action, tp_price, sl_price, high, low, spread, start, chunk=256):
+        """Return (bar, hit_sl) for the first bar touching TP or SL, or (-1, False)."""
+        # Scan forward in growing chunks so short trades stay cheap on long histories
+        n = len(high)
+        while start < n:
+            end = min(start + chunk, n)
+            # Longs close on the bid, shorts on the ask
+            if action == 'buy':
+                sl_hit = low[start:end] <= sl_price
+                tp_hit = high[start:end] >= tp_price
+            else:
+                sl_hit = high[start:end] + spread[start:end] >= sl_price
+                tp_hit = low[start:end] + spread[start:end] <= tp_price
+            found = np.flatnonzero(sl_hit | tp_hit)
+            if found.size:
+                # SL wins when both levels fall inside the same bar
+                return start + int(found[0]), bool(sl_hit[found[0]])
+            start = end
+            chunk *= 4
+        return -1, False
+
+    def run(self, df, start=0):
+        buy_signal, sell_signal = self.strategy.generate_signal_arrays(df)
+        signal_index = np.flatnonzero(np.asarray(buy_signal) | np.asarray(sell_signal))
+
+        times = df['time'].to_numpy()
+        open_ = df['open'].to_numpy(dtype=float)
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        spread = self._spread(df)
+        n = len(df)
+
+        trades = []
+        next_free = start
+        cursor = int(np.searchsorted(signal_index, next_free))
+        while cursor < len(signal_index):
+            signal_bar = signal_index[cursor]
+            entry_bar = signal_bar + 1
+            if entry_bar >= n:
+                break
+
+            action = 'buy' if buy_signal[signal_bar] else 'sell'
+            entry_price = open_[entry_bar] + spread[entry_bar] if action == 'buy' else open_[entry_bar]
+            stops = OrderManager.calculate_stops(
+                action, entry_price, self.point, self.tp_pips, self.sl_pips, self.stops_level)
+            if stops is None:
+                cursor += 1
+                continue
+            tp_price, sl_price = stops
+
+            exit_bar, hit_sl = self._find_exit(
+                action, tp_price, sl_price, high, low, spread, entry_bar)
+            if exit_bar < 0:
+                exit_bar = n - 1
+                exit_price = close[-1] if action == 'buy' else close[-1] + spread[-1]
+                reason = 'end'
+            elif hit_sl:
+                exit_price, reason = sl_price, 'sl'
+            else:
+                exit_price, reason = tp_price, 'tp'
+
+            direction = 1 if action == 'buy' else -1
+            price_change = direction * (exit_price - entry_price)
+            trades.append((times[signal_bar], times[entry_bar], times[exit_bar], action,
+                           entry_price, exit_price, tp_price, sl_price, reason,
+                           price_change / (10 * self.point),
+                           price_change * self.lot_size * self.contract_size))
+
+            next_free = exit_bar + 1
+            cursor = int(np.searchsorted(signal_index, next_free))
+
+        trades = pd.DataFrame(trades, columns=[
+            'signal_time', 'entry_time', 'exit_time', 'action', 'entry_price', 'exit_price',
+            'tp', 'sl', 'reason', 'pips', 'profit'])
+        equity = pd.Series(self.initial_balance + trades['profit'].cumsum().to_numpy(),
+                           index=trades['exit_time'], name='equity')
+        return BacktestResult(trades, equity, self.initial_balance)
@@ -0,0 +1,130 @@
+import numpy as np
+
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+def values_of(frame, name, dtype=None):
+    """Column ``name`` of a DataFrame or BarSeries as a NumPy array, copied only if it must be."""
+    values = frame[name]
+    if isinstance(values, np.ndarray):
+        return values if dtype is None else values.astype(dtype, copy=False)
+    # Series.to_numpy is much cheaper than np.asarray on a Series
+    return values.to_numpy(dtype=dtype)
+
+
+class BarSeries:
+    """MT5 rates plus indicator columns as plain arrays: a DataFrame stand-in for the live loop.
+
+    Bar fields are zero-copy views into the structured ``rates`` array
+    (``time`` is viewed as ``datetime64[s]``, matching the DataFrame's
+    datetimes); they are read-only through this object. Indicator columns
+    live in buffers owned by the instance: assigning a column copies into
+    its buffer and ``output`` hands the buffer to a kernel to write into.
+    ``reset`` points the instance at the next bar window and keeps the
+    buffers, so a steady loop allocates no new column storage; arrays
+    obtained from an instance are only valid until its next ``reset``.
+
+    Supports what the strategies and indicator providers use from a
+    DataFrame: ``len``, ``in``, ``df[name]``, ``df[name] = values``,
+    ``df[[names]]``, ``tail``, ``copy``, ``columns`` and ``attrs``.
+    ``to_pandas`` builds a real DataFrame for anything else.
+    """
+
+    __slots__ = ('rates', 'attrs', '_columns', '_buffers')
+
+    def __init__(self, rates, attrs=None):
+        self.rates = rates
+        self.attrs = {} if attrs is None else attrs
+        # Indicator columns currently set, as views of _buffers sized to the window
+        self._columns = {}
+        self._buffers = {}
+
+    def reset(self, rates, attrs=None):
+        """Switch to a new bar window, dropping its columns but keeping their buffers."""
+        self.rates = rates
+        self.attrs = {} if attrs is None else attrs
+        self._columns.clear()
+        return self
+
+    def __len__(self):
+        return len(self.rates)
+
+    def __contains__(self, name):
+        return name in self._columns or name in self.rates.dtype.names
+
+    @property
+    def columns(self):
+        return list(self.rates.dtype.names) + list(self._columns)
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return self.select(key)
+        values = self._columns.get(key)
+        if values is not None:
+            return values
+        if key not in self.rates.dtype.names:
+            raise KeyError(key)
+        if key == 'time':
+            return self.rates['time'].view('datetime64[s]')
+        return self.rates[key]
+
+    def __setitem__(self, name, values):
+        if name in self.rates.dtype.names:
+            raise KeyError(f"{name!r} is a bar field and cannot be assigned")
+        if values is self._columns.get(name):
+            # Already written in place through ``output``
+            return
+        if hasattr(values, 'to_numpy'):
+            values = values.to_numpy()
+        values = np.asarray(values)
+        self._buffer(name, values.dtype)[...] = values
+
+    def _buffer(self, name, dtype):
+        n = len(self.rates)
+        buffer = self._buffers.get(name)
+        if buffer is None or len(buffer) < n or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(n, dtype=dtype)
+        column = self._columns[name] = buffer[:n]
+        return column
+
+    def output(self, name):
+        """Writable float64 column ``name`` (contents undefined) for a kernel's ``out``."""
+        return self._buffer(name, np.float64)
+
+    def select(self, names):
+        """A BarSeries with only ``names``; bar fields stay views, indicator columns are copied."""
+        fields = [name for name in names if name in self.rates.dtype.names]
+        missing = [name for name in names if name not in self]
+        if missing:
+            raise KeyError(missing)
+        rates = self.rates[fields] if fields else np.zeros(len(self), dtype=[])
+        subset = BarSeries(rates, dict(self.attrs))
+        for name in names:
+            if name in self._columns:
+                subset[name] = self._columns[name]
+        return subset
+
+    def tail(self, n=5):
+        subset = BarSeries(self.rates[-n:] if n else self.rates[:0], dict(self.attrs))
+        for name, values in self._columns.items():
+            subset[name] = values[len(values) - len(subset.rates):]
+        return subset
+
+    def copy(self, deep=True):
+        """Copy with its own columns; ``deep=False`` keeps viewing the same rates."""
+        copy = BarSeries(self.rates.copy() if deep else self.rates, dict(self.attrs))
+        for name, values in self._columns.items():
+            copy[name] = values
+        return copy
+
+    def to_pandas(self):
+        """A DataFrame with the same columns, like ``MarketData.to_frame`` builds."""
+        columns = {name: self[name] for name in self.columns}
+        df = pd.DataFrame(columns, index=pd.RangeIndex(len(self)), copy=True)
+        df.attrs.update(self.attrs)
+        return df
+
+    def __repr__(self):
+        return repr(self.to_pandas())
@@ -0,0 +1,506 @@
+import fnmatch
+import functools
+import importlib
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+
+# Record types mirroring the fields of the MetaTrader5 package's named tuples
+AccountInfo = namedtuple(
+    'AccountInfo', 'login balance equity margin margin_free leverage currency trade_allowed')
+TerminalInfo = namedtuple('TerminalInfo', 'name build connected')
+SymbolInfo = namedtuple(
+    'SymbolInfo', 'name point digits spread trade_stops_level volume_min volume_max volume_step '
+                  'filling_mode trade_contract_size trade_tick_size currency_base currency_profit '
+                  'currency_margin')
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags')
+TradePosition = namedtuple(
+    'TradePosition', 'ticket time time_update type magic identifier volume price_open sl tp '
+                     'price_current swap profit symbol comment')
+TradeDeal = namedtuple(
+    'TradeDeal', 'ticket order time type entry magic position_id volume price commission swap '
+                 'profit symbol comment')
+OrderSendResult = namedtuple(
+    'OrderSendResult', 'retcode deal order volume price bid ask comment request_id request')
+
+
+class BrokerBackend:
+    """Interface the core classes use to talk to a broker.
+
+    It mirrors the subset of the ``MetaTrader5`` module used by the bot,
+    including the constants, so the real module can be dropped in as is.
+    """
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_H1 = 16385
+
+    COPY_TICKS_ALL = -1
+
+    TRADE_ACTION_DEAL = 1
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    # Bit flags reported in SymbolInfo.filling_mode
+    SYMBOL_FILLING_FOK = 1
+    SYMBOL_FILLING_IOC = 2
+
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_REJECT = 10006
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_STOPS = 10016
+    TRADE_RETCODE_MARKET_CLOSED = 10018
+    TRADE_RETCODE_NO_MONEY = 10019
+    TRADE_RETCODE_PRICE_CHANGED = 10020
+    TRADE_RETCODE_PRICE_OFF = 10021
+    TRADE_RETCODE_INVALID_FILL = 10030
+
+    def initialize(self, **kwargs):
+        raise NotImplementedError
+
+    def shutdown(self):
+        raise NotImplementedError
+
+    def last_error(self):
+        raise NotImplementedError
+
+    def account_info(self):
+        raise NotImplementedError
+
+    def terminal_info(self):
+        raise NotImplementedError
+
+    def symbols_get(self, group=None):
+        raise NotImplementedError
+
+    def symbol_select(self, symbol, enable=True):
+        raise NotImplementedError
+
+    def symbol_info(self, symbol):
+        raise NotImplementedError
+
+    def symbol_info_tick(self, symbol):
+        raise NotImplementedError
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        raise NotImplementedError
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        raise NotImplementedError
+
+    def positions_get(self, symbol=None):
+        raise NotImplementedError
+
+    def orders_get(self, symbol=None):
+        raise NotImplementedError
+
+    def history_deals_get(self, date_from, date_to):
+        raise NotImplementedError
+
+    def order_send(self, request):
+        raise NotImplementedError
+
+
+class MT5Backend(BrokerBackend):
+    """The real terminal: every attribute is looked up on the MetaTrader5 module."""
+
+    def __init__(self):
+        # Imported here so the rest of the bot can run where the package is unavailable
+        self._module = importlib.import_module('MetaTrader5')
+
+    def __getattribute__(self, name):
+        if name.startswith('_'):
+            return object.__getattribute__(self, name)
+        return getattr(object.__getattribute__(self, '_module'), name)
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the process-wide backend, loading the MetaTrader5 one on first use."""
+    global _backend
+    if _backend is None:
+        _backend = MT5Backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Route every component created afterwards through ``backend``."""
+    global _backend
+    _backend = backend
+
+
+class ReplayFinished(Exception):
+    """Raised by SimulatedBroker once every tick has been replayed."""
+
+
+class SimulatedSymbol:
+    def __init__(self, name, point=0.00001, digits=5, trade_stops_level=0, volume_min=0.01,
+                 volume_max=100.0, volume_step=0.01, filling_mode=1, trade_contract_size=100000,
+                 currency_base='EUR', currency_profit='USD'):
+        self.info = SymbolInfo(
+            name, point, digits, 0, trade_stops_level, volume_min, volume_max, volume_step,
+            filling_mode, trade_contract_size, point, currency_base, currency_profit, currency_base)
+        self.time = np.empty(0, dtype=np.int64)
+        self.bid = np.empty(0)
+        self.ask = np.empty(0)
+        self._bars = {}
+
+
+def _locked(method):
+    # SimulatedBroker methods run on the scheduler's worker threads
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return call
+
+
+class SimulatedBroker(BrokerBackend):
+    """Deterministic in-process broker that replays ticks.
+
+    All symbols share one cursor over the merged tick timeline; ``advance``
+    moves it forward, closing positions whose SL or TP is touched. With
+    ``advance_on`` set to a method name (e.g. ``'positions_get'``), each call
+    to that method advances ``ticks_per_call`` ticks, which lets an unmodified
+    ``TradingBot`` loop drive the replay at full speed. Retcodes queued with
+    ``queue_retcodes`` are returned by the next ``order_send`` calls before
+    normal validation, to exercise rejection paths. Calls are serialized on
+    one lock, so it can back a multi-threaded scheduler.
+    """
+
+    def __init__(self, balance=10000.0, leverage=100, advance_on=None, ticks_per_call=1):
+        self.balance = balance
+        self.leverage = leverage
+        self.advance_on = advance_on
+        self.ticks_per_call = ticks_per_call
+        self.symbols = {}
+        self.connected = False
+        self.positions = {}
+        self.deals = []
+        self.calls = {}
+        self._timeline = np.empty(0, dtype=np.int64)
+        self._cursor = -1
+        self._next_ticket = 1
+        self._queued_retcodes = []
+        self._error = (1, 'Success')
+        # Reentrant: symbols_get calls symbol_info, and advance_on advances inside a call
+        self._lock = threading.RLock()
+
+    # --- replay setup -----------------------------------------------------
+
+    @_locked
+    def add_symbol(self, symbol, time_, bid, ask=None, spread_points=None, **spec):
+        """Register a symbol and its tick stream (epoch seconds, bid[, ask])."""
+        entry = SimulatedSymbol(symbol, **spec)
+        entry.time = np.asarray(time_, dtype=np.int64)
+        entry.bid = np.asarray(bid, dtype=float)
+        if ask is None:
+            ask = entry.bid + (spread_points or 0) * entry.info.point
+        entry.ask = np.asarray(ask, dtype=float)
+        self.symbols[symbol] = entry
+        self._timeline = np.unique(np.concatenate([s.time for s in self.symbols.values()]))
+        return entry
+
+    @staticmethod
+    def ticks_from_rates(rates):
+        """Expand OHLC bars into four ticks per bar: open, low, high, close (high before low on down bars)."""
+        rates = np.asarray(rates)
+        bullish = rates['close'] >= rates['open']
+        first = np.where(bullish, rates['low'], rates['high'])
+        second = np.where(bullish, rates['high'], rates['low'])
+        prices = np.column_stack([rates['open'], first, second, rates['close']]).ravel()
+        # Keep the ticks inside the bar so they aggregate back into the same bar
+        times = (rates['time'][:, None] + np.array([0, 1, 2, 3])).ravel()
+        return times, prices
+
+    @_locked
+    def advance(self, count=1):
+        """Move the replay cursor forward ``count`` ticks and settle SL/TP hits."""
+        if self._cursor + count >= len(self._timeline):
+            raise ReplayFinished()
+        self._cursor += count
+        self._settle_positions()
+
+    @property
+    def now(self):
+        return int(self._timeline[self._cursor]) if self._cursor >= 0 else 0
+
+    @_locked
+    def queue_retcodes(self, *retcodes):
+        self._queued_retcodes.extend(retcodes)
+
+    def _record_call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.advance_on == name:
+            self.advance(self.ticks_per_call)
+
+    def _tick_index(self, entry):
+        # Last tick of this symbol at or before the replay clock
+        return int(np.searchsorted(entry.time, self.now, side='right')) - 1
+
+    def _current_prices(self, entry):
+        index = self._tick_index(entry)
+        if index < 0:
+            return None
+        return entry.bid[index], entry.ask[index]
+
+    # --- MetaTrader5-compatible API -----------------------------------------
+
+    @_locked
+    def initialize(self, **kwargs):
+        self._record_call('initialize')
+        self.connected = True
+        if self._cursor < 0 and len(self._timeline):
+            self.advance()
+        return True
+
+    @_locked
+    def shutdown(self):
+        self.connected = False
+
+    def last_error(self):
+        return self._error
+
+    def _equity_and_margin(self):
+        equity = self.balance + sum(p.profit for p in self.positions.values())
+        margin = sum(p.volume * self.symbols[p.symbol].info.trade_contract_size * p.price_open
+                     for p in self.positions.values()) / self.leverage
+        return equity, margin
+
+    @_locked
+    def account_info(self):
+        self._record_call('account_info')
+        equity, margin = self._equity_and_margin()
+        return AccountInfo(1, self.balance, equity, margin, equity - margin, self.leverage,
+                           'USD', True)
+
+    def terminal_info(self):
+        return TerminalInfo('SimulatedBroker', 0, True) if self.connected else None
+
+    @_locked
+    def symbol_select(self, symbol, enable=True):
+        self._record_call('symbol_select')
+        return symbol in self.symbols
+
+    @_locked
+    def symbols_get(self, group=None):
+        """Infos of every symbol, filtered like MT5's ``group`` ("*USD*,!*JPY*")."""
+        self._record_call('symbols_get')
+        names = list(self.symbols)
+        if group:
+            patterns = [pattern.strip() for pattern in group.split(',') if pattern.strip()]
+            include = [p for p in patterns if not p.startswith('!')] or ['*']
+            exclude = [p[1:] for p in patterns if p.startswith('!')]
+            names = [name for name in names
+                     if any(fnmatch.fnmatchcase(name, p) for p in include)
+                     and not any(fnmatch.fnmatchcase(name, p) for p in exclude)]
+        return tuple(self.symbol_info(name) for name in names)
+
+    @_locked
+    def symbol_info(self, symbol):
+        self._record_call('symbol_info')
+        entry = self.symbols.get(symbol)
+        if entry is None:
+            self._error = (-1, f'Unknown symbol {symbol}')
+            return None
+        prices = self._current_prices(entry)
+        spread = int(round((prices[1] - prices[0]) / entry.info.point)) if prices else 0
+        return entry.info._replace(spread=spread)
+
+    @_locked
+    def symbol_info_tick(self, symbol):
+        self._record_call('symbol_info_tick')
+        entry = self.symbols.get(symbol)
+        prices = self._current_prices(entry) if entry else None
+        if prices is None:
+            self._error = (-1, f'No ticks for {symbol}')
+            return None
+        return Tick(self.now, prices[0], prices[1], 0.0, 0, self.now * 1000, 0)
+
+    def _bars(self, entry, timeframe):
+        """Completed-bar OHLC for every bucket of the tick stream, cached per timeframe."""
+        bars = entry._bars.get(timeframe)
+        if bars is None:
+            from core.data import timeframe_seconds
+            period = timeframe_seconds(timeframe)
+            buckets = entry.time // period * period
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            bars = entry._bars[timeframe] = (buckets[starts], starts)
+        return bars
+
+    @_locked
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self._record_call('copy_rates_from_pos')
+        entry = self.symbols.get(symbol)
+        if entry is None:
+            self._error = (-1, f'Unknown symbol {symbol}')
+            return None
+        bucket_times, starts = self._bars(entry, timeframe)
+        last_tick = self._tick_index(entry)
+        # Bars visible now, the last one still forming up to the replay clock
+        visible = int(np.searchsorted(starts, last_tick, side='right'))
+        end = visible - start_pos
+        begin = max(0, end - count)
+        if end <= begin:
+            return None
+
+        bounds = np.r_[starts[begin:end], last_tick + 1] if end == visible else starts[begin:end + 1]
+        prices = entry.bid[bounds[0]:bounds[-1]]
+        offsets = bounds[:-1] - bounds[0]
+        rates = np.zeros(end - begin, dtype=[
+            ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+            ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+        rates['time'] = bucket_times[begin:end]
+        rates['open'] = prices[offsets]
+        rates['high'] = np.maximum.reduceat(prices, offsets)
+        rates['low'] = np.minimum.reduceat(prices, offsets)
+        rates['close'] = prices[np.r_[offsets[1:], len(prices)] - 1]
+        rates['tick_volume'] = np.diff(bounds)
+        spread = (entry.ask[bounds[:-1]] - entry.bid[bounds[:-1]]) / entry.info.point
+        rates['spread'] = np.rint(spread)
+        return rates
+
+    @_locked
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        self._record_call('copy_ticks_from')
+        entry = self.symbols.get(symbol)
+        if entry is None:
+            self._error = (-1, f'Unknown symbol {symbol}')
+            return None
+        if hasattr(date_from, 'timestamp'):
+            date_from = date_from.timestamp()
+        begin = int(np.searchsorted(entry.time, date_from, side='left'))
+        end = min(self._tick_index(entry) + 1, begin + count)
+        ticks = np.zeros(max(end - begin, 0), dtype=[
+            ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+            ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')])
+        ticks['time'] = entry.time[begin:end]
+        ticks['bid'] = entry.bid[begin:end]
+        ticks['ask'] = entry.ask[begin:end]
+        ticks['time_msc'] = entry.time[begin:end] * 1000
+        return ticks
+
+    @_locked
+    def positions_get(self, symbol=None):
+        self._record_call('positions_get')
+        return tuple(p for p in self.positions.values() if symbol is None or p.symbol == symbol)
+
+    @_locked
+    def orders_get(self, symbol=None):
+        # Only market orders are simulated, and they fill at once
+        self._record_call('orders_get')
+        return ()
+
+    @_locked
+    def history_deals_get(self, date_from, date_to):
+        self._record_call('history_deals_get')
+        start = date_from.timestamp() if hasattr(date_from, 'timestamp') else date_from
+        end = date_to.timestamp() if hasattr(date_to, 'timestamp') else date_to
+        return tuple(d for d in self.deals if start <= d.time <= end)
+
+    def _reject(self, retcode, request, comment):
+        self._error = (retcode, comment)
+        return OrderSendResult(retcode, 0, 0, 0.0, 0.0, 0.0, 0.0, comment, 0, request)
+
+    @_locked
+    def order_send(self, request):
+        self._record_call('order_send')
+        entry = self.symbols.get(request.get('symbol'))
+        if entry is None:
+            return self._reject(self.TRADE_RETCODE_INVALID, request, 'Unknown symbol')
+        if self._queued_retcodes:
+            return self._reject(self._queued_retcodes.pop(0), request, 'Scripted rejection')
+
+        info = entry.info
+        prices = self._current_prices(entry)
+        if prices is None:
+            return self._reject(self.TRADE_RETCODE_MARKET_CLOSED, request, 'Market closed')
+        bid, ask = prices
+
+        volume = request.get('volume', 0.0)
+        steps = round((volume - info.volume_min) / info.volume_step, 6)
+        if volume < info.volume_min or volume > info.volume_max or steps != int(steps):
+            return self._reject(self.TRADE_RETCODE_INVALID_VOLUME, request, 'Invalid volume')
+
+        filling = request.get('type_filling', self.ORDER_FILLING_FOK)
+        allowed = {self.ORDER_FILLING_FOK: self.SYMBOL_FILLING_FOK,
+                   self.ORDER_FILLING_IOC: self.SYMBOL_FILLING_IOC}
+        if filling in allowed and not info.filling_mode & allowed[filling]:
+            return self._reject(self.TRADE_RETCODE_INVALID_FILL, request, 'Unsupported filling mode')
+
+        is_buy = request.get('type') == self.ORDER_TYPE_BUY
+        price = ask if is_buy else bid
+        requested = request.get('price', price)
+        if abs(requested - price) > request.get('deviation', 0) * info.point + 1e-12:
+            self._error = (self.TRADE_RETCODE_REQUOTE, 'Requote')
+            return OrderSendResult(self.TRADE_RETCODE_REQUOTE, 0, 0, 0.0, price, bid, ask,
+                                   'Requote', 0, request)
+
+        min_distance = info.trade_stops_level * info.point
+        for level in (request.get('sl', 0.0), request.get('tp', 0.0)):
+            if level and abs(level - price) < min_distance - 1e-12:
+                return self._reject(self.TRADE_RETCODE_INVALID_STOPS, request, 'Invalid stops')
+
+        margin = volume * info.trade_contract_size * price / self.leverage
+        equity, used_margin = self._equity_and_margin()
+        if margin > equity - used_margin:
+            return self._reject(self.TRADE_RETCODE_NO_MONEY, request, 'No money')
+
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        position = TradePosition(
+            ticket, self.now, self.now, request['type'], request.get('magic', 0), ticket, volume,
+            price, request.get('sl', 0.0), request.get('tp', 0.0), bid if is_buy else ask, 0.0,
+            0.0, info.name, request.get('comment', ''))
+        self.positions[ticket] = position
+        self.deals.append(TradeDeal(
+            ticket, ticket, self.now, self.DEAL_TYPE_BUY if is_buy else self.DEAL_TYPE_SELL,
+            self.DEAL_ENTRY_IN, position.magic, ticket, volume, price, 0.0, 0.0, 0.0, info.name,
+            position.comment))
+        self._error = (1, 'Success')
+        return OrderSendResult(self.TRADE_RETCODE_DONE, ticket, ticket, volume, price, bid, ask,
+                               'Request executed', 0, request)
+
+    def _settle_positions(self):
+        for ticket, position in list(self.positions.items()):
+            entry = self.symbols[position.symbol]
+            prices = self._current_prices(entry)
+            if prices is None:
+                # No tick for this symbol yet, so nothing to settle against
+                continue
+            bid, ask = prices
+            is_buy = position.type == self.ORDER_TYPE_BUY
+            # Longs close on the bid, shorts on the ask
+            price = bid if is_buy else ask
+            direction = 1 if is_buy else -1
+            hit_sl = position.sl and direction * (price - position.sl) <= 0
+            hit_tp = position.tp and direction * (price - position.tp) >= 0
+            profit = direction * (price - position.price_open) * position.volume * \
+                entry.info.trade_contract_size
+            if hit_sl or hit_tp:
+                del self.positions[ticket]
+                self.balance += profit
+                self.deals.append(TradeDeal(
+                    self._next_ticket, self._next_ticket, self.now,
+                    self.DEAL_TYPE_SELL if is_buy else self.DEAL_TYPE_BUY, self.DEAL_ENTRY_OUT,
+                    position.magic, ticket, position.volume, price, 0.0, 0.0, profit,
+                    position.symbol, 'sl' if hit_sl else 'tp'))
+                self._next_ticket += 1
+            else:
+                self.positions[ticket] = position._replace(price_current=price, profit=profit)
+
@@ -1,15 +1,22 @@
-import MetaTrader5 as mt5
+from core.broker import get_backend
+from core.symbols import SymbolCache
+from utils.log import get_logger
+
+log = get_logger("connection")
 
 
 class MT5Connection:
-    def __init__(self, account_number, password, server):
+    def __init__(self, account_number, password, server, backend=None, symbols=None):
         self.account_number = account_number
         self.password = password
         self.server = server
         self.connected = False
+        self.mt5 = backend or get_backend()
+        # Specs of the symbols selected this session, shared with the order managers
+        self.symbols = symbols or SymbolCache(self.mt5)
 
     def _initialize_connection(self):
-        return mt5.initialize(
+        return self.mt5.initialize(
             login=self.account_number,
             password=self.password,
             server=self.server
@@ -17,23 +24,27 @@ class MT5Connection:
 
     def connect(self):
         if not self._initialize_connection():
-            print("Failed to connect to MT5.")
+            log.error("Failed to connect to MT5.", error=self.mt5.last_error())
             return False
         self.connected = True
-        print(f"Connected to account: {mt5.account_info().login}")
+        log.info("Connected to account", login=self.mt5.account_info().login)
         return True
 
     def disconnect(self):
         if self.connected:
-            mt5.shutdown()
+            self.mt5.shutdown()
             self.connected = False
-            print("MT5 connection closed.")
+            self.symbols.invalidate()
+            log.info("MT5 connection closed.")
 
     def is_connected(self):
-        return self.connected and mt5.terminal_info() is not None
+        return self.connected and self.mt5.terminal_info() is not None
 
     def ensure_symbol(self, symbol):
-        if not mt5.symbol_select(symbol, True):
-            print(f"Symbol {symbol} not available.")
+        # Selecting and loading the spec happens once per session
+        if symbol in self.symbols.specs:
+            return True
+        if not self.mt5.symbol_select(symbol, True):
+            log.error("Symbol not available", symbol=symbol)
             return False
-        return True
+        return self.symbols.refresh(symbol) is not None
@@ -1,37 +1,226 @@
-import MetaTrader5 as mt5
-import pandas as pd
+import time
+
+import numpy as np
+
+from core.bars import BarSeries
+from core.broker import get_backend
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+# Loaded on first use; importing pandas is most of the bot's startup time
+pd = lazy_import("pandas")
+
+log = get_logger("data")
+
+
+def timeframe_seconds(timeframe):
+    """Convert an MT5 timeframe constant (minute or hour based) to seconds."""
+    if timeframe & 0x4000:
+        return (timeframe & 0x3FFF) * 3600
+    return timeframe * 60
+
+
+class BarBuffer:
+    """Fixed-capacity store of MT5 rate records that always exposes a contiguous view.
+
+    Records live in an array twice the capacity; when the write position
+    reaches the end, the newest bars are moved back to the front. Views
+    returned by ``view`` are only valid until the next append.
+    """
+
+    def __init__(self, capacity, dtype):
+        self.capacity = capacity
+        self._data = np.empty(capacity * 2, dtype=dtype)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_time(self):
+        return self._data['time'][self._end - 1] if len(self) else None
+
+    def reset(self, rows):
+        self._start = self._end = 0
+        self.append(rows)
+
+    def append(self, rows):
+        count = len(rows)
+        if count >= self.capacity:
+            self._data[:self.capacity] = rows[-self.capacity:]
+            self._start, self._end = 0, self.capacity
+            return
+        if self._end + count > len(self._data):
+            keep = min(len(self), self.capacity - count)
+            self._data[:keep] = self._data[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._data[self._end:self._end + count] = rows
+        self._end += count
+        self._start = max(self._start, self._end - self.capacity)
+
+    def patch_last(self, row):
+        self._data[self._end - 1] = row
+
+    def view(self, num_bars=None, skip_last=0):
+        end = self._end - skip_last
+        start = self._start if num_bars is None else max(self._start, end - num_bars)
+        return self._data[start:end]
 
 
 class MarketData:
-    def __init__(self, symbol, timeframe):
+    def __init__(self, symbol, timeframe, buffer_size=None, backend=None, store=None):
         self.symbol = symbol
         self.timeframe = timeframe
+        self.mt5 = backend or get_backend()
+        # Optional core.history.HistoryStore that receives every closed bar we fetch
+        self.store = store
+        # With a buffer, rates are fetched incrementally instead of re-downloading the window
+        self.buffer_size = buffer_size
+        self.buffer = None
+        self._last_sync = None
+        # Reused by fetch_bars so its indicator column buffers carry over between cycles
+        self._bars = None
 
     def _handle_fetch_error(self, error_message):
-        print(f"{error_message}: {mt5.last_error()}")
+        log.error(error_message, error=self.mt5.last_error())
+
+    def _persist(self, rates, includes_forming):
+        if self.store is not None and len(rates):
+            self.store.append_bars(self.symbol, self.timeframe,
+                                   rates[:-1] if includes_forming else rates)
+
+    def _sync_buffer(self):
+        """Bring the bar buffer up to date, fetching only bars the buffer has not seen."""
+        if self.buffer is not None:
+            # Enough bars to cover the time since the last sync plus the one that was forming
+            elapsed = time.time() - self._last_sync
+            count = min(self.buffer_size, int(elapsed // timeframe_seconds(self.timeframe)) + 2)
+            rates = self.mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, count)
+            if rates is None:
+                return False
+            self._last_sync = time.time()
+            times = rates['time']
+            last_time = self.buffer.last_time
+            if len(rates) and times[0] <= last_time:
+                index = int(np.searchsorted(times, last_time))
+                if index < len(rates) and times[index] == last_time:
+                    # The previously forming bar has new high/low/close values
+                    self.buffer.patch_last(rates[index])
+                    index += 1
+                self.buffer.append(rates[index:])
+                self._persist(rates, includes_forming=True)
+                return True
+            # Gap wider than the fetch (or no overlap): fall through and reseed
+
+        rates = self.mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.buffer_size)
+        if rates is None:
+            return False
+        self._last_sync = time.time()
+        if self.buffer is None:
+            self.buffer = BarBuffer(self.buffer_size, rates.dtype)
+        self.buffer.reset(rates)
+        self._persist(rates, includes_forming=True)
+        return True
+
+    def get_bars(self, num_bars=100, start_pos=0):
+        """Return the latest bars as a NumPy view into the buffer (no copy).
+
+        Only available when the instance was created with ``buffer_size``.
+        The view is valid until the next call.
+        """
+        if not self._sync_buffer():
+            self._handle_fetch_error(f"Failed to fetch data for {self.symbol}")
+            return None
+        return self.buffer.view(num_bars, skip_last=start_pos)
 
-    def fetch_rates(self, num_bars=100):
-        rates = mt5.copy_rates_from_pos(
-            self.symbol, self.timeframe, 0, num_bars)
+    def snapshot(self):
+        """The buffered bar window and when it was synced, for core.snapshot."""
+        if self.buffer is None:
+            return None
+        return {"bars": self.buffer.view().copy(), "last_sync": self._last_sync}
+
+    def restore(self, state):
+        """Reload a ``snapshot``; the next sync only fetches the bars since it was taken."""
+        if not state or not self.buffer_size or not len(state["bars"]):
+            return False
+        bars = state["bars"]
+        self.buffer = BarBuffer(self.buffer_size, bars.dtype)
+        self.buffer.reset(bars)
+        self._last_sync = state["last_sync"]
+        return True
+
+    def fetch_rates_array(self, num_bars=100, start_pos=0):
+        """Return the latest bars as MT5's structured array, or None on failure."""
+        # start_pos=1 skips the bar that is still forming
+        if self.buffer_size:
+            return self.get_bars(num_bars, start_pos)
+        rates = self.mt5.copy_rates_from_pos(self.symbol, self.timeframe, start_pos, num_bars)
         if rates is None:
             self._handle_fetch_error(f"Failed to fetch data for {self.symbol}")
             return None
+        self._persist(rates, includes_forming=start_pos == 0)
+        return rates
+
+    def _attrs(self, rates, timeframe):
+        if not len(rates):
+            return {}
+        # Identifies the bar window for core.indicators.CachedIndicators; the last
+        # bar's prices are included because a forming bar changes under the same time
+        last = rates[-1]
+        return {'cache_key': (
+            self.symbol, self.timeframe if timeframe is None else timeframe,
+            int(rates['time'][0]), int(last['time']), len(rates),
+            float(last['high']), float(last['low']), float(last['close']))}
+
+    def to_frame(self, rates, timeframe=None):
+        """DataFrame of MT5 rates with ``time`` as datetimes, keyed for CachedIndicators."""
         df = pd.DataFrame(rates)
+        df.attrs.update(self._attrs(rates, timeframe))
         df['time'] = pd.to_datetime(df['time'], unit='s')
         return df
 
+    def to_bars(self, rates, timeframe=None, bars=None):
+        """BarSeries over MT5 rates (no copy), keyed like ``to_frame``; reuses ``bars`` if given."""
+        if bars is None:
+            return BarSeries(rates, self._attrs(rates, timeframe))
+        return bars.reset(rates, self._attrs(rates, timeframe))
+
+    def fetch_rates(self, num_bars=100, start_pos=0):
+        # start_pos=1 skips the bar that is still forming
+        rates = self.fetch_rates_array(num_bars, start_pos)
+        if rates is None:
+            return None
+        return self.to_frame(rates)
+
+    def fetch_bars(self, num_bars=100, start_pos=0):
+        """``fetch_rates`` as a ``core.bars.BarSeries`` instead of a DataFrame.
+
+        The same BarSeries is returned every call, pointed at the new bars
+        with its indicator column buffers reused, so it is valid until the
+        next call (like ``get_bars``).
+        """
+        rates = self.fetch_rates_array(num_bars, start_pos)
+        if rates is None:
+            return None
+        self._bars = self.to_bars(rates, bars=self._bars)
+        return self._bars
+
     def get_tick(self):
-        tick = mt5.symbol_info_tick(self.symbol)
+        tick = self.mt5.symbol_info_tick(self.symbol)
         if tick is None:
             self._handle_fetch_error("Failed to get tick data")
             return None
         return tick
 
-    def get_spread(self):
-        """Calculate the spread as the difference between the ask and bid prices."""
-        rates = mt5.symbol_info_tick(self.symbol)
+    def get_spread(self, tick=None):
+        """Calculate the spread as the difference between the ask and bid prices.
+
+        Pass a tick that was already fetched to avoid a second terminal call.
+        """
+        rates = tick if tick is not None else self.mt5.symbol_info_tick(self.symbol)
         if rates is None:
-            print(f"Failed to retrieve tick data for symbol: {self.symbol}")
+            log.error("Failed to retrieve tick data", symbol=self.symbol)
             return None
         return rates.ask - rates.bid
 
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.broker import get_backend
+
+
+# Outcome of one signal: the ticket (0 if not filled), the last retcode and how the fill went.
+# error is MT5's last_error() taken right after a failed send (None on a fill)
+ExecutionReport = namedtuple(
+    'ExecutionReport', 'symbol action ticket retcode attempts filling requested_price fill_price '
+                       'slippage_points latency_ms error')
+
+
+class ExecutionEngine:
+    """Send market orders with retries, off the caller's thread if needed.
+
+    A requote, price change or off-quotes rejection is retried at once with
+    a fresh tick, and an unsupported filling type falls back to the next one
+    the symbol accepts, up to ``max_attempts`` sends per signal. ``submit``
+    runs orders on a thread pool (``executor``, or one of ``max_workers``
+    threads created on the first submit) so several symbols can execute at
+    the same time; ``execute`` does the same work on the calling thread.
+    """
+
+    def __init__(self, backend=None, max_attempts=3, executor=None, max_workers=4, history=1000):
+        self.mt5 = backend or get_backend()
+        self.max_attempts = max_attempts
+        self.executor = executor
+        self.max_workers = max_workers
+        self._executor_lock = threading.Lock()
+        self.reports = deque(maxlen=history)
+        self.retry_retcodes = {
+            self.mt5.TRADE_RETCODE_REQUOTE,
+            self.mt5.TRADE_RETCODE_PRICE_CHANGED,
+            self.mt5.TRADE_RETCODE_PRICE_OFF,
+        }
+
+    def execute(self, order_manager, action, tick=None, volume=None):
+        """Place one order for ``order_manager``'s symbol; returns an ExecutionReport.
+
+        ``volume`` overrides the order manager's lot size.
+        """
+        started = time.perf_counter()
+        filling = None
+        requested_price = None
+        request = result = None
+        attempts = 0
+
+        while attempts < self.max_attempts:
+            # The first attempt can use the tick the signal was computed on
+            if tick is None or attempts:
+                tick = self.mt5.symbol_info_tick(order_manager.symbol)
+                if tick is None:
+                    break
+            attempts += 1
+            request, result = order_manager.send(action, tick, filling, volume)
+            if request is None:
+                break
+            if requested_price is None:
+                requested_price = float(request["price"])
+            if result is None:
+                break
+
+            retcode = result.retcode
+            if retcode == self.mt5.TRADE_RETCODE_DONE:
+                break
+            if retcode == self.mt5.TRADE_RETCODE_INVALID_FILL:
+                # Move on to the next filling type the symbol supports
+                modes = order_manager.filling_modes
+                current = request["type_filling"]
+                following = modes[modes.index(current) + 1:] if current in modes else modes
+                if not following:
+                    break
+                filling = following[0]
+            elif retcode not in self.retry_retcodes:
+                break
+
+        filled = result is not None and result.retcode == self.mt5.TRADE_RETCODE_DONE
+        # Read on this thread straight away; other pipelines' calls would overwrite it
+        error = None if filled else self.mt5.last_error()
+        return self._report(order_manager, action, started, attempts, request, result,
+                            requested_price, filled, error)
+
+    def _report(self, order_manager, action, started, attempts, request, result, requested_price,
+                filled, error):
+        fill_price = float(result.price) if filled else None
+        slippage = None
+        if filled and requested_price is not None:
+            spec = order_manager.symbols.get(order_manager.symbol)
+            point = spec.point if spec is not None else 1.0
+            # Positive slippage means a worse price than the one the signal saw
+            difference = fill_price - requested_price if action == 'buy' else requested_price - fill_price
+            slippage = round(difference / point, 1)
+
+        report = ExecutionReport(
+            order_manager.symbol, action, result.order if filled else 0,
+            result.retcode if result is not None else None, attempts,
+            request["type_filling"] if request is not None else None, requested_price,
+            fill_price, slippage, (time.perf_counter() - started) * 1000, error)
+        self.reports.append(report)
+        return report
+
+    def submit(self, order_manager, action, tick=None, volume=None):
+        """Run ``execute`` on the engine's thread pool; returns a Future of the report."""
+        if self.executor is None:
+            with self._executor_lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="orders")
+        return self.executor.submit(self.execute, order_manager, action, tick, volume)
+
+    def execute_many(self, orders):
+        """Execute ``(order_manager, action)`` pairs concurrently; reports in the same order."""
+        futures = [self.submit(order_manager, action) for order_manager, action in orders]
+        return [future.result() for future in futures]
+
+    def summary(self):
+        """Fill rate, retries, latency and slippage over the recent reports."""
+        reports = list(self.reports)
+        if not reports:
+            return {"orders": 0}
+        filled = [report for report in reports if report.ticket]
+        slippage = [report.slippage_points for report in filled]
+        latency = sorted(report.latency_ms for report in reports)
+        return {
+            "orders": len(reports),
+            "filled": len(filled),
+            "retried": sum(1 for report in reports if report.attempts > 1),
+            "latency_p50_ms": latency[len(latency) // 2],
+            "latency_max_ms": latency[-1],
+            "slippage_mean_points": sum(slippage) / len(slippage) if slippage else 0.0,
+            "slippage_max_points": max(slippage) if slippage else 0.0,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,151 @@
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config.config import Config
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+# Fixed-width records matching what MT5 returns from copy_rates_* and copy_ticks_*
+BAR_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')])
+
+SECONDS_PER_DAY = 86400
+
+# Directory names for the MT5 timeframe constants in Config.TIMEFRAMES
+TIMEFRAME_NAMES = {value: name for name, value in Config.TIMEFRAMES.items()}
+
+
+class HistoryStore:
+    """Append-only local store of bars and ticks, partitioned by day.
+
+    Each partition is a raw file of fixed-width NumPy records, e.g.
+    ``<root>/EURUSD/M1/2024-01-02.bars`` or ``<root>/EURUSD/ticks/2024-01-02.ticks``.
+    Reads memory-map the partitions, so a range inside one day is returned as
+    a view on the page cache without copying; ranges spanning days are
+    concatenated.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._last_time = {}
+
+    def _directory(self, symbol, stream):
+        return os.path.join(self.root, symbol, TIMEFRAME_NAMES.get(stream, str(stream)))
+
+    @staticmethod
+    def _day_name(day):
+        return datetime.fromtimestamp(int(day) * SECONDS_PER_DAY, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def _partitions(self, directory, suffix):
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.endswith(suffix))
+
+    def _open(self, path, dtype):
+        # Ignore a trailing partial record left by an interrupted write
+        count = os.path.getsize(path) // dtype.itemsize
+        if not count:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def _last_stored(self, directory, suffix, dtype, key):
+        # Newest timestamp on disk, cached after the first lookup
+        if directory not in self._last_time:
+            partitions = self._partitions(directory, suffix)
+            last = None
+            if partitions:
+                records = self._open(os.path.join(directory, partitions[-1]), dtype)
+                if len(records):
+                    last = int(records[key][-1])
+            self._last_time[directory] = last
+        return self._last_time[directory]
+
+    def _append(self, directory, suffix, dtype, key, records):
+        records = np.asarray(records)
+        # Append-only: anything at or before the newest stored record is already on disk
+        last = self._last_stored(directory, suffix, dtype, key)
+        if last is not None and len(records):
+            records = records[records[key] > last]
+        if not len(records):
+            return 0
+
+        converted = np.zeros(len(records), dtype=dtype)
+        for name in dtype.names:
+            if name in records.dtype.names:
+                converted[name] = records[name]
+
+        os.makedirs(directory, exist_ok=True)
+        days = converted['time'] // SECONDS_PER_DAY
+        boundaries = np.flatnonzero(np.diff(days)) + 1
+        for chunk in np.split(converted, boundaries):
+            day = self._day_name(chunk['time'][0] // SECONDS_PER_DAY)
+            path = os.path.join(directory, day + suffix)
+            with open(path, 'ab') as f:
+                # Drop a partial record left by an interrupted write, or every record
+                # after it would be misaligned
+                size = f.tell()
+                if size % dtype.itemsize:
+                    f.truncate(size - size % dtype.itemsize)
+                f.write(chunk.tobytes())
+        self._last_time[directory] = int(converted[key][-1])
+        return len(converted)
+
+    def _read(self, directory, suffix, dtype, start, end, count):
+        partitions = self._partitions(directory, suffix)
+        if start is not None:
+            first_day = self._day_name(int(start) // SECONDS_PER_DAY) + suffix
+            partitions = [p for p in partitions if p >= first_day]
+        if end is not None:
+            last_day = self._day_name(int(end) // SECONDS_PER_DAY) + suffix
+            partitions = [p for p in partitions if p <= last_day]
+
+        pieces = []
+        remaining = count
+        # Walk backwards so "the last N records" only touches the newest partitions
+        for name in reversed(partitions):
+            records = self._open(os.path.join(directory, name), dtype)
+            times = records['time']
+            lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+            hi = len(records) if end is None else int(np.searchsorted(times, end, side='right'))
+            if remaining is not None:
+                lo = max(lo, hi - remaining)
+                remaining -= hi - lo
+            if hi > lo:
+                pieces.append(records[lo:hi])
+            if remaining is not None and remaining <= 0:
+                break
+
+        if not pieces:
+            return np.empty(0, dtype=dtype)
+        if len(pieces) == 1:
+            return pieces[0]
+        return np.concatenate(pieces[::-1])
+
+    def append_bars(self, symbol, timeframe, rates):
+        """Persist closed bars; returns how many were new."""
+        return self._append(self._directory(symbol, timeframe), '.bars', BAR_DTYPE, 'time', rates)
+
+    def append_ticks(self, symbol, ticks):
+        """Persist ticks newer than the last stored ``time_msc``; returns how many were new."""
+        return self._append(self._directory(symbol, 'ticks'), '.ticks', TICK_DTYPE, 'time_msc', ticks)
+
+    def read_bars(self, symbol, timeframe, start=None, end=None, count=None):
+        """Bars with ``start <= time <= end`` (epoch seconds), optionally only the last ``count``."""
+        return self._read(self._directory(symbol, timeframe), '.bars', BAR_DTYPE, start, end, count)
+
+    def read_ticks(self, symbol, start=None, end=None, count=None):
+        return self._read(self._directory(symbol, 'ticks'), '.ticks', TICK_DTYPE, start, end, count)
+
+    def read_frame(self, symbol, timeframe, start=None, end=None, count=None):
+        """Bars as a DataFrame shaped like ``MarketData.fetch_rates`` output."""
+        df = pd.DataFrame(self.read_bars(symbol, timeframe, start, end, count))
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        return df
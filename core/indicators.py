@@ -1,25 +1,58 @@
-import pandas as pd
+import threading
+from collections import OrderedDict
 import numpy as np
 
+from core import kernels
+from core.bars import BarSeries, values_of
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+def _series(df, name):
+    # The pandas engine needs Series; a BarSeries column is wrapped as one
+    return pd.Series(df[name]) if isinstance(df, BarSeries) else df[name]
+
+
+def _out(df, name):
+    # A BarSeries lends its preallocated column to the kernel; DataFrames get a new array
+    return df.output(name) if isinstance(df, BarSeries) else None
+
 
 class IndicatorUtils:
+    """Indicator columns added to a rates DataFrame or ``core.bars.BarSeries``.
+
+    Every method takes ``engine``: ``"pandas"`` (the default) or ``"numpy"``,
+    which runs the equivalent array kernels from ``core.kernels``, writing
+    straight into a BarSeries' column buffers.
+    """
+
     @staticmethod
-    def calculate_ema(df, period, column_name="ema"):
+    def calculate_ema(df, period, column_name="ema", engine="pandas"):
         """Calculate Exponential Moving Average (EMA) for a given period."""
-        df[column_name] = df['close'].ewm(
+        if engine == "numpy":
+            df[column_name] = kernels.ema(values_of(df, 'close'), period, _out(df, column_name))
+            return df
+        df[column_name] = _series(df, 'close').ewm(
             span=period, adjust=False).mean().fillna(0)
         return df
 
     @staticmethod
-    def calculate_sma(df, period, column_name="sma"):
+    def calculate_sma(df, period, column_name="sma", engine="pandas"):
         """Calculate Simple Moving Average (SMA) for a given period."""
-        df[column_name] = df['close'].rolling(window=period).mean().fillna(0)
+        if engine == "numpy":
+            df[column_name] = kernels.sma(values_of(df, 'close'), period, _out(df, column_name))
+            return df
+        df[column_name] = _series(df, 'close').rolling(window=period).mean().fillna(0)
         return df
 
     @staticmethod
-    def calculate_rsi(df, period, column_name="rsi"):
+    def calculate_rsi(df, period, column_name="rsi", engine="pandas"):
         """Calculate Relative Strength Index (RSI) for a given period."""
-        delta = df['close'].diff()
+        if engine == "numpy":
+            df[column_name] = kernels.rsi(values_of(df, 'close'), period, _out(df, column_name))
+            return df
+        delta = _series(df, 'close').diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
         rs = gain / loss.replace(0, 1)
@@ -27,28 +60,43 @@ class IndicatorUtils:
         return df
 
     @staticmethod
-    def calculate_macd(df, fast_period=12, slow_period=26, signal_period=9, macd_column="macd"):
+    def calculate_macd(df, fast_period=12, slow_period=26, signal_period=9, macd_column="macd",
+                       engine="pandas"):
         """Calculate MACD with customizable column names."""
-        df[f'{macd_column}_line'] = df['close'].ewm(span=fast_period, adjust=False).mean() - \
-            df['close'].ewm(span=slow_period, adjust=False).mean()
-        df[f'{macd_column}_signal'] = df[f'{macd_column}_line'].ewm(
-            span=signal_period, adjust=False).mean()
-        df[f'{macd_column}_histogram'] = df[f'{macd_column}_line'] - \
-            df[f'{macd_column}_signal']
+        if engine == "numpy":
+            names = [f'{macd_column}_{suffix}' for suffix in ('line', 'signal', 'histogram')]
+            out = [df.output(name) for name in names] if isinstance(df, BarSeries) else None
+            series = kernels.macd(values_of(df, 'close'), fast_period, slow_period, signal_period, out)
+            for name, values in zip(names, series):
+                df[name] = values
+            return df
+        close = _series(df, 'close')
+        line = close.ewm(span=fast_period, adjust=False).mean() - \
+            close.ewm(span=slow_period, adjust=False).mean()
+        signal = line.ewm(span=signal_period, adjust=False).mean()
+        df[f'{macd_column}_line'] = line
+        df[f'{macd_column}_signal'] = signal
+        df[f'{macd_column}_histogram'] = line - signal
         return df
 
     @staticmethod
-    def calculate_adx(df, period=14, column_name='adx'):
+    def calculate_adx(df, period=14, column_name='adx', engine="pandas"):
         """Calculate the Average Directional Index (ADX) for a given period."""
+        if engine == "numpy":
+            df[column_name] = kernels.adx(
+                values_of(df, 'high'), values_of(df, 'low'), values_of(df, 'close'), period,
+                _out(df, column_name))
+            return df
+        high, low, close = _series(df, 'high'), _series(df, 'low'), _series(df, 'close')
         # Calculate True Range (TR)
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift(1))
-        low_close = np.abs(df['low'] - df['close'].shift(1))
+        high_low = high - low
+        high_close = np.abs(high - close.shift(1))
+        low_close = np.abs(low - close.shift(1))
         tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
 
         # Calculate Positive and Negative Directional Movement (DM)
-        plus_dm = df['high'].diff()
-        minus_dm = -df['low'].diff()
+        plus_dm = high.diff()
+        minus_dm = -low.diff()
         plus_dm[plus_dm < 0] = 0
         minus_dm[minus_dm < 0] = 0
 
@@ -66,3 +114,84 @@ class IndicatorUtils:
         df[column_name] = dx.ewm(span=period, adjust=False).mean()
 
         return df
+
+
+class CachedIndicators:
+    """IndicatorUtils stand-in that reuses columns already computed for the same data and parameters.
+
+    DataFrames (and BarSeries) opt in by setting ``df.attrs['cache_key']`` to something
+    that identifies their contents (e.g. a history window); others are computed without
+    caching. ``MarketData.fetch_rates`` keys its frames by symbol, timeframe and bar window,
+    so one instance shared by every strategy on a symbol computes each series
+    once per bar. Cached arrays are read-only because they are shared.
+    """
+
+    def __init__(self, maxsize=256, engine="pandas"):
+        self.maxsize = maxsize
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        # Strategies may run on scheduler worker threads
+        self._lock = threading.Lock()
+
+    def _apply(self, method, df, name_arg, name, **params):
+        data_key = df.attrs.get('cache_key')
+        # A size of 0 only selects the engine
+        if data_key is None or not self.maxsize:
+            return getattr(IndicatorUtils, method)(df, **params, **{name_arg: name}, engine=self.engine)
+
+        key = (data_key, method, tuple(sorted(params.items())))
+        with self._lock:
+            columns = self._cache.get(key)
+            if columns is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._cache.move_to_end(key)
+
+        if columns is None:
+            # Compute on a scratch frame under a neutral name so results can be shared
+            scratch = df[['open', 'high', 'low', 'close']].copy(deep=False)
+            getattr(IndicatorUtils, method)(
+                scratch, **params, **{name_arg: '_cached'}, engine=self.engine)
+            columns = {}
+            for column in scratch.columns:
+                if column.startswith('_cached'):
+                    values = values_of(scratch, column).copy()
+                    values.setflags(write=False)
+                    columns[column] = values
+            with self._lock:
+                self._cache[key] = columns
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+
+        for column, values in columns.items():
+            df[column.replace('_cached', name, 1)] = values
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def calculate_ema(self, df, period, column_name="ema"):
+        return self._apply('calculate_ema', df, 'column_name', column_name, period=period)
+
+    def calculate_sma(self, df, period, column_name="sma"):
+        return self._apply('calculate_sma', df, 'column_name', column_name, period=period)
+
+    def calculate_rsi(self, df, period, column_name="rsi"):
+        return self._apply('calculate_rsi', df, 'column_name', column_name, period=period)
+
+    def calculate_macd(self, df, fast_period=12, slow_period=26, signal_period=9, macd_column="macd"):
+        return self._apply('calculate_macd', df, 'macd_column', macd_column, fast_period=fast_period,
+                           slow_period=slow_period, signal_period=signal_period)
+
+    def calculate_adx(self, df, period=14, column_name='adx'):
+        return self._apply('calculate_adx', df, 'column_name', column_name, period=period)
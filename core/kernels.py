@@ -0,0 +1,197 @@
+import numpy as np
+
+from core.streaming import _alpha_from_span, _ewm_step
+
+
+# Weights below this no longer change a double-precision sum, so the
+# doubling passes of ewm_mean stop there
+_EWM_MIN_WEIGHT = 1e-18
+
+
+def _output(out, n):
+    if out is None:
+        return np.empty(n)
+    if out.shape != (n,) or out.dtype != np.float64:
+        raise ValueError(f"out must be a float64 array of shape ({n},)")
+    return out
+
+
+def _ewm_mean_loop(x, alpha, out):
+    # Exact pandas recursion, used when gaps (NaN) appear after the first value
+    state = None
+    for i, value in enumerate(x.tolist()):
+        state = _ewm_step(state, value, alpha)
+        out[i] = state[0]
+    return out
+
+
+def ewm_mean(x, span, out=None):
+    """``pd.Series(x).ewm(span=span, adjust=False).mean()`` on a float64 array.
+
+    The recursion y[t] = (1 - a) * y[t-1] + a * x[t] is evaluated as a
+    doubling scan: after the pass with shift k every value holds the weighted
+    sum of its last 2k inputs, so about log2 of the effective window length
+    whole-array passes reproduce it, stopping once the weights drop below
+    double precision. Leading NaNs are kept; a NaN after the first value
+    falls back to the sequential recursion.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    n = len(x)
+    out = _output(out, n)
+    if n == 0:
+        return out
+
+    valid = ~np.isnan(x)
+    start = int(valid.argmax()) if valid.any() else n
+    if start == n:
+        out[:] = np.nan
+        return out
+    if not valid[start:].all():
+        return _ewm_mean_loop(x, _alpha_from_span(span), out)
+
+    alpha = _alpha_from_span(span)
+    values = out[start:]
+    first = float(x[start])  # out may alias x, so read it before writing
+    np.multiply(x[start:], alpha, out=values)
+    # pandas starts the recursion exactly at the first value
+    values[0] = first
+    out[:start] = np.nan
+
+    shift = 1
+    weight = 1. - alpha
+    while shift < len(values) and weight > _EWM_MIN_WEIGHT:
+        # The product is a new array, so overlapping the target is safe
+        values[shift:] += weight * values[:-shift]
+        shift *= 2
+        weight *= weight
+    return out
+
+
+def rolling_mean(x, window, out=None):
+    """``pd.Series(x).rolling(window).mean()`` on a float64 array without NaNs.
+
+    Window sums come from one cumulative sum of the values relative to the
+    first one, which keeps the rounding error of long series small. As in
+    pandas, a window whose
+    values are all identical returns that value exactly, so a run of zeros
+    gives 0.0 rather than a rounding residue.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    n = len(x)
+    out = _output(out, n)
+    if n < window:
+        out[:] = np.nan
+        return out
+
+    offset = x[0]
+    sums = np.cumsum(x - offset)
+    out[:window - 1] = np.nan
+    out[window - 1] = sums[window - 1]
+    np.subtract(sums[window:], sums[:n - window], out=out[window:])
+    out[window - 1:] /= window
+    out[window - 1:] += offset
+
+    # Index where the current run of equal values started
+    run_start = np.zeros(n, dtype=np.int64)
+    changes = np.flatnonzero(x[1:] != x[:-1]) + 1
+    run_start[changes] = changes
+    np.maximum.accumulate(run_start, out=run_start)
+    flat = np.flatnonzero(np.arange(n) - run_start >= window - 1)
+    flat = flat[flat >= window - 1]
+    out[flat] = x[flat]
+    return out
+
+
+def ema(close, period, out=None):
+    """EMA as in ``IndicatorUtils.calculate_ema`` (NaN filled with 0)."""
+    out = ewm_mean(close, period, out)
+    np.nan_to_num(out, copy=False, nan=0.0, posinf=np.inf, neginf=-np.inf)
+    return out
+
+
+def sma(close, period, out=None):
+    """SMA as in ``IndicatorUtils.calculate_sma`` (the first period - 1 bars are 0)."""
+    out = rolling_mean(close, period, out)
+    out[:min(period - 1, len(out))] = 0.0
+    return out
+
+
+def rsi(close, period, out=None):
+    """RSI as in ``IndicatorUtils.calculate_rsi`` (100 until a full window is available)."""
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    out = _output(out, n)
+    delta = np.empty(n)
+    delta[0] = 0.0
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    gain = rolling_mean(np.maximum(delta, 0.0), period)
+    loss = rolling_mean(np.maximum(-delta, 0.0), period)
+    # Same guard as the pandas version: a window with no losses divides by 1
+    loss[loss == 0] = 1.0
+    np.divide(gain, loss, out=out)
+    out += 1.0
+    np.divide(100.0, out, out=out)
+    np.nan_to_num(out, copy=False, nan=0.0, posinf=np.inf, neginf=-np.inf)
+    np.subtract(100.0, out, out=out)
+    return out
+
+
+def macd(close, fast_period=12, slow_period=26, signal_period=9, out=None):
+    """(line, signal, histogram) as in ``IndicatorUtils.calculate_macd``.
+
+    ``out`` may be a (3, n) float64 array, or three length-n ones, receiving the three series.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    if out is None:
+        out = np.empty((3, n))
+    line, signal, histogram = out
+    ewm_mean(close, fast_period, line)
+    line -= ewm_mean(close, slow_period, histogram)
+    ewm_mean(line, signal_period, signal)
+    np.subtract(line, signal, out=histogram)
+    return line, signal, histogram
+
+
+def adx(high, low, close, period=14, out=None):
+    """ADX as in ``IndicatorUtils.calculate_adx``, including its leading NaN."""
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    out = _output(out, n)
+    if n == 0:
+        return out
+
+    # True range; the first bar has no previous close
+    tr = high - low
+    if n > 1:
+        gap = np.abs(high[1:] - close[:-1])
+        np.maximum(tr[1:], gap, out=tr[1:])
+        np.abs(low[1:] - close[:-1], out=gap)
+        np.maximum(tr[1:], gap, out=tr[1:])
+
+    # Directional movement, NaN on the first bar like Series.diff()
+    plus_dm = np.empty(n)
+    minus_dm = np.empty(n)
+    plus_dm[0] = minus_dm[0] = np.nan
+    np.subtract(high[1:], high[:-1], out=plus_dm[1:])
+    np.subtract(low[:-1], low[1:], out=minus_dm[1:])
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm < 0] = 0
+
+    tr_smooth = ewm_mean(tr, period, tr)
+    plus_di = ewm_mean(plus_dm, period, plus_dm)
+    minus_di = ewm_mean(minus_dm, period, minus_dm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di /= tr_smooth
+        plus_di *= 100
+        minus_di /= tr_smooth
+        minus_di *= 100
+        # dx = 100 * |+DI - -DI| / (+DI + -DI), reusing the smoothed TR buffer
+        dx = np.subtract(plus_di, minus_di, out=tr_smooth)
+        np.abs(dx, out=dx)
+        dx *= 100
+        plus_di += minus_di
+        dx /= plus_di
+    return ewm_mean(dx, period, out)
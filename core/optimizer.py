@@ -0,0 +1,180 @@
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core.backtest import Backtester
+from core.indicators import CachedIndicators
+
+
+BAR_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'spread')
+
+# Per-worker state populated by _attach_bars
+_worker_bars = None
+_worker_handles = None
+_worker_indicators = None
+
+
+class SharedBars:
+    """Bar history copied once into shared memory so workers can map it without pickling."""
+
+    def __init__(self, df):
+        self.length = len(df)
+        self.blocks = []
+        self.spec = []
+        for column in BAR_COLUMNS:
+            if column not in df:
+                continue
+            values = np.ascontiguousarray(df[column].to_numpy())
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            self.blocks.append(block)
+            self.spec.append((column, block.name, values.dtype.str, len(values)))
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _attach_bars(spec):
+    global _worker_bars, _worker_handles, _worker_indicators
+    _worker_handles = []
+    _worker_bars = {}
+    for column, name, dtype, length in spec:
+        block = shared_memory.SharedMemory(name=name)
+        _worker_handles.append(block)
+        _worker_bars[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+    _worker_indicators = CachedIndicators()
+
+
+def _window_frame(start, end):
+    df = pd.DataFrame({column: values[start:end] for column, values in _worker_bars.items()},
+                      copy=False)
+    # Indicator columns only depend on the window, so every parameter set on it can share them
+    df.attrs['cache_key'] = (start, end)
+    return df
+
+
+def _run_backtest(task):
+    strategy_class, strategy_kwargs, params, backtest_kwargs, window = task
+    # The warm-up bars before the window feed the indicators but are not traded
+    start, end, warmup = window if len(window) == 3 else (*window, 0)
+    started = time.perf_counter()
+    strategy = strategy_class(**strategy_kwargs, **params)
+    strategy.indicators = _worker_indicators
+    result = Backtester(strategy, **backtest_kwargs).run(_window_frame(start - warmup, end), warmup)
+    summary = result.summary()
+    summary['elapsed'] = time.perf_counter() - started
+    return summary
+
+
+class Optimizer:
+    """Grid, random and walk-forward parameter search for a TradingStrategy subclass.
+
+    Every backtest runs in a process pool. The bar history is placed in shared
+    memory once and each worker keeps a ``CachedIndicators`` instance, so an
+    indicator such as a 10-period EMA is computed once per worker and window
+    no matter how many parameter sets use it.
+    """
+
+    def __init__(self, strategy_class, df, backtest_kwargs, strategy_kwargs=None,
+                 metric='net_profit', max_workers=None):
+        self.strategy_class = strategy_class
+        self.backtest_kwargs = backtest_kwargs
+        self.strategy_kwargs = strategy_kwargs or {'symbol': None, 'timeframe': None}
+        self.metric = metric
+        self.max_workers = max_workers or os.cpu_count()
+        self.bars = SharedBars(df)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.bars.close()
+
+    @staticmethod
+    def _grid(param_grid, constraint=None):
+        names = list(param_grid)
+        combos = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        return [params for params in combos if constraint is None or constraint(params)]
+
+    def _evaluate(self, runs):
+        """Run (params, window) pairs across the pool and return one row per run."""
+        tasks = [(self.strategy_class, self.strategy_kwargs, params, self.backtest_kwargs, window)
+                 for params, window in runs]
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_attach_bars,
+                                 initargs=(self.bars.spec,)) as pool:
+            chunksize = max(1, len(tasks) // (4 * self.max_workers))
+            summaries = list(pool.map(_run_backtest, tasks, chunksize=chunksize))
+        return [{**params, 'window_start': window[0], 'window_end': window[1], **summary}
+                for (params, window), summary in zip(runs, summaries)]
+
+    def _rank(self, rows):
+        results = pd.DataFrame(rows)
+        if results.empty:
+            return results
+        return results.sort_values(self.metric, ascending=False, ignore_index=True)
+
+    def grid_search(self, param_grid, constraint=None):
+        """Backtest every combination of ``param_grid`` (name -> list of values)."""
+        window = (0, self.bars.length)
+        return self._rank(self._evaluate(
+            [(params, window) for params in self._grid(param_grid, constraint)]))
+
+    def random_search(self, param_grid, n_iter, seed=None, constraint=None):
+        """Backtest ``n_iter`` distinct combinations drawn at random from ``param_grid``."""
+        combos = self._grid(param_grid, constraint)
+        sample = random.Random(seed).sample(combos, min(n_iter, len(combos)))
+        window = (0, self.bars.length)
+        return self._rank(self._evaluate([(params, window) for params in sample]))
+
+    def walk_forward(self, param_grid, train_bars, test_bars, constraint=None, warmup_bars=None):
+        """Optimize on rolling train windows and score the winner on the bars that follow.
+
+        Returns one row per window with the chosen parameters and their
+        out-of-sample statistics (prefixed ``test_``) next to the in-sample metric.
+        Each test run first feeds the indicators the last ``warmup_bars`` of its
+        train window (default: the winning strategy's ``lookback()``, at most
+        ``train_bars``); only trades signalled on test bars count.
+        """
+        combos = self._grid(param_grid, constraint)
+        windows = []
+        start = 0
+        while start + train_bars + test_bars <= self.bars.length:
+            windows.append(((start, start + train_bars),
+                            (start + train_bars, start + train_bars + test_bars)))
+            start += test_bars
+
+        if not windows or not combos:
+            return pd.DataFrame()
+
+        # All train windows go to the pool in one batch, then all test windows in another
+        train_rows = self._evaluate([(params, train) for train, _ in windows for params in combos])
+        best = []
+        for i, (_, test_window) in enumerate(windows):
+            scores = [row[self.metric] for row in train_rows[i * len(combos):(i + 1) * len(combos)]]
+            winner = int(np.argmax(scores))
+            warmup = warmup_bars
+            if warmup is None:
+                warmup = self.strategy_class(**self.strategy_kwargs, **combos[winner]).lookback()
+            best.append((combos[winner], (*test_window, min(warmup, train_bars)), scores[winner]))
+
+        test_rows = self._evaluate([(params, window) for params, window, _ in best])
+        rows = []
+        for (params, window, train_score), test_row in zip(best, test_rows):
+            row = {**params, 'window_start': window[0], 'window_end': window[1],
+                   f'train_{self.metric}': train_score}
+            row.update({f'test_{key}': value for key, value in test_row.items()
+                        if key not in params and key not in ('window_start', 'window_end')})
+            rows.append(row)
+        return pd.DataFrame(rows)
@@ -1,45 +1,35 @@
-import MetaTrader5 as mt5
+from collections import deque
+
+from core.broker import get_backend
+from core.symbols import SymbolCache
+from utils.log import get_logger
+
+log = get_logger("order")
 
 
 class OrderManager:
-    def __init__(self, symbol, lot_size, tp_pips, sl_pips):
+    def __init__(self, symbol, lot_size, tp_pips, sl_pips, backend=None, symbols=None, deviation=50):
         self.symbol = symbol
         self.lot_size = lot_size
         self.tp_pips = tp_pips
         self.sl_pips = sl_pips
+        self.deviation = deviation  # Maximum price deviation allowed (in points)
+        self.mt5 = backend or get_backend()
+        # Pass the connection's SymbolCache to share specs across order managers
+        self.symbols = symbols or SymbolCache(self.mt5)
+        self._spec = None
+        self._templates = None
+        self.filling_modes = []
+        # Messages from submit, logged by flush_log once the order is out
+        self._log = deque()
 
-    def _validate_symbol(self):
-        # Validate if the symbol exists in the MetaTrader 5 platform
-        symbol_info = mt5.symbol_info(self.symbol)
-        if symbol_info is None:
-            print(f"Symbol {self.symbol} not found.")
-            return None
-        return symbol_info
-
-    def place_order(self, action):
-        # Place a buy or sell order based on the specified action ('buy' or 'sell')
-        symbol_info = self._validate_symbol()
-        if not symbol_info:
-            return None
-
-        # Get the latest tick data for the symbol
-        tick = mt5.symbol_info_tick(self.symbol)
-        if tick is None:
-            print(f"Failed to get tick data: {mt5.last_error()}")
-            return None
-
-        # Determine the price based on the action (ask price for buy, bid price for sell)
-        price = tick.ask if action == 'buy' else tick.bid
-        point = symbol_info.point  # The smallest price change for the symbol
+    @staticmethod
+    def calculate_stops(action, price, point, tp_pips, sl_pips, stops_level):
+        """Return (tp_price, sl_price) for an entry, or None if the broker stop level is violated."""
         pip_value = 10 * point  # 1 pip = 0.0001
-        tp_distance = self.tp_pips * pip_value  # Calculate TP distance in price
-        sl_distance = self.sl_pips * pip_value  # Calculate SL distance in price
-        min_stop_distance = symbol_info.trade_stops_level * \
-            point  # Minimum stop level allowed by the broker
-
-        print(f"Price: {price}")
-        print(f"Point: {point}")
-        print(f"Minimum Stop Distance: {min_stop_distance}")
+        tp_distance = tp_pips * pip_value  # Calculate TP distance in price
+        sl_distance = sl_pips * pip_value  # Calculate SL distance in price
+        min_stop_distance = stops_level * point  # Minimum stop level allowed by the broker
 
         # Calculate TP and SL prices based on the action
         if action == 'buy':
@@ -55,43 +45,140 @@ class OrderManager:
         if abs(sl_price - price) < min_stop_distance:
             sl_price = price - min_stop_distance if action == 'buy' else price + min_stop_distance
 
-        print(f"Calculated TP: {tp_price}, SL: {sl_price}")
-
         # Check if TP or SL violates the broker's minimum stop level requirements
         if min_stop_distance > 0:
             if abs(price - tp_price) < min_stop_distance or abs(price - sl_price) < min_stop_distance:
-                print(
-                    "Error: TP or SL does not meet the broker's minimum stop level requirements.")
                 return None
 
-        # Create the order request dictionary
-        request = {
-            # Action type: deal (market order)
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": self.symbol,  # Symbol to trade
-            "volume": self.lot_size,  # Lot size
-            # Order type (buy or sell)
-            "type": mt5.ORDER_TYPE_BUY if action == 'buy' else mt5.ORDER_TYPE_SELL,
-            "price": price,  # Execution price
-            "sl": sl_price,  # Stop loss price
-            "tp": tp_price,  # Take profit price
-            "deviation": 50,  # Maximum price deviation allowed (in points)
-            "magic": 123456,  # Magic number to identify the order
-            "comment": f"{action.capitalize()} Order",  # Order comment
-            # Order time type (Good Till Canceled)
-            "type_time": mt5.ORDER_TIME_GTC,
-            # Order filling type (Fill or Kill)
-            "type_filling": mt5.ORDER_FILLING_FOK
-        }
+        return tp_price, sl_price
+
+    def _supported_filling_modes(self, spec):
+        """Order filling types the symbol accepts, in order of preference."""
+        modes = []
+        if spec.filling_mode & self.mt5.SYMBOL_FILLING_FOK:
+            modes.append(self.mt5.ORDER_FILLING_FOK)
+        if spec.filling_mode & self.mt5.SYMBOL_FILLING_IOC:
+            modes.append(self.mt5.ORDER_FILLING_IOC)
+        # Return is not flagged in filling_mode; it is the last thing to try
+        modes.append(self.mt5.ORDER_FILLING_RETURN)
+        return modes
+
+    def _build_templates(self, spec):
+        """Precompute everything about a request that does not depend on the price."""
+        pip_value = 10 * spec.point  # 1 pip = 0.0001
+        min_stop_distance = spec.stops_level * spec.point  # Minimum stop level allowed by the broker
+        # Same distances calculate_stops arrives at, widened to the broker's stop level
+        self._tp_distance = max(self.tp_pips * pip_value, min_stop_distance)
+        self._sl_distance = max(self.sl_pips * pip_value, min_stop_distance)
+        self.filling_modes = self._supported_filling_modes(spec)
+
+        self._templates = {}
+        for action, order_type in (('buy', self.mt5.ORDER_TYPE_BUY), ('sell', self.mt5.ORDER_TYPE_SELL)):
+            self._templates[action] = {
+                # Action type: deal (market order)
+                "action": self.mt5.TRADE_ACTION_DEAL,
+                "symbol": self.symbol,  # Symbol to trade
+                "volume": self.lot_size,  # Lot size
+                "type": order_type,  # Order type (buy or sell)
+                "price": 0.0,  # Execution price, stamped at signal time
+                "sl": 0.0,  # Stop loss price, stamped at signal time
+                "tp": 0.0,  # Take profit price, stamped at signal time
+                "deviation": self.deviation,  # Maximum price deviation allowed (in points)
+                "magic": 123456,  # Magic number to identify the order
+                "comment": f"{action.capitalize()} Order",  # Order comment
+                # Order time type (Good Till Canceled)
+                "type_time": self.mt5.ORDER_TIME_GTC,
+                # Order filling type, the first one the symbol supports (usually Fill or Kill)
+                "type_filling": self.filling_modes[0]
+            }
+        self._spec = spec
+
+    def prepare(self):
+        """Load the symbol spec and build the order templates ahead of the first signal."""
+        spec = self.symbols.get(self.symbol)
+        if spec is None:
+            return False
+        self._build_templates(spec)
+        return True
+
+    def send(self, action, tick, filling=None, volume=None):
+        """Stamp ``tick`` onto the prepared request and call ``order_send`` once.
+
+        ``filling`` overrides the template's filling type and ``volume`` the
+        lot size (e.g. sized by the risk engine). Returns
+        ``(request, result)``; both are None if the symbol spec is unavailable.
+        """
+        spec = self.symbols.get(self.symbol)
+        if spec is None:
+            self._log.append(f"Symbol {self.symbol} not found.")
+            return None, None
+        if spec is not self._spec:
+            # First order, or the spec was reloaded after a TTL or rejection
+            self._build_templates(spec)
+
+        # Ask price for buy, bid price for sell
+        request = self._templates[action].copy()
+        if action == 'buy':
+            price = tick.ask
+            request["tp"] = price + self._tp_distance
+            request["sl"] = price - self._sl_distance
+        else:
+            price = tick.bid
+            request["tp"] = price - self._tp_distance
+            request["sl"] = price + self._sl_distance
+        request["price"] = price
+        if filling is not None:
+            request["type_filling"] = filling
+        if volume is not None:
+            request["volume"] = volume
 
         # Send the order request to the MetaTrader 5 platform
-        result = mt5.order_send(request)
-        if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-            # Order placed successfully
-            print(f"{action.capitalize()} order placed: Ticket #{result.order}")
-            return result.order
+        result = self.mt5.order_send(request)
+        if result and result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            self._log.append((action, request, result, None))
         else:
-            # Order placement failed
-            print(
-                f"Order failed. Retcode: {result.retcode if result else 'N/A'}, Error: {mt5.last_error()}")
-            return None
+            # Order placement failed; reload the spec if the broker says it changed
+            if result is not None:
+                self.symbols.handle_retcode(self.symbol, result.retcode)
+            self._log.append((action, request, result, self.mt5.last_error()))
+        return request, result
+
+    def submit(self, action, tick=None, volume=None):
+        """Fast path: stamp the latest price onto a prepared request and send it.
+
+        Pass a tick that was already fetched to skip the ``symbol_info_tick``
+        call. Nothing is logged here; the details are queued and written by
+        ``flush_log`` once the order is out. Returns the ticket or None.
+        """
+        if tick is None:
+            tick = self.mt5.symbol_info_tick(self.symbol)
+            if tick is None:
+                self._log.append(f"Failed to get tick data: {self.mt5.last_error()}")
+                return None
+
+        request, result = self.send(action, tick, volume=volume)
+        if result and result.retcode == self.mt5.TRADE_RETCODE_DONE:
+            return result.order
+        return None
+
+    def flush_log(self):
+        """Log the details of orders submitted since the last flush."""
+        while self._log:
+            entry = self._log.popleft()
+            if isinstance(entry, str):
+                log.error(entry, symbol=self.symbol)
+                continue
+            action, request, result, error = entry
+            if error is None:
+                log.info(f"{action.capitalize()} order placed", symbol=self.symbol, ticket=result.order,
+                         volume=request['volume'], price=request['price'], tp=request['tp'], sl=request['sl'])
+            else:
+                log.error("Order failed", symbol=self.symbol, action=action,
+                          retcode=result.retcode if result else 'N/A', error=error,
+                          price=request['price'], tp=request['tp'], sl=request['sl'])
+
+    def place_order(self, action):
+        # Place a buy or sell order based on the specified action ('buy' or 'sell')
+        ticket = self.submit(action)
+        self.flush_log()
+        return ticket
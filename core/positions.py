@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from core.broker import get_backend
+from utils.log import get_logger
+
+log = get_logger("positions")
+
+
+# kind is 'opened', 'modified', 'closed' or 'deal'; previous is the position before a change
+BookEvent = namedtuple('BookEvent', 'kind ticket position previous deal')
+
+
+class PositionBook:
+    """Open positions, pending orders and recent deals, kept up to date by diffing.
+
+    ``refresh`` compares the terminal's positions with the previous snapshot by
+    ticket and ``time_update`` (or changed SL/TP/volume), and asks
+    ``history_deals_get`` only for deals since the newest one already seen.
+    It returns the changes as ``BookEvent``s and passes each one to the
+    subscribed callbacks, so callers react to opens, closes and SL/TP
+    modifications instead of re-reading every position each cycle. Pending
+    orders are only polled with ``track_orders``, since the bot trades at market.
+    """
+
+    def __init__(self, symbol=None, backend=None, since=None, lookback=86400, max_deals=1000,
+                 track_orders=False):
+        self.symbol = symbol
+        self.track_orders = track_orders
+        self.mt5 = backend or get_backend()
+        self.positions = {}
+        self.orders = {}
+        self.deals = OrderedDict()
+        self.max_deals = max_deals
+        # Deals at or after this time (epoch seconds) are requested on the next refresh
+        self.watermark = int(since if since is not None else time.time() - lookback)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._deals_pending = True
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _query(self, method):
+        return method(symbol=self.symbol) if self.symbol else method()
+
+    @staticmethod
+    def _changed(old, new):
+        return (old.time_update != new.time_update or old.sl != new.sl or old.tp != new.tp
+                or old.volume != new.volume)
+
+    def _diff_positions(self, positions, events):
+        current = {position.ticket: position for position in positions}
+        for ticket, position in current.items():
+            previous = self.positions.get(ticket)
+            if previous is None:
+                events.append(BookEvent('opened', ticket, position, None, None))
+            elif self._changed(previous, position):
+                events.append(BookEvent('modified', ticket, position, previous, None))
+        for ticket, previous in self.positions.items():
+            if ticket not in current:
+                events.append(BookEvent('closed', ticket, None, previous, None))
+        self.positions = current
+
+    def _pull_deals(self, events):
+        # Far enough ahead to cover a trade server clock running ahead of UTC
+        deals = self.mt5.history_deals_get(self.watermark, int(time.time()) + 2 * 86400)
+        if deals is None:
+            return False
+        closing = {}
+        for deal in deals:
+            if deal.ticket in self.deals or (self.symbol and deal.symbol != self.symbol):
+                continue
+            self.deals[deal.ticket] = deal
+            self.watermark = max(self.watermark, int(deal.time))
+            events.append(BookEvent('deal', deal.ticket, None, None, deal))
+            if deal.entry == self.mt5.DEAL_ENTRY_OUT:
+                closing[deal.position_id] = deal
+        while len(self.deals) > self.max_deals:
+            self.deals.popitem(last=False)
+
+        # Attach the closing deal (price, profit) to the matching close events
+        for index, event in enumerate(events):
+            if event.kind == 'closed' and event.ticket in closing:
+                events[index] = event._replace(deal=closing[event.ticket])
+        return True
+
+    def refresh(self):
+        """Sync with the terminal; returns the events since the previous refresh."""
+        with self._lock:
+            events = []
+            positions = self._query(self.mt5.positions_get)
+            if positions is None:
+                log.error("Failed to get positions", error=self.mt5.last_error())
+                return events
+            self._diff_positions(positions, events)
+
+            if self.track_orders:
+                orders = self._query(self.mt5.orders_get)
+                if orders is not None:
+                    self.orders = {order.ticket: order for order in orders}
+
+            # New deals come with a position opening, closing or changing volume,
+            # so history is only queried then (or to retry a failed query)
+            if events or self._deals_pending:
+                self._deals_pending = not self._pull_deals(events)
+
+        for event in events:
+            for callback in self._listeners:
+                callback(event)
+        return events
+
+    def open_positions(self, symbol=None):
+        return [position for position in self.positions.values()
+                if symbol is None or position.symbol == symbol]
@@ -0,0 +1,302 @@
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from core.broker import get_backend
+from core.symbols import SymbolCache
+from utils.log import get_logger
+
+log = get_logger("risk")
+
+
+# Answer to "may I open this order"; reason names the limit that failed, reservation is
+# the key the order is held under until ``settle``
+RiskDecision = namedtuple('RiskDecision', 'allowed symbol action volume reason reservation')
+
+
+class RiskEngine:
+    """Portfolio limits checked before every order, kept in arrays.
+
+    Each open position adds its notional (in the account currency, at the
+    fill price) to the net exposure of its base currency and subtracts it
+    from its quote currency, adds its margin to the margin total and its
+    signed lots to its symbol. Those arrays change only when a fill or a
+    ``PositionBook`` event arrives, so ``check`` is a few array lookups and
+    one dot product with the symbol's correlation row, without any terminal
+    call. ``approve`` sizes the order from the stop loss and equity and
+    holds it against the limits until ``settle`` reports the fill, so
+    pipelines executing at the same time cannot both take the last of a
+    limit. ``approve`` trims the sized order to the room the limits leave;
+    an order that reduces a currency exposure or the correlated lots is
+    not held back by that limit.
+    """
+
+    def __init__(self, backend=None, symbols=None, risk_per_trade=0.01, max_exposure=30.0,
+                 max_margin_usage=0.3, max_correlated_lots=1.0, correlations=None,
+                 max_positions_per_symbol=1, account_ttl=5.0):
+        self.mt5 = backend or get_backend()
+        self.symbols = symbols or SymbolCache(self.mt5)
+        self.risk_per_trade = risk_per_trade  # Fraction of equity lost at the stop loss
+        self.max_exposure = max_exposure  # Net notional per currency, as a multiple of equity
+        self.max_margin_usage = max_margin_usage  # Margin as a fraction of equity
+        self.max_correlated_lots = max_correlated_lots
+        self.max_positions_per_symbol = max_positions_per_symbol
+        self.correlations = dict(correlations or {})
+        self.account_ttl = account_ttl
+
+        self.equity = 0.0
+        self.leverage = 1
+        self.currency = None
+        self._account_at = None
+
+        # Per symbol: signed lots, open positions, contract size, currency indices, quote rate
+        self._symbol_index = {}
+        self._specs = []
+        self.lots = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._contract = np.zeros(0)
+        self._base = np.zeros(0, dtype=np.int64)
+        self._quote = np.zeros(0, dtype=np.int64)
+        self._quote_rate = np.ones(0)
+        self._correlation = np.zeros((0, 0))
+        # Per currency: net notional in the account currency
+        self._currency_index = {}
+        self.exposure = np.zeros(0)
+        self.margin = 0.0
+
+        # key -> (symbol index, signed lots, signed notional, margin); tickets and reservations
+        self._entries = {}
+        self._reservations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # --- setup --------------------------------------------------------------
+
+    def prepare(self, symbols):
+        """Load the account and the specs of the traded symbols ahead of the first order."""
+        self.refresh_account()
+        for symbol in symbols:
+            self._index(symbol)
+
+    def refresh_account(self):
+        """Reload equity and leverage, and the rates that convert quote currencies."""
+        account = self.mt5.account_info()
+        if account is None:
+            log.error("Failed to get account info", error=self.mt5.last_error())
+            return False
+        # approve and settle read these on other pool threads
+        with self._lock:
+            self.equity = float(account.equity)
+            self.leverage = account.leverage or 1
+            self.currency = account.currency
+            rates = {}
+            for i, spec in enumerate(self._specs):
+                quote = spec.currency_profit
+                if quote not in rates:
+                    rates[quote] = self._conversion_rate(quote)
+                self._quote_rate[i] = rates[quote]
+            self._account_at = time.monotonic()
+        return True
+
+    def _conversion_rate(self, currency):
+        """Account currency per unit of ``currency``, from any loaded symbol that links the two."""
+        if currency == self.currency:
+            return 1.0
+        for spec in list(self.symbols.specs.values()):
+            pair = (spec.currency_base, spec.currency_profit)
+            if pair in ((currency, self.currency), (self.currency, currency)):
+                tick = self.mt5.symbol_info_tick(spec.name)
+                if tick is None:
+                    continue
+                mid = (tick.bid + tick.ask) / 2
+                return mid if pair[0] == currency else 1.0 / mid
+        log.warning("No symbol converts currency, using 1.0", currency=currency,
+                    account_currency=self.currency)
+        return 1.0
+
+    def _currency(self, currency):
+        index = self._currency_index.get(currency)
+        if index is None:
+            index = self._currency_index[currency] = len(self.exposure)
+            self.exposure = np.append(self.exposure, 0.0)
+        return index
+
+    def _index(self, symbol):
+        """Array index of ``symbol``, growing the arrays the first time it is seen."""
+        index = self._symbol_index.get(symbol)
+        if index is not None:
+            return index
+        spec = self.symbols.get(symbol)
+        if spec is None:
+            return None
+        with self._lock:
+            index = self._symbol_index.get(symbol)
+            if index is not None:
+                return index
+            index = len(self._specs)
+            self._specs.append(spec)
+            self.lots = np.append(self.lots, 0.0)
+            self.counts = np.append(self.counts, 0)
+            self._contract = np.append(self._contract, spec.contract_size)
+            self._base = np.append(self._base, self._currency(spec.currency_base))
+            self._quote = np.append(self._quote, self._currency(spec.currency_profit))
+            rate = self._conversion_rate(spec.currency_profit) if self.currency else 1.0
+            self._quote_rate = np.append(self._quote_rate, rate)
+            names = [s.name for s in self._specs]
+            correlation = np.eye(len(names))
+            for (a, b), value in self.correlations.items():
+                if a in names and b in names:
+                    correlation[names.index(a), names.index(b)] = value
+                    correlation[names.index(b), names.index(a)] = value
+            self._correlation = correlation
+            self._symbol_index[symbol] = index
+        return index
+
+    # --- limits -------------------------------------------------------------
+
+    def _round(self, spec, lots):
+        # Down to the volume step; the small epsilon absorbs float error at exact steps
+        volume = round(math.floor(min(lots, spec.volume_max) / spec.volume_step + 1e-9)
+                       * spec.volume_step, 8)
+        return volume if volume >= spec.volume_min else 0.0
+
+    def size(self, symbol, sl_pips):
+        """Lots that lose ``risk_per_trade`` of equity at a stop ``sl_pips`` away (0.0 if below the minimum)."""
+        index = self._index(symbol)
+        if index is None or sl_pips <= 0:
+            return 0.0
+        spec = self._specs[index]
+        # Account currency lost per lot for every pip the price moves against the position
+        pip_value = 10 * spec.point * spec.contract_size * self._quote_rate[index]
+        return self._round(spec, self.equity * self.risk_per_trade / (sl_pips * pip_value))
+
+    def headroom(self, symbol, action, price):
+        """(lots, limit): the most lots the limits leave for an order, and the one that binds."""
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            return 0.0, "unknown symbol"
+        if self.counts[index] >= self.max_positions_per_symbol:
+            return 0.0, "positions per symbol"
+        sign = 1.0 if action == 'buy' else -1.0
+        # Account currency of notional per lot
+        lot_notional = self._contract[index] * price * self._quote_rate[index]
+
+        room = (self.max_margin_usage * self.equity - self.margin) * self.leverage / lot_notional
+        limit = "margin usage"
+        # Moving a net position towards the opposite sign frees room up to the limit beyond it
+        exposure = self.max_exposure * self.equity
+        for currency, direction in ((self._base[index], sign), (self._quote[index], -sign)):
+            lots = (exposure - direction * self.exposure[currency]) / lot_notional
+            if lots < room:
+                room, limit = lots, "currency exposure"
+        lots = self.max_correlated_lots - sign * (self._correlation[index] @ self.lots)
+        if lots < room:
+            room, limit = lots, "correlated lots"
+        return max(room, 0.0), limit
+
+    def check(self, symbol, action, volume, price):
+        """Name of the limit an order of ``volume`` lots at ``price`` breaks, or None."""
+        room, limit = self.headroom(symbol, action, price)
+        return limit if volume > room + 1e-9 else None
+
+    def approve(self, symbol, action, sl_pips, tick=None):
+        """Size an order for ``symbol`` and fit it to the limits; an allowed order is reserved until ``settle``.
+
+        The volume is the risk-based size, reduced to what the limits leave
+        room for; the order is refused only if that is below the minimum lot.
+        """
+        if self._account_at is None or time.monotonic() - self._account_at > self.account_ttl:
+            self.refresh_account()
+        if self._index(symbol) is None:
+            return RiskDecision(False, symbol, action, 0.0, "unknown symbol", None)
+        volume = self.size(symbol, sl_pips)
+        if not volume:
+            return RiskDecision(False, symbol, action, 0.0, "below minimum volume", None)
+        if tick is None:
+            tick = self.mt5.symbol_info_tick(symbol)
+            if tick is None:
+                return RiskDecision(False, symbol, action, volume, "no tick", None)
+        price = tick.ask if action == 'buy' else tick.bid
+
+        index = self._symbol_index[symbol]
+        with self._lock:
+            room, limit = self.headroom(symbol, action, price)
+            if room < volume:
+                fitted = self._round(self._specs[index], room)
+                if not fitted:
+                    return RiskDecision(False, symbol, action, volume, limit, None)
+                log.debug("Order reduced by risk limits", symbol=symbol, action=action,
+                          sized=volume, volume=fitted, limit=limit)
+                volume = fitted
+            key = ('reserved', next(self._reservations))
+            self._add(key, index, action, volume, price)
+        return RiskDecision(True, symbol, action, volume, None, key)
+
+    def settle(self, decision, report):
+        """Release ``decision``'s reservation and book the fill from the ExecutionReport, if any."""
+        with self._lock:
+            self._remove(decision.reservation)
+            if report is not None and report.ticket and report.ticket not in self._entries:
+                self._add(report.ticket, self._symbol_index[decision.symbol], decision.action,
+                          decision.volume, report.fill_price)
+
+    # --- incremental updates ------------------------------------------------
+
+    def _add(self, key, index, action, volume, price):
+        sign = 1.0 if action == 'buy' else -1.0
+        notional = sign * volume * self._contract[index] * price * self._quote_rate[index]
+        margin = abs(notional) / self.leverage
+        self.lots[index] += sign * volume
+        self.counts[index] += 1
+        self.exposure[self._base[index]] += notional
+        self.exposure[self._quote[index]] -= notional
+        self.margin += margin
+        self._entries[key] = (index, sign * volume, notional, margin)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        index, lots, notional, margin = entry
+        self.lots[index] -= lots
+        self.counts[index] -= 1
+        self.exposure[self._base[index]] -= notional
+        self.exposure[self._quote[index]] += notional
+        self.margin -= margin
+
+    def _add_position(self, position):
+        index = self._index(position.symbol)
+        if index is None:
+            log.warning("Position on an unknown symbol is not counted", symbol=position.symbol,
+                        ticket=position.ticket)
+            return
+        action = 'buy' if position.type == self.mt5.ORDER_TYPE_BUY else 'sell'
+        with self._lock:
+            self._remove(position.ticket)
+            self._add(position.ticket, index, action, position.volume, position.price_open)
+
+    def on_event(self, event):
+        """PositionBook listener: count positions opened, resized or closed outside ``settle``."""
+        if event.kind == 'opened':
+            # Already booked when this engine's own order filled
+            if event.ticket not in self._entries:
+                self._add_position(event.position)
+        elif event.kind == 'modified':
+            if event.position.volume != event.previous.volume:
+                self._add_position(event.position)
+        elif event.kind == 'closed':
+            with self._lock:
+                self._remove(event.ticket)
+
+    def summary(self):
+        """Current usage against each limit."""
+        return {
+            "equity": self.equity,
+            "margin_usage": float(self.margin / self.equity) if self.equity else 0.0,
+            "exposure": {currency: float(self.exposure[index])
+                         for currency, index in self._currency_index.items()},
+            "lots": {spec.name: float(self.lots[index]) for index, spec in enumerate(self._specs)},
+        }
@@ -0,0 +1,334 @@
+import copy
+
+import numpy as np
+
+
+def as_expr(value):
+    return value if isinstance(value, Expr) else Const(value)
+
+
+class Expr:
+    """Node of a declarative signal rule; evaluates over whole column arrays.
+
+    Build rules from ``Col`` with comparisons, arithmetic, ``shift`` and the
+    condition operators ``&``, ``|``, ``~``, then hand the buy/sell
+    conditions to ``SignalRules``. ``key`` identifies the node structurally,
+    so identical sub-expressions are evaluated once.
+    """
+
+    def __init__(self, key, children=(), depth=0):
+        self.key = key
+        self.children = tuple(children)
+        # Bars of history needed before the current one
+        self.depth = max([depth] + [child.depth for child in self.children])
+
+    def apply(self, columns, *values):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return self.key
+
+    def _compare(self, other, func, symbol):
+        other = as_expr(other)
+        return Compare(f"{self!r} {symbol} {other!r}", (self, other), func)
+
+    def __gt__(self, other):
+        return self._compare(other, np.greater, '>')
+
+    def __ge__(self, other):
+        return self._compare(other, np.greater_equal, '>=')
+
+    def __lt__(self, other):
+        return self._compare(other, np.less, '<')
+
+    def __le__(self, other):
+        return self._compare(other, np.less_equal, '<=')
+
+    def _arithmetic(self, other, func, symbol, reflected=False):
+        left, right = (as_expr(other), self) if reflected else (self, as_expr(other))
+        return Arithmetic(f"({left!r} {symbol} {right!r})", (left, right), func)
+
+    def __add__(self, other):
+        return self._arithmetic(other, np.add, '+')
+
+    def __radd__(self, other):
+        return self._arithmetic(other, np.add, '+', reflected=True)
+
+    def __sub__(self, other):
+        return self._arithmetic(other, np.subtract, '-')
+
+    def __rsub__(self, other):
+        return self._arithmetic(other, np.subtract, '-', reflected=True)
+
+    def __mul__(self, other):
+        return self._arithmetic(other, np.multiply, '*')
+
+    def __rmul__(self, other):
+        return self._arithmetic(other, np.multiply, '*', reflected=True)
+
+    def __truediv__(self, other):
+        return self._arithmetic(other, np.divide, '/')
+
+    def __rtruediv__(self, other):
+        return self._arithmetic(other, np.divide, '/', reflected=True)
+
+    def shift(self, bars=1):
+        """The value ``bars`` bars ago (NaN, or False for conditions, before the first bar)."""
+        return Shift(self, bars)
+
+
+class Col(Expr):
+    def __init__(self, name):
+        super().__init__(name)
+        self.name = name
+
+    def apply(self, columns):
+        return columns[self.name]
+
+
+class Const(Expr):
+    def __init__(self, value):
+        super().__init__(repr(value))
+        self.value = value
+
+    def apply(self, columns):
+        return self.value
+
+
+class Arithmetic(Expr):
+    def __init__(self, key, children, func):
+        super().__init__(key, children)
+        self.func = func
+
+    def apply(self, columns, left, right):
+        return self.func(left, right)
+
+
+class Shift(Expr):
+    def __init__(self, expr, bars):
+        if bars < 1:
+            raise ValueError("shift needs a positive number of bars")
+        super().__init__(f"{expr!r}[{bars}]", (expr,), expr.depth + bars)
+        self.bars = bars
+
+    def apply(self, columns, values):
+        values = np.asarray(values)
+        if values.ndim == 0:
+            return values
+        fill = False if values.dtype == bool else np.nan
+        shifted = np.full(values.shape, fill, dtype=bool if fill is False else float)
+        # Bars run along the last axis, so a (symbols, bars) batch shifts each row
+        shifted[..., self.bars:] = values[..., :-self.bars]
+        return shifted
+
+
+class Condition(Expr):
+    """Boolean node; ``label`` is how ``SignalRules.failed`` reports it."""
+
+    def __init__(self, key, children=(), depth=0):
+        super().__init__(key, children, depth)
+        self.label = key
+
+    def __and__(self, other):
+        return AllOf((self, other))
+
+    def __or__(self, other):
+        return AnyOf((self, other))
+
+    def __invert__(self):
+        return Not(self)
+
+    def named(self, label):
+        """Same condition reported as ``label``."""
+        named = copy.copy(self)
+        named.label = label
+        return named
+
+    def within(self, bars):
+        """True if the condition held on any of the last ``bars`` bars (lookback)."""
+        return Within(self, bars)
+
+    def terms(self):
+        """The conjunction's parts, for reporting which ones failed."""
+        return [self]
+
+
+class Compare(Condition):
+    def __init__(self, key, children, func):
+        super().__init__(key, children)
+        self.func = func
+
+    def apply(self, columns, left, right):
+        # Comparisons with NaN (missing history) are False, as with pandas rows
+        return self.func(left, right)
+
+
+class AllOf(Condition):
+    def __init__(self, conditions):
+        parts = []
+        for condition in conditions:
+            parts.extend(condition.children if type(condition) is AllOf else [condition])
+        super().__init__("(" + " & ".join(map(repr, parts)) + ")", parts)
+
+    def apply(self, columns, *values):
+        result = values[0]
+        for value in values[1:]:
+            result = np.logical_and(result, value)
+        return result
+
+    def terms(self):
+        return [term for child in self.children for term in child.terms()]
+
+
+class AnyOf(Condition):
+    def __init__(self, conditions):
+        parts = []
+        for condition in conditions:
+            parts.extend(condition.children if type(condition) is AnyOf else [condition])
+        super().__init__("(" + " | ".join(map(repr, parts)) + ")", parts)
+
+    def apply(self, columns, *values):
+        result = values[0]
+        for value in values[1:]:
+            result = np.logical_or(result, value)
+        return result
+
+
+class Not(Condition):
+    def __init__(self, condition):
+        super().__init__(f"~{condition!r}", (condition,))
+
+    def apply(self, columns, value):
+        return np.logical_not(value)
+
+
+class Within(Condition):
+    def __init__(self, condition, bars):
+        if bars < 1:
+            raise ValueError("within needs at least one bar")
+        super().__init__(f"within({condition!r}, {bars})", (condition,), condition.depth + bars - 1)
+        self.bars = bars
+
+    def apply(self, columns, value):
+        value = np.asarray(value)
+        if value.ndim == 0:
+            return value
+        # Count of true bars in each trailing window from one cumulative sum
+        counts = np.cumsum(value, axis=-1, dtype=np.int64)
+        counts[..., self.bars:] -= counts[..., :-self.bars].copy()
+        return counts > 0
+
+
+def crosses_above(a, b):
+    """``a`` is above ``b`` now and was at or below it on the previous bar."""
+    a, b = as_expr(a), as_expr(b)
+    return (a > b) & (a.shift(1) <= b.shift(1))
+
+
+def crosses_below(a, b):
+    """``a`` is below ``b`` now and was at or above it on the previous bar."""
+    a, b = as_expr(a), as_expr(b)
+    return (a < b) & (a.shift(1) >= b.shift(1))
+
+
+class _Program:
+    """Expression DAG flattened into steps, shared sub-expressions computed once."""
+
+    def __init__(self, roots):
+        self.steps = []
+        index = {}
+
+        def visit(node):
+            position = index.get(node.key)
+            if position is None:
+                args = tuple(visit(child) for child in node.children)
+                position = index[node.key] = len(self.steps)
+                self.steps.append((node.apply, args))
+            return position
+
+        self.outputs = [visit(root) for root in roots]
+
+    def run(self, columns, shape):
+        values = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for apply, args in self.steps:
+                values.append(apply(columns, *(values[i] for i in args)))
+        return [np.broadcast_to(np.asarray(values[i], dtype=bool), shape) for i in self.outputs]
+
+
+class SignalRules:
+    """Buy and sell conditions compiled for vectorized evaluation.
+
+    ``arrays`` evaluates every bar of a frame in one pass (backtests,
+    screening); ``last`` evaluates only the trailing bars the rules look
+    back over, for the live bar. Both read the columns by name from a
+    DataFrame or any mapping of arrays. ``evaluate`` also takes 2-D
+    (symbols, bars) columns and evaluates a whole batch of symbols at once.
+    """
+
+    def __init__(self, buy, sell):
+        self.buy = buy
+        self.sell = sell
+        self.depth = max(buy.depth, sell.depth)
+        self.columns = sorted(self._columns([buy, sell]))
+        self._signals = _Program([buy, sell])
+        self._terms = {'buy': buy.terms(), 'sell': sell.terms()}
+        self._explain = _Program(self._terms['buy'] + self._terms['sell'])
+
+    @staticmethod
+    def _columns(nodes):
+        names = set()
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, Col):
+                names.add(node.name)
+            nodes.extend(node.children)
+        return names
+
+    def _columns_of(self, df, tail=None):
+        columns = {}
+        for name in self.columns:
+            values = df[name]
+            # Series.to_numpy is much cheaper than np.asarray on a Series
+            values = values.to_numpy(dtype=float) if hasattr(values, 'to_numpy') \
+                else np.asarray(values, dtype=float)
+            columns[name] = values if tail is None else values[..., -tail:]
+        return columns
+
+    def evaluate(self, columns):
+        """(buy, sell) boolean arrays for column arrays of one shape (bars on the last axis)."""
+        columns = self._columns_of(columns)
+        shape = np.broadcast_shapes(*(values.shape for values in columns.values()))
+        buy, sell = self._signals.run(columns, shape)
+        return np.array(buy), np.array(sell)
+
+    def evaluate_terms(self, columns):
+        """{'buy': [...], 'sell': [...]}: one boolean array per condition term, shaped like ``evaluate``."""
+        columns = self._columns_of(columns)
+        shape = np.broadcast_shapes(*(values.shape for values in columns.values()))
+        values = self._explain.run(columns, shape)
+        split = len(self._terms['buy'])
+        return {'buy': values[:split], 'sell': values[split:]}
+
+    def arrays(self, df):
+        """Boolean (buy, sell) arrays with the signal for every bar."""
+        buy, sell = self._signals.run(self._columns_of(df), (len(df),))
+        return np.array(buy), np.array(sell)
+
+    def last(self, df):
+        """(buy, sell) booleans for the last bar; False on an empty frame."""
+        if len(df) == 0:
+            return False, False
+        columns = self._columns_of(df, self.depth + 1)
+        buy, sell = self._signals.run(columns, (min(len(df), self.depth + 1),))
+        return bool(buy[-1]), bool(sell[-1])
+
+    def failed(self, df, side):
+        """Labels of the ``side`` ('buy' or 'sell') conditions false on the last bar."""
+        if len(df) == 0:
+            return [term.label for term in self._terms[side]]
+        columns = self._columns_of(df, self.depth + 1)
+        values = self._explain.run(columns, (min(len(df), self.depth + 1),))
+        offset = 0 if side == 'buy' else len(self._terms['buy'])
+        return [term.label for term, value in zip(self._terms[side], values[offset:])
+                if not value[-1]]
@@ -0,0 +1,254 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from core.broker import get_backend
+from core.data import MarketData, timeframe_seconds
+from core.execution import ExecutionEngine
+from core.order import OrderManager
+from core.positions import PositionBook
+from core.streaming import stateful_indicators
+from core.timeframes import MultiTimeframeData
+from utils.log import get_logger
+from utils.metrics import Metrics
+
+log = get_logger("scheduler")
+
+
+class Pipeline:
+    """One (symbol, timeframe, strategy) unit driven by the scheduler."""
+
+    def __init__(self, symbol, timeframe, strategy, lot_size, tp_pips, sl_pips, num_bars=100,
+                 buffer_size=None, backend=None, store=None, symbols=None, deviation=50,
+                 timeframes=(), bar_series=False):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.strategy = strategy
+        self.num_bars = num_bars
+        self.period = timeframe_seconds(timeframe)
+        # Strategies get a core.bars.BarSeries rather than a DataFrame each cycle
+        self.bar_series = bar_series
+        if timeframes:
+            # Higher timeframes are resampled from this pipeline's bars for the strategy
+            self.data = MultiTimeframeData(symbol, timeframe, timeframes, buffer_size,
+                                           backend=backend, store=store)
+            strategy.data = self.data
+        else:
+            self.data = MarketData(symbol, timeframe, buffer_size, backend=backend, store=store)
+        self.order_manager = OrderManager(
+            symbol, lot_size, tp_pips, sl_pips, backend=backend, symbols=symbols, deviation=deviation)
+
+    def warm_up(self, num_bars):
+        """Run the strategy over stored history so stateful indicators start warm.
+
+        Only streaming indicators keep state; others would compute and discard
+        the series. At most ``num_bars`` are read: the strategy's ``lookback()``
+        plus the live window when it declares one.
+        """
+        store = self.data.store
+        if store is None or stateful_indicators(self.strategy) is None:
+            return 0
+        lookback = self.strategy.lookback()
+        if lookback:
+            num_bars = min(num_bars, lookback + self.num_bars)
+        df = store.read_frame(self.symbol, self.timeframe, count=num_bars)
+        if len(df):
+            self.strategy.calculate_indicators(df)
+        return len(df)
+
+    def next_close(self, now):
+        # Bars open on multiples of the period, so the current bar closes at the next one
+        return (int(now) // self.period + 1) * self.period
+
+    def get_name(self):
+        return f"{self.symbol}/{self.period // 60}m/{self.strategy.get_name()}"
+
+
+class TradingScheduler:
+    """Run many pipelines concurrently on one event loop.
+
+    Each pipeline sleeps until its own bar closes (plus ``close_delay`` so the
+    terminal has registered the new bar), evaluates its strategy on closed bars
+    and places orders. Blocking MT5 calls run on a bounded thread
+    pool so a slow call for one symbol never stalls the others. Stage
+    latencies include the time spent waiting for a free worker.
+    """
+
+    def __init__(self, connection, pipelines, notifier=None, max_workers=4, close_delay=1.0,
+                 backend=None, warmup_bars=0, metrics=None, max_attempts=3, risk=None,
+                 snapshots=None):
+        self.connection = connection
+        self.mt5 = backend or get_backend()
+        self.metrics = metrics or Metrics(enabled=False)
+        self.pipelines = pipelines
+        self.notifier = notifier
+        self.close_delay = close_delay
+        self.warmup_bars = warmup_bars
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mt5")
+        # Orders share the MT5 worker pool, so pipelines with signals execute concurrently
+        self.engine = ExecutionEngine(self.mt5, max_attempts, executor=self.executor)
+        # One book for every symbol, refreshed once per bar close for all the pipelines
+        # due then, so a cycle costs a single positions_get
+        self.book = PositionBook(backend=self.mt5)
+        self.book.subscribe(self._on_book_event)
+        self._book_refresh = None
+        self._book_refreshed_for = None
+        # core.snapshot.SnapshotStore that carries warm state across restarts
+        self.snapshots = snapshots
+        # Shared by every pipeline, so the limits apply to the whole portfolio
+        self.risk = risk
+        if risk is not None:
+            self.book.subscribe(risk.on_event)
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def _notify(self, message):
+        # The notifier queues and sends from its own thread, so this never blocks the loop
+        log.info(message)
+        if self.notifier is not None:
+            self.notifier.send_message(message)
+
+    def _on_book_event(self, event):
+        if event.kind == 'opened':
+            position = event.position
+            self._notify(f"📂 Position opened: {position.symbol} #{position.ticket} "
+                         f"{position.volume:.2f} @ {position.price_open:.5f}")
+        elif event.kind == 'closed':
+            position = event.previous
+            profit = event.deal.profit if event.deal else position.profit
+            self._notify(f"📕 Position closed: {position.symbol} #{position.ticket} "
+                         f"profit {profit:.2f}")
+
+    async def _refresh_book(self, bar_close):
+        # Pipelines waking on the same bar close await the first one's refresh
+        if self._book_refreshed_for != bar_close:
+            self._book_refreshed_for = bar_close
+            self._book_refresh = asyncio.ensure_future(self._call(self.book.refresh))
+        await self._book_refresh
+
+    async def _run_cycle(self, pipeline, bar_close):
+        # Same flow as TradingBot.run: skip while a position is open (unless the risk
+        # engine decides), else look for a signal
+        await self._refresh_book(bar_close)
+        positions = self.book.open_positions(pipeline.symbol)
+        if positions and self.risk is None:
+            log.debug("Open positions, skipping", pipeline=pipeline.get_name(), positions=len(positions))
+            return
+
+        with self.metrics.stage("cycle.fetch_rates"):
+            fetch = pipeline.data.fetch_bars if pipeline.bar_series else pipeline.data.fetch_rates
+            df = await self._call(fetch, pipeline.num_bars, 1)
+        if df is None:
+            return
+
+        with self.metrics.stage("cycle.generate_signals"):
+            buy_signal, sell_signal = await self._call(pipeline.strategy.generate_signals, df)
+        if not (buy_signal or sell_signal):
+            log.info(f"🔍 {pipeline.get_name()}: no signal")
+            return
+
+        action = 'buy' if buy_signal else 'sell'
+        decision = volume = None
+        if self.risk is not None:
+            decision = await self._call(
+                self.risk.approve, pipeline.symbol, action, pipeline.order_manager.sl_pips)
+            if not decision.allowed:
+                log.info("Order blocked by risk limits", pipeline=pipeline.get_name(), action=action,
+                         volume=decision.volume, reason=decision.reason)
+                return
+            volume = decision.volume
+        report = await asyncio.wrap_future(
+            self.engine.submit(pipeline.order_manager, action, volume=volume))
+        if decision is not None:
+            self.risk.settle(decision, report)
+        self.metrics.record("cycle.place_order", report.latency_ms / 1000)
+
+        if report.ticket:
+            self._notify(
+                f"✅ Order Placed Successfully!\n"
+                f"📈 {action.upper()} {pipeline.symbol}\n"
+                f"🎟️ Ticket ID: {report.ticket}\n"
+                f"📐 Slippage: {report.slippage_points} points\n"
+                f"⚡ Execution: {report.latency_ms:.1f} ms ({report.attempts} attempt(s))"
+            )
+        else:
+            self._notify(
+                f"❌ Order Placement Failed!\n"
+                f"📈 {action.upper()} {pipeline.symbol}\n"
+                f"🔢 Retcode: {report.retcode} after {report.attempts} attempt(s)\n"
+                f"⚠️ Error: {report.error}"
+            )
+        pipeline.order_manager.flush_log()
+
+    async def _run_pipeline(self, pipeline):
+        while True:
+            bar_close = pipeline.next_close(time.time())
+            await asyncio.sleep(max(0.0, bar_close + self.close_delay - time.time()))
+            try:
+                with self.metrics.stage("cycle"):
+                    await self._run_cycle(pipeline, bar_close)
+            except Exception as e:
+                # Keep the other pipelines and the next bar alive
+                self.metrics.increment("cycle.failures")
+                log.exception("Cycle failed", pipeline=pipeline.get_name(), error=e)
+            if self.snapshots is not None and self.snapshots.due(pipeline.get_name()):
+                # Captured here, between cycles, so the pipeline's state is not changing
+                self.snapshots.capture(pipeline.get_name(), pipeline.strategy, pipeline.data)
+                await self._call(self.snapshots.save)
+            self.metrics.maybe_dump()
+
+    async def run(self):
+        if not await self._call(self.connection.connect):
+            self._notify("❌ Connection failed! Please check your account credentials.")
+            return
+
+        if self.snapshots is not None:
+            await self._call(self.snapshots.load)
+        pipelines = []
+        for pipeline in self.pipelines:
+            if await self._call(self.connection.ensure_symbol, pipeline.symbol):
+                pipelines.append(pipeline)
+                await self._call(pipeline.order_manager.prepare)
+                # A snapshot from the last run is newer than anything the history store has
+                restored = self.snapshots is not None and self.snapshots.restore(
+                    pipeline.get_name(), pipeline.strategy, pipeline.data)
+                if self.warmup_bars and not restored:
+                    await self._call(pipeline.warm_up, self.warmup_bars)
+        if self.risk is not None:
+            await self._call(self.risk.prepare, [pipeline.symbol for pipeline in pipelines])
+
+        self._notify(
+            f"🚀 Trading Bot Started!\n"
+            f"📈 Pipelines: {len(pipelines)}\n" +
+            "\n".join(f"• {pipeline.get_name()}" for pipeline in pipelines)
+        )
+        await asyncio.gather(*(self._run_pipeline(pipeline) for pipeline in pipelines))
+
+    def save_snapshots(self):
+        for pipeline in self.pipelines:
+            try:
+                self.snapshots.capture(pipeline.get_name(), pipeline.strategy, pipeline.data)
+            except Exception as e:
+                # A pipeline stopped mid-cycle can leave state that does not pickle
+                log.warning("Snapshot capture failed", pipeline=pipeline.get_name(), error=e)
+        self.snapshots.save()
+
+    def start(self):
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            stop_message = "🛑 Bot stopped by user. Goodbye! 👋"
+            log.info(stop_message)
+            if self.notifier is not None:
+                self.notifier.send_message(stop_message)
+        finally:
+            if self.snapshots is not None:
+                self.save_snapshots()
+            self.connection.disconnect()
+            self.executor.shutdown(wait=False)
+            if self.notifier is not None:
+                self.notifier.close()
+            self.metrics.close()
@@ -0,0 +1,151 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.bars import values_of
+from core.broker import get_backend
+from core.data import MarketData
+from utils.log import get_logger
+
+log = get_logger("screener")
+
+
+# One ranked symbol. action is 'buy'/'sell' for a signal on the last closed bar, else the side
+# closer to one; strength is the fraction of that side's conditions that hold (1.0 on a signal)
+ScreenResult = namedtuple(
+    'ScreenResult', 'symbol action signal strength adx spread_points spread_ratio score')
+
+
+class MarketScreener:
+    """Rank every symbol on the account by a strategy's signal on the last closed bar.
+
+    The universe comes from one ``symbols_get`` call (optionally an MT5
+    ``group`` filter such as ``"*USD*,!*JPY*"``), which also supplies the
+    current spreads. Bars are fetched on a thread pool, indicators are
+    computed per symbol and the strategy's ``SignalRules`` are then evaluated
+    for all symbols of a window length in one vectorized pass. Symbols are
+    ranked signals first, then by
+
+        score = strength + adx_weight * min(adx / 50, 1) - spread_weight * spread_ratio
+
+    where ``spread_ratio`` is the spread over the mean bar range, so spreads
+    compare across instruments with different prices and point sizes.
+    """
+
+    def __init__(self, strategy, timeframe, num_bars=100, backend=None, group=None,
+                 max_workers=16, buffer_size=None, adx_weight=0.5, spread_weight=1.0,
+                 max_spread_ratio=None, adx_column='adx'):
+        if strategy.rules is None:
+            raise ValueError(f"{strategy.get_name()} declares no rules to screen with.")
+        self.strategy = strategy
+        self.timeframe = timeframe
+        self.num_bars = num_bars
+        self.mt5 = backend or get_backend()
+        self.group = group
+        self.buffer_size = buffer_size
+        self.adx_weight = adx_weight
+        self.spread_weight = spread_weight
+        # Symbols whose spread is more than this fraction of the mean bar range are left out
+        self.max_spread_ratio = max_spread_ratio
+        self.adx_column = adx_column
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screener")
+        # One MarketData per symbol, so a buffered fetch only asks for new bars on the next scan
+        self._data = {}
+
+    def universe(self):
+        """{name: SymbolInfo} for every symbol the account offers (within ``group``)."""
+        infos = self.mt5.symbols_get(group=self.group) if self.group else self.mt5.symbols_get()
+        if infos is None:
+            log.error("Failed to list symbols", error=self.mt5.last_error())
+            return {}
+        return {info.name: info for info in infos}
+
+    def _fetch(self, symbol):
+        data = self._data.get(symbol)
+        if data is None:
+            data = self._data[symbol] = MarketData(
+                symbol, self.timeframe, self.buffer_size, backend=self.mt5)
+        # start_pos=1: closed bars only. Each symbol's BarSeries (and its indicator
+        # columns) is reused by the next scan
+        bars = data.fetch_bars(self.num_bars, 1)
+        if bars is None and self.mt5.symbol_select(symbol, True):
+            # Symbols outside Market Watch have no history until they are selected
+            bars = data.fetch_bars(self.num_bars, 1)
+        return bars
+
+    def fetch(self, symbols):
+        """{symbol: BarSeries} of the latest closed bars, fetched concurrently."""
+        frames = {}
+        for symbol, df in zip(symbols, self.executor.map(self._fetch, symbols)):
+            if df is not None and len(df) > self.strategy.rules.depth:
+                frames[symbol] = df
+        return frames
+
+    def _score(self, symbols, frames, infos):
+        rules = self.strategy.rules
+        window = rules.depth + 1
+        tail = {name: np.stack([values_of(df, name, float)[-window:] for df in frames])
+                for name in rules.columns}
+        buy, sell = rules.evaluate(tail)
+        terms = rules.evaluate_terms(tail)
+        buy_met = np.mean([term[:, -1] for term in terms['buy']], axis=0)
+        sell_met = np.mean([term[:, -1] for term in terms['sell']], axis=0)
+        buy, sell = buy[:, -1], sell[:, -1]
+
+        signal = buy | sell
+        is_buy = buy | (~sell & (buy_met >= sell_met))
+        strength = np.where(signal, 1.0, np.maximum(buy_met, sell_met))
+        if all(self.adx_column in df for df in frames):
+            adx = np.array([values_of(df, self.adx_column)[-1] for df in frames], dtype=float)
+        else:
+            adx = np.full(len(frames), np.nan)
+        ranges = np.array([(values_of(df, 'high') - values_of(df, 'low')).mean() for df in frames])
+        spread_points = np.array([infos[symbol].spread for symbol in symbols], dtype=float)
+        points = np.array([infos[symbol].point for symbol in symbols], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread_ratio = np.where(ranges > 0, spread_points * points / ranges, np.inf)
+            score = (strength + self.adx_weight * np.nan_to_num(np.minimum(adx / 50, 1.0))
+                     - self.spread_weight * spread_ratio)
+        return [
+            ScreenResult(symbol, 'buy' if is_buy[i] else 'sell', bool(signal[i]),
+                         float(strength[i]), float(adx[i]), int(spread_points[i]),
+                         float(spread_ratio[i]), float(score[i]))
+            for i, symbol in enumerate(symbols)]
+
+    def scan(self, symbols=None):
+        """Ranked ScreenResults for ``symbols`` (default: the whole universe)."""
+        started = time.perf_counter()
+        infos = self.universe()
+        names = [name for name in (symbols or infos) if name in infos]
+        frames = self.fetch(names)
+        fetched = time.perf_counter()
+
+        # Indicators per symbol, then one rules pass per group of equal window length
+        groups = {}
+        for symbol, df in frames.items():
+            df = self.strategy.calculate_indicators(df)
+            group_symbols, group_frames = groups.setdefault(len(df), ([], []))
+            group_symbols.append(symbol)
+            group_frames.append(df)
+        results = []
+        for group_symbols, group_frames in groups.values():
+            results.extend(self._score(group_symbols, group_frames, infos))
+
+        if self.max_spread_ratio is not None:
+            results = [result for result in results if result.spread_ratio <= self.max_spread_ratio]
+        results.sort(key=lambda result: (not result.signal, -result.score))
+        log.info("Screen complete", symbols=len(names), ranked=len(results),
+                 signals=sum(result.signal for result in results),
+                 fetch_ms=round((fetched - started) * 1000, 1),
+                 total_ms=round((time.perf_counter() - started) * 1000, 1))
+        return results
+
+    def candidates(self, results, top=None):
+        """The results with a signal, best first."""
+        signals = [result for result in results if result.signal]
+        return signals if top is None else signals[:top]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,98 @@
+import os
+import pickle
+import time
+
+from core.streaming import stateful_indicators
+from utils.log import get_logger
+
+log = get_logger("snapshot")
+
+VERSION = 1
+
+
+class SnapshotStore:
+    """Warm state saved to disk so a restarted bot trades on its first bar.
+
+    Each entry, keyed by a pipeline name, holds the strategy's streaming
+    indicator state and its data's buffered bar window. ``capture`` pickles
+    an entry straight away, so the copy is consistent even if the objects
+    change before ``save`` writes the file (atomically, via a temporary
+    file). ``restore`` skips entries older than ``max_age`` seconds or taken
+    for a different strategy. The file is a pickle: only load one this bot
+    wrote.
+    """
+
+    def __init__(self, path, interval=300, max_age=86400):
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.entries = {}
+        self._captured_at = {}
+
+    def load(self):
+        """Read the snapshot file; returns the number of entries found."""
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            log.warning("Ignoring unreadable snapshot", path=self.path, error=e)
+            return 0
+        if state.get("version") != VERSION:
+            log.warning("Ignoring snapshot from another version", path=self.path,
+                        version=state.get("version"))
+            return 0
+        if time.time() - state["saved_at"] > self.max_age:
+            log.info("Snapshot too old to restore", path=self.path,
+                     age_s=round(time.time() - state["saved_at"]))
+            return 0
+        self.entries = state["entries"]
+        return len(self.entries)
+
+    def capture(self, name, strategy, data):
+        indicators = stateful_indicators(strategy)
+        self.entries[name] = pickle.dumps({
+            "strategy": strategy.get_name(),
+            "indicators": indicators,
+            "data": data.snapshot(),
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        self._captured_at[name] = time.monotonic()
+
+    def restore(self, name, strategy, data):
+        """Put the saved state for ``name`` back into ``strategy`` and ``data``; True if anything was."""
+        payload = self.entries.get(name)
+        if payload is None:
+            return False
+        entry = pickle.loads(payload)
+        if entry["strategy"] != strategy.get_name():
+            log.info("Snapshot is for another strategy", name=name, saved=entry["strategy"])
+            return False
+        indicators = stateful_indicators(strategy)
+        restored = False
+        if indicators is not None and entry["indicators"] is not None:
+            indicators.__dict__.update(entry["indicators"].__dict__)
+            restored = True
+        restored = data.restore(entry["data"]) or restored
+        if restored:
+            log.info("Restored warm state", name=name)
+        return restored
+
+    def due(self, name):
+        captured = self._captured_at.get(name)
+        return captured is None or time.monotonic() - captured >= self.interval
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.path + ".tmp"
+        try:
+            with open(temporary, "wb") as f:
+                pickle.dump({"version": VERSION, "saved_at": time.time(), "entries": self.entries},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            log.error("Failed to save snapshot", path=self.path, error=e)
+            return False
+        return True
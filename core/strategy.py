@@ -1,10 +1,24 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+from core.bars import values_of
+from core.indicators import IndicatorUtils
+from utils.log import get_logger
+
+log = get_logger("strategy")
+
 
 class TradingStrategy(ABC):
     def __init__(self, symbol, timeframe):
         self.symbol = symbol
         self.timeframe = timeframe
+        # Indicator backend; swap for core.streaming.StreamingIndicators to update incrementally
+        self.indicators = IndicatorUtils
+        # core.timeframes.MultiTimeframeData when higher timeframes are configured
+        self.data = None
+        # core.rules.SignalRules declaring the buy/sell conditions, if the strategy uses them
+        self.rules = None
 
     @abstractmethod
     def calculate_indicators(self, df):
@@ -16,6 +30,51 @@ class TradingStrategy(ABC):
         """Generate trading signals based on the provided data."""
         pass
 
+    def lookback(self):
+        """Bars of history the indicators need before their values settle (0 if unknown)."""
+        return 0
+
+    def generate_signal_arrays(self, df):
+        """Return boolean (buy, sell) arrays with the signal for every bar of the data."""
+        if self.rules is None:
+            raise NotImplementedError(
+                f"{self.get_name()} does not support per-bar signal evaluation.")
+        df = self.calculate_indicators(df)
+        return self.rules.arrays(df)
+
+    def generate_signal_batch(self, frames):
+        """Per-bar (buy, sell) arrays for many symbols: ``{symbol: df}`` -> ``{symbol: (buy, sell)}``.
+
+        Indicators are computed per frame; with ``self.rules``, frames of the
+        same length are then stacked and their signals evaluated in one pass.
+        """
+        if self.rules is None:
+            return {symbol: self.generate_signal_arrays(df) for symbol, df in frames.items()}
+
+        by_length = {}
+        for symbol, df in frames.items():
+            df = self.calculate_indicators(df)
+            by_length.setdefault(len(df), []).append((symbol, df))
+
+        signals = {}
+        for group in by_length.values():
+            columns = {name: np.stack([values_of(df, name, float) for _, df in group])
+                       for name in self.rules.columns}
+            buy, sell = self.rules.evaluate(columns)
+            for row, (symbol, _) in enumerate(group):
+                signals[symbol] = (buy[row], sell[row])
+        return signals
+
+    def evaluate_rules(self, df):
+        """(buy, sell) from ``self.rules`` on the last bar, logging the conditions that failed."""
+        buy_signal, sell_signal = self.rules.last(df)
+        for side, signal in (('buy', buy_signal), ('sell', sell_signal)):
+            if not signal:
+                # The failed conditions are only evaluated when debug logging is on
+                log.debug(f"No {side} signal conditions met.", strategy=self.get_name(),
+                          failed=lambda: "; ".join(self.rules.failed(df, side)))
+        return buy_signal, sell_signal
+
     def get_name(self):
         """Return the name of the strategy."""
         return self.__class__.__name__
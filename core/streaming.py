@@ -0,0 +1,421 @@
+import math
+from collections import deque
+from functools import partial
+from itertools import islice
+
+import numpy as np
+
+from core.bars import values_of
+
+
+NAN = float('nan')
+
+
+def _div(numerator, denominator):
+    # Mirror NumPy/pandas float division instead of raising ZeroDivisionError
+    try:
+        return numerator / denominator
+    except ZeroDivisionError:
+        if numerator != numerator or numerator == 0:
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+
+
+def _alpha_from_span(span):
+    # Same conversion pandas applies internally (span -> center of mass -> alpha)
+    com = (span - 1) / 2
+    return 1. / (1. + com)
+
+
+def _alpha_from_alpha(alpha):
+    com = (1 - alpha) / alpha
+    return 1. / (1. + com)
+
+
+def _ewm_step(state, value, alpha):
+    """One step of pandas' ewm(adjust=False).mean(); state is (weighted, old_wt)."""
+    if state is None:
+        return (value, 1.)
+    weighted, old_wt = state
+    if weighted == weighted:
+        old_wt *= 1. - alpha
+        if value == value:
+            # Pandas skips the update on constant series to avoid rounding drift
+            if weighted != value:
+                weighted = old_wt * weighted + alpha * value
+                weighted /= (old_wt + alpha)
+            old_wt = 1.
+    elif value == value:
+        weighted = value
+    return (weighted, old_wt)
+
+
+class _RollingMean:
+    """Fixed-window rolling mean reproducing pandas' Kahan-compensated kernel."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.count = 0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.consecutive = 0
+        self.prev_value = NAN
+
+    def _state(self):
+        return (self.count, self.nobs, self.neg_ct, self.sum_x, self.compensation_add,
+                self.compensation_remove, self.consecutive, self.prev_value)
+
+    def _restore(self, state):
+        (self.count, self.nobs, self.neg_ct, self.sum_x, self.compensation_add,
+         self.compensation_remove, self.consecutive, self.prev_value) = state
+
+    def _add(self, value):
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct += 1
+            if value == self.prev_value:
+                self.consecutive += 1
+            else:
+                self.consecutive = 1
+            self.prev_value = value
+
+    def _remove(self, value):
+        if value == value:
+            self.nobs -= 1
+            y = -value - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct -= 1
+
+    def push(self, value):
+        """Append a value and return (snapshot, evicted) so the step can be undone."""
+        snapshot = self._state()
+        evicted = None
+        if self.count == 0 or self.window == 1:
+            # Pandas re-initialises the window whenever it does not overlap the previous one
+            self.prev_value = value
+            self.consecutive = 0
+            self.sum_x = self.compensation_add = self.compensation_remove = 0.
+            self.nobs = 0
+            if self.values:
+                evicted = self.values.popleft()
+        elif len(self.values) == self.window:
+            evicted = self.values.popleft()
+            self._remove(evicted)
+        self.values.append(value)
+        self._add(value)
+        self.count += 1
+        return snapshot, evicted
+
+    def undo(self, snapshot, evicted):
+        """Revert the most recent push."""
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+        self._restore(snapshot)
+
+    def mean(self, min_periods=None):
+        min_periods = self.window if min_periods is None else min_periods
+        if self.nobs >= min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.consecutive >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.
+            return result
+        return NAN
+
+
+class StreamingIndicator:
+    """Base class for indicators updated one bar at a time.
+
+    ``update`` appends a new bar, ``amend`` replaces the most recent bar (the
+    still-forming candle). Feeding bars 0..n reproduces the value the batch
+    ``IndicatorUtils`` function would put in row n for the same history.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._prev = None
+        self.value = None
+
+    def _step(self, state, *inputs):
+        raise NotImplementedError
+
+    def update(self, *inputs):
+        self._prev = self._state
+        self._state, self.value = self._step(self._prev, *inputs)
+        return self.value
+
+    def amend(self, *inputs):
+        self._state, self.value = self._step(self._prev, *inputs)
+        return self.value
+
+    def warm(self, *columns):
+        """Feed whole input columns (e.g. ``df['close']``) bar by bar."""
+        for row in zip(*columns):
+            self.update(*row)
+        return self.value
+
+
+class StreamingEMA(StreamingIndicator):
+    def __init__(self, period=None, alpha=None):
+        super().__init__()
+        self.alpha = _alpha_from_span(period) if alpha is None else _alpha_from_alpha(alpha)
+
+    def _step(self, state, close):
+        state = _ewm_step(state, close, self.alpha)
+        return state, state[0]
+
+
+class _RollingIndicator(StreamingIndicator):
+    """Indicators backed by rolling windows undo their last push on amend."""
+
+    def __init__(self):
+        super().__init__()
+        self._undo = None
+
+    def update(self, *inputs):
+        self._prev = self._state
+        self._undo = None
+        self._state, self.value = self._step(self._prev, *inputs)
+        return self.value
+
+    def amend(self, *inputs):
+        if self._undo is not None:
+            for window, (snapshot, evicted) in self._undo:
+                window.undo(snapshot, evicted)
+        self._undo = None
+        self._state, self.value = self._step(self._prev, *inputs)
+        return self.value
+
+    def _push(self, window, value):
+        if self._undo is None:
+            self._undo = []
+        self._undo.append((window, window.push(value)))
+
+
+class StreamingSMA(_RollingIndicator):
+    def __init__(self, period):
+        super().__init__()
+        self.window = _RollingMean(period)
+
+    def _step(self, state, close):
+        self._push(self.window, close)
+        return state, self.window.mean()
+
+
+class StreamingRSI(_RollingIndicator):
+    """RSI over rolling-mean gains/losses, or Wilder smoothing when ``wilder=True``."""
+
+    def __init__(self, period, wilder=False):
+        super().__init__()
+        self.period = period
+        self.wilder = wilder
+        self.alpha = _alpha_from_alpha(1 / period)
+        self.gains = _RollingMean(period)
+        self.losses = _RollingMean(period)
+
+    def _step(self, state, close):
+        # state: (previous close, gain ewm state, loss ewm state)
+        prev_close, gain_state, loss_state = state if state is not None else (NAN, None, None)
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.
+        loss = -(delta if delta < 0 else 0.)
+
+        if self.wilder:
+            gain_state = _ewm_step(gain_state, gain, self.alpha)
+            loss_state = _ewm_step(loss_state, loss, self.alpha)
+            avg_gain, avg_loss = gain_state[0], loss_state[0]
+        else:
+            self._push(self.gains, gain)
+            self._push(self.losses, loss)
+            avg_gain, avg_loss = self.gains.mean(), self.losses.mean()
+
+        rs = avg_gain / (1 if avg_loss == 0 else avg_loss)
+        ratio = 100 / (1 + rs)
+        rsi = 100 - (0 if ratio != ratio else ratio)
+        return (close, gain_state, loss_state), rsi
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD returning (line, signal, histogram)."""
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        super().__init__()
+        self.fast_alpha = _alpha_from_span(fast_period)
+        self.slow_alpha = _alpha_from_span(slow_period)
+        self.signal_alpha = _alpha_from_span(signal_period)
+
+    def _step(self, state, close):
+        fast, slow, signal = state if state is not None else (None, None, None)
+        fast = _ewm_step(fast, close, self.fast_alpha)
+        slow = _ewm_step(slow, close, self.slow_alpha)
+        line = fast[0] - slow[0]
+        signal = _ewm_step(signal, line, self.signal_alpha)
+        return (fast, slow, signal), (line, signal[0], line - signal[0])
+
+
+class StreamingADX(StreamingIndicator):
+    def __init__(self, period=14):
+        super().__init__()
+        self.alpha = _alpha_from_span(period)
+
+    def _step(self, state, high, low, close):
+        if state is None:
+            prev_high = prev_low = prev_close = NAN
+            tr_state = plus_state = minus_state = dx_state = None
+        else:
+            (prev_high, prev_low, prev_close,
+             tr_state, plus_state, minus_state, dx_state) = state
+
+        # True Range; the close-based legs are missing on the first bar
+        ranges = [r for r in (high - low, abs(high - prev_close), abs(low - prev_close)) if r == r]
+        tr = max(ranges) if ranges else NAN
+
+        plus_dm = high - prev_high
+        minus_dm = -(low - prev_low)
+        if plus_dm < 0:
+            plus_dm = 0.
+        if minus_dm < 0:
+            minus_dm = 0.
+
+        alpha = self.alpha
+        tr_state = _ewm_step(tr_state, tr, alpha)
+        plus_state = _ewm_step(plus_state, plus_dm, alpha)
+        minus_state = _ewm_step(minus_state, minus_dm, alpha)
+
+        plus_di = 100 * _div(plus_state[0], tr_state[0])
+        minus_di = 100 * _div(minus_state[0], tr_state[0])
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        dx_state = _ewm_step(dx_state, dx, alpha)
+
+        return ((high, low, close, tr_state, plus_state, minus_state, dx_state),
+                dx_state[0])
+
+
+class _IndicatorFeed:
+    """Tracks which bars of a DataFrame an indicator has already consumed."""
+
+    def __init__(self, factory, history):
+        self.factory = factory
+        self.indicator = factory()
+        self.outputs = deque(maxlen=history)
+        self.last_time = None
+
+    def sync(self, times, inputs):
+        n = len(times)
+        if n > self.outputs.maxlen:
+            # Keep an output for every row of a frame longer than the history
+            self.outputs = deque(self.outputs, maxlen=n)
+        start = 0
+        if self.last_time is not None:
+            start = int(np.searchsorted(times, self.last_time))
+            if start < n and times[start] == self.last_time:
+                # The last bar we saw may still have been forming; recompute it
+                self.outputs[-1] = self.indicator.amend(*(float(column[start]) for column in inputs))
+                start += 1
+            else:
+                # Gap larger than the window: start over from this DataFrame
+                self.indicator = self.factory()
+                self.outputs.clear()
+                start = 0
+        for i in range(start, n):
+            self.outputs.append(self.indicator.update(*(float(column[i]) for column in inputs)))
+        self.last_time = times[-1]
+
+    def tail(self, n):
+        values = list(islice(self.outputs, max(len(self.outputs) - n, 0), None))
+        return [None] * (n - len(values)) + values
+
+
+def stateful_indicators(strategy):
+    """The strategy's StreamingIndicators (through a utils.metrics proxy), else None."""
+    indicators = getattr(strategy.indicators, '_target', strategy.indicators)
+    return indicators if isinstance(indicators, StreamingIndicators) else None
+
+
+class StreamingIndicators:
+    """Drop-in replacement for ``IndicatorUtils`` backed by streaming state.
+
+    Assign an instance to ``strategy.indicators``. The first call warms each
+    indicator from the whole DataFrame; later calls only consume bars newer
+    than the last one seen (amending that bar in place), so the per-cycle
+    cost no longer grows with the window size. DataFrames (or BarSeries) must
+    carry the ``time`` column produced by ``MarketData.fetch_rates``. Each
+    indicator keeps its last ``history`` outputs, growing to the longest frame
+    it has been given so every row is filled. Instances pickle (see
+    core.snapshot), so the state survives a restart.
+    """
+
+    def __init__(self, history=1000):
+        self.history = history
+        self._feeds = {}
+
+    def _sync(self, key, factory, df, inputs):
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = _IndicatorFeed(factory, self.history)
+        feed.sync(values_of(df, 'time'), [values_of(df, column, float) for column in inputs])
+        return feed.tail(len(df))
+
+    @staticmethod
+    def _column(values, fill=None):
+        column = np.array([NAN if v is None else v for v in values], dtype=float)
+        if fill is not None:
+            column[np.isnan(column)] = fill
+        return column
+
+    def reset(self):
+        self._feeds.clear()
+
+    def calculate_ema(self, df, period, column_name="ema"):
+        """Calculate Exponential Moving Average (EMA) for a given period."""
+        values = self._sync((column_name, 'ema', period),
+                            partial(StreamingEMA, period), df, ['close'])
+        df[column_name] = self._column(values, fill=0)
+        return df
+
+    def calculate_sma(self, df, period, column_name="sma"):
+        """Calculate Simple Moving Average (SMA) for a given period."""
+        values = self._sync((column_name, 'sma', period),
+                            partial(StreamingSMA, period), df, ['close'])
+        df[column_name] = self._column(values, fill=0)
+        return df
+
+    def calculate_rsi(self, df, period, column_name="rsi"):
+        """Calculate Relative Strength Index (RSI) for a given period."""
+        values = self._sync((column_name, 'rsi', period),
+                            partial(StreamingRSI, period), df, ['close'])
+        df[column_name] = self._column(values)
+        return df
+
+    def calculate_macd(self, df, fast_period=12, slow_period=26, signal_period=9, macd_column="macd"):
+        """Calculate MACD with customizable column names."""
+        values = self._sync((macd_column, 'macd', fast_period, slow_period, signal_period),
+                            partial(StreamingMACD, fast_period, slow_period, signal_period),
+                            df, ['close'])
+        values = [(None, None, None) if v is None else v for v in values]
+        for offset, suffix in enumerate(('line', 'signal', 'histogram')):
+            df[f'{macd_column}_{suffix}'] = self._column([v[offset] for v in values])
+        return df
+
+    def calculate_adx(self, df, period=14, column_name='adx'):
+        """Calculate the Average Directional Index (ADX) for a given period."""
+        values = self._sync((column_name, 'adx', period),
+                            partial(StreamingADX, period), df, ['high', 'low', 'close'])
+        df[column_name] = self._column(values)
+        return df
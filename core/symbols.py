@@ -0,0 +1,74 @@
+import time
+from collections import namedtuple
+
+from core.broker import get_backend
+from utils.log import get_logger
+
+log = get_logger("symbols")
+
+
+# The parts of symbol_info needed to build and validate an order
+SymbolSpec = namedtuple(
+    'SymbolSpec', 'name point digits stops_level volume_min volume_max volume_step filling_mode '
+                  'contract_size currency_base currency_profit loaded_at')
+
+
+class SymbolCache:
+    """Symbol specifications fetched once per session and shared by every order.
+
+    Entries are refreshed after ``ttl`` seconds, or straight away when an
+    order is rejected with a retcode that means the cached spec is out of date
+    (volume or stops no longer accepted). An unsupported filling mode is not
+    one of them: ``ExecutionEngine`` falls back to the next mode instead.
+    """
+
+    def __init__(self, backend=None, ttl=3600):
+        self.mt5 = backend or get_backend()
+        self.ttl = ttl
+        self.specs = {}
+        self.stale_retcodes = {
+            self.mt5.TRADE_RETCODE_INVALID,
+            self.mt5.TRADE_RETCODE_INVALID_VOLUME,
+            self.mt5.TRADE_RETCODE_INVALID_STOPS,
+        }
+
+    def refresh(self, symbol):
+        """Fetch the spec from the terminal, selecting the symbol if it is not in Market Watch."""
+        info = self.mt5.symbol_info(symbol)
+        if info is None:
+            if not self.mt5.symbol_select(symbol, True):
+                log.error("Symbol not available", symbol=symbol)
+                return None
+            info = self.mt5.symbol_info(symbol)
+            if info is None:
+                log.error("Symbol not found", symbol=symbol)
+                return None
+        spec = SymbolSpec(
+            info.name, info.point, info.digits, info.trade_stops_level, info.volume_min,
+            info.volume_max, info.volume_step, info.filling_mode, info.trade_contract_size,
+            info.currency_base, info.currency_profit, time.monotonic())
+        self.specs[symbol] = spec
+        return spec
+
+    def load(self, symbols):
+        """Load every traded symbol up front; returns the ones that are available."""
+        return [symbol for symbol in symbols if self.refresh(symbol) is not None]
+
+    def get(self, symbol):
+        spec = self.specs.get(symbol)
+        if spec is None or time.monotonic() - spec.loaded_at > self.ttl:
+            return self.refresh(symbol)
+        return spec
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self.specs.clear()
+        else:
+            self.specs.pop(symbol, None)
+
+    def handle_retcode(self, symbol, retcode):
+        """Drop the cached spec if ``retcode`` says it no longer matches the broker."""
+        if retcode in self.stale_retcodes:
+            self.invalidate(symbol)
+            return True
+        return False
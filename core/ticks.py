@@ -0,0 +1,226 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from core.broker import get_backend
+from core.history import BAR_DTYPE
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+pd = lazy_import("pandas")
+
+log = get_logger("ticks")
+
+
+class SpreadTracker:
+    """Running spread statistics (in price units) updated on every tick."""
+
+    def __init__(self, ewma_span=100):
+        self.alpha = 2 / (ewma_span + 1)
+        self.count = 0
+        self.last = None
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.ewma = None
+        self._m2 = 0.0
+
+    def update(self, spread):
+        self.count += 1
+        self.last = spread
+        self.min = min(self.min, spread)
+        self.max = max(self.max, spread)
+        # Welford's update keeps mean and variance stable over long sessions
+        delta = spread - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (spread - self.mean)
+        self.ewma = spread if self.ewma is None else self.ewma + self.alpha * (spread - self.ewma)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        return {"count": self.count, "last": self.last, "mean": self.mean, "std": self.std,
+                "min": self.min, "max": self.max, "ewma": self.ewma}
+
+
+class TickStream:
+    """Poll ``copy_ticks_from`` for ticks newer than the last one delivered.
+
+    MT5 only filters by whole seconds, so ticks sharing the last delivered
+    millisecond are counted and skipped on the next poll.
+    """
+
+    def __init__(self, symbol, backend=None, store=None, poll_interval=0.25, batch_size=10000):
+        self.symbol = symbol
+        self.mt5 = backend or get_backend()
+        self.store = store
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.spread = SpreadTracker()
+        self.last_tick = None
+        self._last_msc = None
+        self._seen_at_last_msc = 0
+
+    def poll(self):
+        """Return the ticks that arrived since the previous poll (possibly empty)."""
+        if self._last_msc is None:
+            tick = self.mt5.symbol_info_tick(self.symbol)
+            if tick is None:
+                log.error("Failed to get tick data", symbol=self.symbol, error=self.mt5.last_error())
+                return None
+            date_from = tick.time
+        else:
+            date_from = self._last_msc // 1000
+        ticks = self.mt5.copy_ticks_from(
+            self.symbol, date_from, self.batch_size, self.mt5.COPY_TICKS_ALL)
+        if ticks is None:
+            log.error("Failed to fetch ticks", symbol=self.symbol, error=self.mt5.last_error())
+            return None
+        if not len(ticks):
+            return ticks
+
+        if self._last_msc is not None:
+            msc = ticks['time_msc']
+            start = int(np.searchsorted(msc, self._last_msc, side='left'))
+            same = int(np.searchsorted(msc, self._last_msc, side='right')) - start
+            skip = start + min(same, self._seen_at_last_msc)
+            ticks = ticks[skip:]
+            if not len(ticks):
+                return ticks
+
+        last_msc = int(ticks['time_msc'][-1])
+        at_last = int(np.count_nonzero(ticks['time_msc'] == last_msc))
+        self._seen_at_last_msc = at_last + (self._seen_at_last_msc if last_msc == self._last_msc else 0)
+        self._last_msc = last_msc
+        self.last_tick = ticks[-1]
+
+        for spread in (ticks['ask'] - ticks['bid']).tolist():
+            self.spread.update(spread)
+        if self.store is not None:
+            self.store.append_ticks(self.symbol, ticks)
+        return ticks
+
+    def ticks(self):
+        """Yield ticks one by one, polling whenever the current batch is exhausted."""
+        while True:
+            batch = self.poll()
+            if batch is None or not len(batch):
+                time.sleep(self.poll_interval)
+                continue
+            yield from batch
+
+
+class BarAggregator:
+    """Build bars from bid prices of incoming ticks; subclasses decide when a bar closes."""
+
+    def __init__(self, point=0.00001, history=500):
+        self.point = point
+        self.bars = deque(maxlen=history)
+        self._current = None
+
+    def _starts_new_bar(self, tick, bar):
+        raise NotImplementedError
+
+    def _bar_time(self, tick):
+        return int(tick['time_msc']) // 1000
+
+    def _is_complete(self, bar):
+        return False
+
+    def update(self, tick):
+        """Add a tick; return the bar it completed, if any."""
+        completed = None
+        bar = self._current
+        if bar is not None and self._starts_new_bar(tick, bar):
+            completed = self._close()
+            bar = None
+
+        bid = float(tick['bid'])
+        if bar is None:
+            self._current = bar = [self._bar_time(tick), bid, bid, bid, bid, 0,
+                                   int(round((tick['ask'] - tick['bid']) / self.point)), 0]
+        bar[2] = max(bar[2], bid)
+        bar[3] = min(bar[3], bid)
+        bar[4] = bid
+        bar[5] += 1
+        bar[7] += int(tick['volume'])
+
+        if self._is_complete(bar):
+            completed = self._close()
+        return completed
+
+    def _close(self):
+        bar = np.array(tuple(self._current), dtype=BAR_DTYPE)
+        self.bars.append(bar)
+        self._current = None
+        return bar
+
+    def frame(self, include_forming=False):
+        """Completed bars (plus the forming one) as a DataFrame like ``fetch_rates``."""
+        rows = list(self.bars)
+        if include_forming and self._current is not None:
+            rows.append(np.array(tuple(self._current), dtype=BAR_DTYPE))
+        df = pd.DataFrame(np.array(rows, dtype=BAR_DTYPE))
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        return df
+
+
+class TimeBarAggregator(BarAggregator):
+    """Fixed-duration bars, e.g. 15-second bars; a bar closes when a tick lands in the next slot."""
+
+    def __init__(self, seconds, point=0.00001, history=500):
+        super().__init__(point, history)
+        self.milliseconds = int(seconds * 1000)
+
+    def _bar_time(self, tick):
+        return int(tick['time_msc']) // self.milliseconds * self.milliseconds // 1000
+
+    def _starts_new_bar(self, tick, bar):
+        return self._bar_time(tick) != bar[0]
+
+
+class TickCountBarAggregator(BarAggregator):
+    """Bars of exactly ``count`` ticks."""
+
+    def __init__(self, count, point=0.00001, history=500):
+        super().__init__(point, history)
+        self.count = count
+
+    def _starts_new_bar(self, tick, bar):
+        return False
+
+    def _is_complete(self, bar):
+        return bar[5] >= self.count
+
+
+class RangeBarAggregator(BarAggregator):
+    """Bars that close once their high-low range reaches ``range_points``."""
+
+    def __init__(self, range_points, point=0.00001, history=500):
+        super().__init__(point, history)
+        self.size = range_points * point
+
+    def _starts_new_bar(self, tick, bar):
+        return False
+
+    def _is_complete(self, bar):
+        return bar[2] - bar[3] >= self.size - self.point / 2
+
+
+def aggregate(ticks, aggregator):
+    """Generator stage turning a tick iterator into completed bars.
+
+    For example, 15-second bars for a scalper::
+
+        bars = TimeBarAggregator(15)
+        for bar in aggregate(TickStream("EURUSD_i").ticks(), bars):
+            buy_signal, sell_signal = strategy.generate_signals(bars.frame())
+    """
+    for tick in ticks:
+        bar = aggregator.update(tick)
+        if bar is not None:
+            yield bar
@@ -0,0 +1,238 @@
+import numpy as np
+
+from core.bars import values_of
+from core.data import BarBuffer, MarketData, timeframe_seconds
+
+
+def resample_rates(rates, timeframe):
+    """Aggregate MT5 rates into ``timeframe`` bars (open, max high, min low, last close).
+
+    Volumes are summed and the spread is the one of the first bar, as MT5
+    reports it at the bar open. Input bars must be in time order.
+    """
+    if not len(rates):
+        return np.zeros(0, dtype=rates.dtype)
+    period = timeframe_seconds(timeframe)
+    buckets = rates['time'] // period * period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    bars = np.zeros(len(starts), dtype=rates.dtype)
+    bars['time'] = buckets[starts]
+    bars['open'] = rates['open'][starts]
+    bars['high'] = np.maximum.reduceat(rates['high'], starts)
+    bars['low'] = np.minimum.reduceat(rates['low'], starts)
+    bars['close'] = rates['close'][np.r_[starts[1:], len(rates)] - 1]
+    bars['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    bars['spread'] = rates['spread'][starts]
+    bars['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return bars
+
+
+def align_index(base_times, base_timeframe, times, timeframe):
+    """Index of the last ``timeframe`` bar closed when each base bar closed (-1 if none).
+
+    Times are bar open times in epoch seconds. A higher bar is only visible
+    once its close is at or before the base bar's close, so values looked up
+    with this index never come from the future.
+    """
+    base_close = np.asarray(base_times, dtype=np.int64) + timeframe_seconds(base_timeframe)
+    closes = np.asarray(times, dtype=np.int64) + timeframe_seconds(timeframe)
+    return np.searchsorted(closes, base_close, side='right') - 1
+
+
+def _merge_into(bar, prior, overlapping=False):
+    # bar and prior are one-row arrays of the same bucket; prior holds the earlier base bars
+    bar['open'] = prior['open']
+    bar['high'] = np.maximum(bar['high'], prior['high'])
+    bar['low'] = np.minimum(bar['low'], prior['low'])
+    bar['spread'] = prior['spread']
+    for field in ('tick_volume', 'real_volume'):
+        # High/low are exact when base bars overlap prior, volumes can only be bounded
+        bar[field] = np.maximum(bar[field], prior[field]) if overlapping else bar[field] + prior[field]
+
+
+class TimeframeResampler:
+    """Bars of a higher timeframe kept up to date from base (e.g. M1) bars.
+
+    ``update`` takes the latest base window, including the bar still forming.
+    Only base bars from the last one seen onwards are aggregated: the higher
+    bar in progress is rebuilt from the running aggregate of its earlier base
+    bars plus the new ones, so a cycle costs a few bars, not a ``resample`` of
+    the window. After a gap (or on the first call) the window is aggregated
+    at once; a first bucket that starts before the window is completed from
+    a previously stored bar (e.g. seeded from the terminal) or dropped.
+    """
+
+    def __init__(self, timeframe, capacity=500):
+        self.timeframe = timeframe
+        self.period = timeframe_seconds(timeframe)
+        self.capacity = capacity
+        self.buffer = None
+        # Aggregate of the current bucket's base bars before the last one (one-row array)
+        self._partial = None
+        # Last base bar seen, which may still be forming
+        self._last = None
+
+    def __len__(self):
+        return len(self.buffer) if self.buffer is not None else 0
+
+    @property
+    def last_base_time(self):
+        return int(self._last['time'][0]) if self._last is not None else None
+
+    def seed(self, rates):
+        """Start from closed bars fetched directly in this timeframe."""
+        self.buffer = BarBuffer(self.capacity, rates.dtype)
+        self.buffer.reset(rates)
+        self._partial = self._last = None
+
+    def has_gap(self, rates):
+        """True if base bars are missing between the last update and ``rates``."""
+        last_time = self.last_base_time
+        return last_time is not None and len(rates) and rates['time'][0] > last_time
+
+    def update(self, rates):
+        """Fold a base window (oldest first, forming bar last) into the higher bars."""
+        if not len(rates):
+            return
+        if self.buffer is None:
+            self.buffer = BarBuffer(self.capacity, rates.dtype)
+        times = rates['time']
+        last_time = self.last_base_time
+        if last_time is None or not times[0] <= last_time <= times[-1]:
+            self._rebuild(rates)
+            return
+        start = int(np.searchsorted(times, last_time))
+        if times[start] != last_time:
+            self._rebuild(rates)
+            return
+        # rates[start] replaces the last bar seen, so the bucket so far is the partial aggregate
+        self._merge(rates[start:], self._partial)
+
+    def _rebuild(self, rates):
+        head = int(rates['time'][0]) // self.period * self.period
+        stored = self.buffer.view()
+        prior = stored[stored['time'] == head].copy()
+        self.buffer.reset(stored[stored['time'] < head].copy())
+        overlapping = rates['time'][0] != head
+        if not overlapping or not len(prior):
+            # A stored bar only helps if the window misses the start of its bucket
+            prior = None
+            if overlapping:
+                # Without the start of the first bucket its open would be wrong; skip it
+                # unless it is the only (forming) one
+                first_full = int(np.searchsorted(rates['time'], head + self.period))
+                if first_full < len(rates):
+                    rates = rates[first_full:]
+                    overlapping = False
+        self._merge(rates, prior, overlapping)
+
+    def _merge(self, rows, prior, overlapping=False):
+        bars = resample_rates(rows, self.timeframe)
+        if prior is not None and prior['time'][0] == bars['time'][0]:
+            _merge_into(bars[:1], prior, overlapping)
+        else:
+            prior = None
+
+        if len(self.buffer) and self.buffer.last_time == bars['time'][0]:
+            self.buffer.patch_last(bars[0])
+            self.buffer.append(bars[1:])
+        else:
+            self.buffer.append(bars)
+
+        # Running aggregate of the last bucket without its last base bar
+        bucket = bars['time'][-1]
+        first = int(np.searchsorted(rows['time'], bucket))
+        partial = resample_rates(rows[first:-1], self.timeframe) if first < len(rows) - 1 else None
+        if prior is not None and len(bars) == 1:
+            if partial is None:
+                partial = prior
+            else:
+                _merge_into(partial, prior, overlapping)
+        self._partial = partial
+        self._last = rows[-1:].copy()
+
+    def bars(self, include_forming=False):
+        """Higher bars, oldest first; a view valid until the next update."""
+        if self.buffer is None:
+            return None
+        view = self.buffer.view()
+        last_time = self.last_base_time
+        if include_forming or last_time is None:
+            return view
+        # A bar is closed once a base bar has opened at or after its end
+        closed = int(np.searchsorted(view['time'] + self.period, last_time, side='right'))
+        return view[:closed]
+
+
+class MultiTimeframeData(MarketData):
+    """MarketData for a base timeframe that also maintains higher timeframes.
+
+    Each ``fetch_rates`` folds the base bars into every higher timeframe with
+    a ``TimeframeResampler``; ``frame`` returns those bars and ``align`` puts
+    their (indicator) columns next to the base bars without look-ahead. The
+    terminal is only asked for higher-timeframe bars once, to seed history
+    longer than the base window.
+    """
+
+    def __init__(self, symbol, timeframe, timeframes, buffer_size=None, backend=None, store=None,
+                 capacity=500):
+        super().__init__(symbol, timeframe, buffer_size, backend=backend, store=store)
+        self.resamplers = {tf: TimeframeResampler(tf, capacity) for tf in timeframes}
+        self._seeded = False
+
+    def _seed(self, timeframe, resampler):
+        rates = self.mt5.copy_rates_from_pos(self.symbol, timeframe, 1, resampler.capacity)
+        if rates is not None and len(rates):
+            resampler.seed(rates)
+
+    def seed(self):
+        """Load closed higher-timeframe bars from the terminal (done on the first fetch)."""
+        for timeframe, resampler in self.resamplers.items():
+            self._seed(timeframe, resampler)
+        self._seeded = True
+
+    def fetch_rates_array(self, num_bars=100, start_pos=0):
+        if not self._seeded:
+            self.seed()
+        # The forming base bar keeps the higher bar in progress current
+        rates = super().fetch_rates_array(num_bars + start_pos, 0)
+        if rates is None:
+            return None
+        window = self.buffer.view() if self.buffer is not None else rates
+        for timeframe, resampler in self.resamplers.items():
+            if resampler.has_gap(window):
+                # Bars were missed (e.g. after a disconnect); refill history from the terminal
+                self._seed(timeframe, resampler)
+            resampler.update(window)
+        return rates[:len(rates) - start_pos]
+
+    def frame(self, timeframe, include_forming=False):
+        """DataFrame of ``timeframe`` bars (closed ones unless ``include_forming``)."""
+        bars = self.resamplers[timeframe].bars(include_forming)
+        if bars is None:
+            return None
+        df = self.to_frame(bars, timeframe)
+        df.attrs['timeframe'] = timeframe
+        return df
+
+    def align(self, df, higher, columns, prefix=None):
+        """Copy ``columns`` of a ``frame`` onto base bars, from the last higher bar closed.
+
+        Base bars before the first closed higher bar get NaN. Columns are
+        named ``prefix + column``, with a prefix such as ``"tf16385_"`` by default.
+        """
+        timeframe = higher.attrs['timeframe']
+        prefix = f"tf{timeframe}_" if prefix is None else prefix
+        index = align_index(values_of(df, 'time').astype('datetime64[s]').astype(np.int64),
+                            self.timeframe,
+                            values_of(higher, 'time').astype('datetime64[s]').astype(np.int64),
+                            timeframe)
+        missing = index < 0
+        for column in columns:
+            if len(higher):
+                values = values_of(higher, column, float)[np.maximum(index, 0)]
+                values[missing] = np.nan
+            else:
+                values = np.full(len(df), np.nan)
+            df[prefix + column] = values
+        return df
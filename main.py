@@ -1,22 +1,95 @@
 import time
 from config.config import Config
+from core.broker import get_backend
 from core.connection import MT5Connection
 from core.data import MarketData
+from core.execution import ExecutionEngine
+from core.history import HistoryStore
+from core.indicators import CachedIndicators
 from core.order import OrderManager
-import MetaTrader5 as mt5
+from core.positions import PositionBook
+from core.risk import RiskEngine
+from core.scheduler import Pipeline, TradingScheduler
+from core.snapshot import SnapshotStore
+from core.symbols import SymbolCache
+from core.timeframes import MultiTimeframeData
+from core.streaming import StreamingIndicators
 from strategies.moving_average_strategy import MovingAverageStrategy
-from strategies.scalping_ema_crossover import ScalpingEMAStrategy
+from strategies.factory import build_strategy
+from utils.lazy import preload
+from utils.log import configure as configure_logging, get_logger
+from utils.metrics import Metrics
 from utils.notifications import TelegramNotifier
 
+log = get_logger("bot")
+
+
+def build_logging(config):
+    configure_logging(config.LOG_LEVEL, config.LOG_FILE, config.LOG_MAX_BYTES,
+                      config.LOG_BACKUPS, config.LOG_CONSOLE, config.LOG_JSON)
+
+
+def build_risk(config, backend, symbols):
+    """The portfolio risk engine, or None to trade a fixed LOT_SIZE."""
+    if not config.RISK_ENABLED:
+        return None
+    return RiskEngine(
+        backend,
+        symbols,
+        risk_per_trade=config.RISK_PER_TRADE,
+        max_exposure=config.MAX_CURRENCY_EXPOSURE,
+        max_margin_usage=config.MAX_MARGIN_USAGE,
+        max_correlated_lots=config.MAX_CORRELATED_LOTS,
+        correlations=config.CORRELATIONS,
+        max_positions_per_symbol=config.MAX_POSITIONS_PER_SYMBOL
+    )
+
+
+def build_snapshots(config):
+    # Only streaming indicators and buffered bars carry state worth restoring
+    if not config.SNAPSHOT_PATH or not (config.STREAMING_INDICATORS or config.RATES_BUFFER_SIZE):
+        return None
+    return SnapshotStore(config.SNAPSHOT_PATH, config.SNAPSHOT_INTERVAL, config.SNAPSHOT_MAX_AGE)
+
+
+def build_metrics(config):
+    metrics = Metrics(config.METRICS_ENABLED, config.METRICS_DUMP_INTERVAL, config.METRICS_DUMP_PATH)
+    if config.METRICS_ENABLED and config.METRICS_PORT:
+        metrics.serve(config.METRICS_PORT)
+    return metrics
+
 
 class TradingBot:
-    def __init__(self, strategy, config):
+    def __init__(self, strategy, config, backend=None):
         self.config = config
+        build_logging(config)
+        # pandas is first needed for the first bars; load it while the terminal connects
+        preload("pandas")
+        self.metrics = build_metrics(config)
+        self.mt5 = backend or get_backend()
         self.strategy = strategy
+        if self.config.STREAMING_INDICATORS:
+            self.strategy.indicators = StreamingIndicators()
+        else:
+            self.strategy.indicators = CachedIndicators(
+                self.config.INDICATOR_CACHE_SIZE, self.config.INDICATOR_ENGINE)
+        self.indicator_cache = self.strategy.indicators
         self.notifier = TelegramNotifier()
+        if self.metrics.enabled:
+            # Count and time every MT5 call, indicator and notification
+            self.mt5 = self.metrics.instrument(self.mt5)
+            self.strategy.indicators = self.metrics.instrument(
+                self.strategy.indicators, "indicators", none_is_error=False)
+            self.notifier = self.metrics.instrument(self.notifier, "telegram", none_is_error=False)
         self._initialize_connection()
         self._initialize_market_data()
         self._initialize_order_manager()
+        self.engine = ExecutionEngine(self.mt5, self.config.ORDER_MAX_ATTEMPTS)
+        self.book = PositionBook(self.config.SYMBOL, backend=self.mt5)
+        self.risk = build_risk(self.config, self.mt5, self.connection.symbols)
+        if self.risk is not None:
+            self.book.subscribe(self.risk.on_event)
+        self.snapshots = build_snapshots(self.config)
         self.no_signal_counter = 1
 
     def _initialize_connection(self):
@@ -24,15 +97,30 @@ class TradingBot:
         self.connection = MT5Connection(
             self.config.ACCOUNT_NUMBER,
             self.config.PASSWORD,
-            self.config.SERVER
+            self.config.SERVER,
+            backend=self.mt5,
+            symbols=SymbolCache(self.mt5, self.config.SYMBOL_CACHE_TTL)
         )
 
     def _initialize_market_data(self):
         """Initialize the market data object for fetching price data"""
-        self.data = MarketData(
-            self.config.SYMBOL,
-            self.config.get_timeframe()
-        )
+        if self.config.HIGHER_TIMEFRAMES:
+            self.data = MultiTimeframeData(
+                self.config.SYMBOL,
+                self.config.get_timeframe(),
+                [self.config.TIMEFRAMES[name] for name in self.config.HIGHER_TIMEFRAMES],
+                self.config.RATES_BUFFER_SIZE,
+                backend=self.mt5
+            )
+            self.strategy.data = self.data
+        else:
+            # Buffered, so each cycle only fetches new bars and a snapshot holds the window
+            self.data = MarketData(
+                self.config.SYMBOL,
+                self.config.get_timeframe(),
+                self.config.RATES_BUFFER_SIZE,
+                backend=self.mt5
+            )
 
     def _initialize_order_manager(self):
         """Initialize the order manager for placing and managing trades"""
@@ -40,17 +128,20 @@ class TradingBot:
             self.config.SYMBOL,
             self.config.LOT_SIZE,
             self.config.TP_PIPS,
-            self.config.SL_PIPS
+            self.config.SL_PIPS,
+            backend=self.mt5,
+            symbols=self.connection.symbols,
+            deviation=self.config.DEVIATION_POINTS
         )
 
-    def _format_position_details(self, position):
+    def _format_position_details(self, position, title="📊 Position Update"):
         """Format detailed position information for notifications"""
-        position_type = "⬆️ BUY" if position.type == mt5.ORDER_TYPE_BUY else "⬇️ SELL"
+        position_type = "⬆️ BUY" if position.type == self.mt5.ORDER_TYPE_BUY else "⬇️ SELL"
         time_open = time.strftime(
             '%Y-%m-%d %H:%M:%S', time.localtime(position.time))
 
         message = (
-            f"📊 Position Update for {self.config.SYMBOL}\n"
+            f"{title} for {self.config.SYMBOL}\n"
             f"🎟️ Ticket: {position.ticket}\n"
             f"📈 Type: {position_type}\n"
             f"📏 Volume: {position.volume:.2f}\n"
@@ -64,138 +155,256 @@ class TradingBot:
         )
         return message
 
+    def _format_event(self, event):
+        """Format a position book change for notifications (None for plain deals)"""
+        if event.kind == 'opened':
+            return self._format_position_details(event.position, "📂 Position Opened")
+        if event.kind == 'modified':
+            return self._format_position_details(event.position, "✏️ Position Modified")
+        if event.kind == 'closed':
+            position = event.previous
+            # The closing deal has the final price and profit; fall back to the last snapshot
+            price = event.deal.price if event.deal else position.price_current
+            profit = event.deal.profit if event.deal else position.profit
+            reason = f" ({event.deal.comment})" if event.deal and event.deal.comment else ""
+            return (
+                f"📕 Position Closed for {self.config.SYMBOL}{reason}\n"
+                f"🎟️ Ticket: {position.ticket}\n"
+                f"💰 Open Price: {position.price_open:.5f}\n"
+                f"💵 Close Price: {price:.5f}\n"
+                f"💲 Profit: {profit:.2f}"
+            )
+        return None
+
+    def _snapshot_name(self):
+        return f"{self.config.SYMBOL}/{self.strategy.get_name()}"
+
+    def _save_snapshot(self):
+        self.snapshots.capture(self._snapshot_name(), self.strategy, self.data)
+        self.snapshots.save()
+
+    def _wait(self, seconds, started):
+        """Close the loop iteration's timing, export metrics and state if due, then sleep."""
+        self.metrics.record("loop.iteration", time.perf_counter() - started)
+        self.metrics.maybe_dump()
+        if self.snapshots is not None and self.snapshots.due(self._snapshot_name()):
+            self._save_snapshot()
+        time.sleep(seconds)
+
     def run(self):
         # Notify bot startup
         startup_message = (
             f"🚀 Trading Bot Started!\n"
-            f"📈 Symbol: {self.config.SYMBOL}\n"
-            f"📏 Lot Size: {self.config.LOT_SIZE}\n"
+            f"📈 Symbol: {self.config.SYMBOL}\n" +
+            (f"📏 Risk: {self.config.RISK_PER_TRADE:.1%} of equity per trade\n" if self.risk else
+             f"📏 Lot Size: {self.config.LOT_SIZE}\n") +
             f"⏱️ Check Interval: {self.config.CHECK_INTERVAL}s\n"
             f"🎯 TP: {self.config.TP_PIPS} pips\n"
             f"🛑 SL: {self.config.SL_PIPS} pips"
         )
-        print(startup_message)
+        log.info(startup_message)
         self.notifier.send_message(startup_message)
 
         # Attempt to connect to the trading platform and ensure the symbol is available
         if not self.connection.connect() or not self.connection.ensure_symbol(self.config.SYMBOL):
             error_message = "❌ Connection failed! Please check your account credentials or symbol settings."
-            print(error_message)
+            log.error(error_message)
             self.notifier.send_message(error_message)
             return
         else:
-            print(
-                f"🤖 Trading bot started using strategy: {self.strategy.get_name()}")
+            log.info(f"🤖 Trading bot started using strategy: {self.strategy.get_name()}")
+        # Build the order templates now so a signal only has to stamp prices
+        self.order_manager.prepare()
+        # Resume the indicator state and bars of the previous run instead of warming up again
+        if self.snapshots is not None and self.snapshots.load():
+            self.snapshots.restore(self._snapshot_name(), self.strategy, self.data)
+        if self.risk is not None:
+            self.risk.prepare([self.config.SYMBOL])
+
+        if self.config.PROFILER_INTERVAL:
+            self.metrics.start_profiler(self.config.PROFILER_INTERVAL)
 
         try:
             while True:
-                # Check for open positions
-                positions = mt5.positions_get(symbol=self.config.SYMBOL)
-                if positions:
+                started = time.perf_counter()
+
+                # Report position changes since the last cycle (opens, closes, SL/TP edits)
+                for event in self.book.refresh():
+                    event_message = self._format_event(event)
+                    if event_message:
+                        log.info(event_message)
+                        self.notifier.send_message(event_message)
+
+                # Wait while a position is open (with the risk engine, its limits decide)
+                if self.risk is None and self.book.open_positions():
                     self.no_signal_counter = 1
-                    for position in positions:
-                        position_message = self._format_position_details(
-                            position=position
-                        )
-                        print(position_message)
-                        self.notifier.send_message(position_message)
-                    time.sleep(self.config.CHECK_INTERVAL)
+                    self._wait(self.config.CHECK_INTERVAL, started)
                     continue
 
                 # Fetch market data
-                df = self.data.fetch_rates()
+                with self.metrics.stage("loop.fetch_rates"):
+                    df = self.data.fetch_bars() if self.config.BAR_SERIES else self.data.fetch_rates()
                 if df is None:
-                    time.sleep(self.config.CHECK_INTERVAL)
+                    self._wait(self.config.CHECK_INTERVAL, started)
                     continue
 
                 # Generate buy/sell signals using the strategy
-                buy_signal, sell_signal = self.strategy.generate_signals(df)
+                with self.metrics.stage("loop.generate_signals"):
+                    buy_signal, sell_signal = self.strategy.generate_signals(df)
 
                 if buy_signal or sell_signal:
                     action = 'buy' if buy_signal else 'sell'
+
+                    # Place the order first; everything else is reported once it is out
+                    tick = self.data.get_tick()
+                    decision = volume = None
+                    if self.risk is not None:
+                        decision = self.risk.approve(self.config.SYMBOL, action, self.config.SL_PIPS, tick)
+                        if not decision.allowed:
+                            log.info("Order blocked by risk limits", symbol=self.config.SYMBOL,
+                                     action=action, volume=decision.volume, reason=decision.reason)
+                            self._wait(self.config.CHECK_INTERVAL, started)
+                            continue
+                        volume = decision.volume
+                    with self.metrics.stage("loop.place_order"):
+                        report = self.engine.execute(self.order_manager, action, tick, volume)
+                    if decision is not None:
+                        self.risk.settle(decision, report)
+
                     signal_message = (
                         f"📢 Signal Detected!\n"
                         f"📈 Symbol: {self.config.SYMBOL}\n"
                         f"📊 Action: {action.upper()}\n"
-                        f"💵 Current Price: {self.data.get_current_price()['bid']:.5f}\n"
+                        f"💵 Current Price: {tick.bid:.5f}\n"
                         f"⏰ Time: {time.strftime('%Y-%m-%d %H:%M:%S')}"
                     )
-                    print(signal_message)
+                    log.info(signal_message)
                     self.notifier.send_message(signal_message)
-
-                    # Place the order based on the signal
-                    result = self.order_manager.place_order(action)
-                    if result:
-                        if isinstance(result, int):
-                            success_message = (
-                                f"✅ Order Placed Successfully!\n"
-                                f"📈 {action.upper()} {self.config.SYMBOL}\n"
-                                f"🎟️ Ticket ID: {result}"
-                            )
-                        else:
-                            success_message = (
-                                f"✅ Order Placed Successfully!\n"
-                                f"📈 {action.upper()} {self.config.SYMBOL}\n"
-                                f"💵 Price: {result.price:.5f}\n"
-                                f"🎟️ Ticket ID: {result.order}"
-                            )
-                        print(success_message)
+                    self.order_manager.flush_log()
+                    if report.ticket:
+                        success_message = (
+                            f"✅ Order Placed Successfully!\n"
+                            f"📈 {action.upper()} {self.config.SYMBOL}\n"
+                            f"💵 Price: {report.fill_price:.5f}\n"
+                            f"🎟️ Ticket ID: {report.ticket}\n"
+                            f"📐 Slippage: {report.slippage_points} points\n"
+                            f"⚡ Latency: {report.latency_ms:.1f} ms ({report.attempts} attempt(s))"
+                        )
+                        log.info(success_message)
                         self.notifier.send_message(success_message)
+                        self._wait(self.config.SLEEP_AFTER_TRADE, started)
                     else:
                         error_message = (
                             f"❌ Order Placement Failed!\n"
                             f"📈 {action.upper()} {self.config.SYMBOL}\n"
-                            f"⚠️ Error: {mt5.last_error()}"
+                            f"🔢 Retcode: {report.retcode} after {report.attempts} attempt(s)\n"
+                            f"⚠️ Error: {report.error}"
                         )
-                        print(error_message)
+                        log.error(error_message)
                         self.notifier.send_message(error_message)
-
-                    time.sleep(self.config.SLEEP_AFTER_TRADE)
+                        # Nothing was opened, so look again soon instead of waiting out a trade
+                        self._wait(self.config.RETRY_AFTER_REJECT, started)
                 else:
-                    # No signal detected, notify and wait
+                    # No signal detected, notify and wait (one tick serves price and spread)
+                    tick = self.data.get_tick()
                     no_signal_message = (
                         f"🔍 No Signal Detected #{self.no_signal_counter}\n"
                         f"📌 Symbol: {self.config.SYMBOL}\n"
                         f"⏱️ Timeframe: {self.config.get_timeframe()}\n"
                         f"🕒 Time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        f"💵 Price: {self.data.get_current_price()['bid']:.5f}\n"
-                        f"📉 Spread: {self.data.get_spread():.5f}\n"
+                        f"💵 Price: {tick.bid:.5f}\n"
+                        f"📉 Spread: {self.data.get_spread(tick):.5f}\n"
                     )
-                    print(no_signal_message)
-                    self.notifier.send_message(no_signal_message)
+                    log.info(no_signal_message)
+                    self.notifier.send_message(
+                        no_signal_message, priority=TelegramNotifier.LOW)
                     self.no_signal_counter += 1
-                    time.sleep(self.config.CHECK_INTERVAL)
+                    self._wait(self.config.CHECK_INTERVAL, started)
 
         # Handle user interruption (Ctrl+C)
         except KeyboardInterrupt:
             stop_message = "🛑 Bot stopped by user. Goodbye! 👋"
-            print(stop_message)
+            log.info(stop_message)
             self.notifier.send_message(stop_message)
 
-        # Disconnect from the trading platform
+        # Disconnect from the trading platform and flush pending notifications
         finally:
+            if self.snapshots is not None:
+                self._save_snapshot()
             self.connection.disconnect()
+            self.engine.shutdown()
+            self.notifier.close()
+            self.metrics.close()
+            log.info("Metrics report", report=self.metrics.report())
+            if isinstance(self.indicator_cache, CachedIndicators):
+                log.info("Indicator cache", **self.indicator_cache.stats())
 
 
-if __name__ == "__main__":
-    # Load configuration
-    config_instance = Config()
+def build_scheduler(config):
+    """Create one scalping pipeline per configured symbol."""
+    build_logging(config)
+    preload("pandas")
+    store = HistoryStore(config.HISTORY_DIR) if config.HISTORY_DIR else None
+    metrics = build_metrics(config)
+    backend = get_backend()
+    if metrics.enabled:
+        backend = metrics.instrument(backend)
+    # One spec cache for the session, filled as the scheduler selects each symbol
+    symbols = SymbolCache(backend, config.SYMBOL_CACHE_TTL)
+    risk = build_risk(config, backend, symbols)
+    # Shared by every strategy, so one on the same symbol and bars reuses the other's series
+    indicators = CachedIndicators(config.INDICATOR_CACHE_SIZE, config.INDICATOR_ENGINE)
+    pipelines = []
+    for symbol in config.SYMBOLS:
+        strategy = build_strategy(config, symbol)
+        if config.STREAMING_INDICATORS:
+            strategy.indicators = StreamingIndicators()
+        else:
+            strategy.indicators = indicators
+        if metrics.enabled:
+            strategy.indicators = metrics.instrument(strategy.indicators, "indicators", none_is_error=False)
+        pipelines.append(Pipeline(
+            symbol,
+            config.get_timeframe(),
+            strategy,
+            config.LOT_SIZE,
+            config.TP_PIPS,
+            config.SL_PIPS,
+            buffer_size=config.RATES_BUFFER_SIZE,
+            backend=backend,
+            store=store,
+            symbols=symbols,
+            deviation=config.DEVIATION_POINTS,
+            timeframes=[config.TIMEFRAMES[name] for name in config.HIGHER_TIMEFRAMES],
+            bar_series=config.BAR_SERIES
+        ))
 
-    # Initialize the trading strategy
-    strategy_instance = ScalpingEMAStrategy(
-        symbol=config_instance.SYMBOL,
-        timeframe=config_instance.get_timeframe(),
-        short_ema_period=10,
-        long_ema_period=50,
-        rsi_period=7,
-        adx_period=14,
-        adx_threshold=25
+    connection = MT5Connection(
+        config.ACCOUNT_NUMBER,
+        config.PASSWORD,
+        config.SERVER,
+        backend=backend,
+        symbols=symbols
     )
-
-    # Create and run the trading bot
-    bot = TradingBot(
-        config=config_instance,
-        strategy=strategy_instance,
+    return TradingScheduler(
+        connection,
+        pipelines,
+        notifier=TelegramNotifier(),
+        max_workers=config.EXECUTOR_WORKERS,
+        backend=backend,
+        # Only streaming indicators have state to warm
+        warmup_bars=config.WARMUP_BARS if store and config.STREAMING_INDICATORS else 0,
+        metrics=metrics,
+        max_attempts=config.ORDER_MAX_ATTEMPTS,
+        risk=risk,
+        snapshots=build_snapshots(config)
     )
 
-    bot.run()
+
+if __name__ == "__main__":
+    # Load configuration
+    config_instance = Config()
+
+    # Run every configured symbol concurrently, waking at each bar close
+    scheduler = build_scheduler(config_instance)
+    scheduler.start()
@@ -0,0 +1,14 @@
+from strategies.scalping_ema_crossover import ScalpingEMAStrategy
+
+
+def build_strategy(config, symbol):
+    """The scalping strategy the scheduler trades, shared with utils.screen so both rank alike."""
+    return ScalpingEMAStrategy(
+        symbol=symbol,
+        timeframe=config.get_timeframe(),
+        short_ema_period=10,
+        long_ema_period=50,
+        rsi_period=7,
+        adx_period=14,
+        adx_threshold=25
+    )
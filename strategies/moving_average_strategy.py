@@ -1,5 +1,8 @@
+from core.rules import Col, SignalRules
 from core.strategy import TradingStrategy
-from core.indicators import IndicatorUtils
+from utils.log import get_logger
+
+log = get_logger("strategy")
 
 
 class MovingAverageStrategy(TradingStrategy):
@@ -8,52 +11,46 @@ class MovingAverageStrategy(TradingStrategy):
         self.short_window = short_window
         self.long_window = long_window
 
+        short_ma, long_ma = Col('short_ma'), Col('long_ma')
+        self.rules = SignalRules(
+            # Buy while the short-term MA is above the long-term MA, sell while below
+            buy=short_ma > long_ma,
+            sell=short_ma < long_ma,
+        )
+
     def calculate_indicators(self, df):
         # Calculate short-term moving average and add it to the DataFrame
-        df = IndicatorUtils.calculate_ema(
+        df = self.indicators.calculate_ema(
             df=df,
             period=self.short_window,
             column_name='short_ma'
         )
-        print(f"Short MA ({self.short_window}):")
-        print(df[['short_ma']].tail())
+        log.debug("Short MA", period=self.short_window, tail=lambda: df[['short_ma']].tail())
 
         # Calculate long-term moving average and add it to the DataFrame
-        df = IndicatorUtils.calculate_ema(
+        df = self.indicators.calculate_ema(
             df=df,
             period=self.long_window,
             column_name='long_ma'
         )
-        print(f"Long MA ({self.long_window}):")
-        print(df[['long_ma']].tail())
+        log.debug("Long MA", period=self.long_window, tail=lambda: df[['long_ma']].tail())
 
         return df
 
+    def lookback(self):
+        # An EMA keeps under 0.3% weight on bars older than three spans
+        return 3 * max(self.short_window, self.long_window)
+
     def generate_signals(self, df):
         # Calculate all required indicators
         df = self.calculate_indicators(df)
 
         # Ensure there is enough data to generate signals
         if len(df) < 1:
-            print("Not enough data to generate signals.")
+            log.info("Not enough data to generate signals.", bars=len(df))
             return False, False
 
-        # Get the last row of the DataFrame for signal generation
-        last_row = df.iloc[-1]
-
-        # Buy signal conditions:
-        # - Short-term MA crosses above long-term MA
-        buy_signal = last_row['short_ma'] > last_row['long_ma']
-        if not buy_signal:
-            print("No buy signal conditions met.")
-
-        # Sell signal conditions:
-        # - Short-term MA crosses below long-term MA
-        sell_signal = last_row['short_ma'] < last_row['long_ma']
-        if not sell_signal:
-            print("No sell signal conditions met.")
-
-        return buy_signal, sell_signal
+        return self.evaluate_rules(df)
 
     def get_name(self):
         # Return the name of the strategy
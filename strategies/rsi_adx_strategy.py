@@ -1,5 +1,8 @@
+from core.rules import Col, SignalRules
 from core.strategy import TradingStrategy
-from core.indicators import IndicatorUtils
+from utils.log import get_logger
+
+log = get_logger("strategy")
 
 
 class RSIADXStrategy(TradingStrategy):
@@ -11,60 +14,47 @@ class RSIADXStrategy(TradingStrategy):
         self.rsi_oversold = rsi_oversold
         self.adx_threshold = adx_threshold
 
+        rsi, adx = Col('rsi'), Col('adx')
+        # ADX above the threshold confirms the trend strength for either side
+        trending = adx > adx_threshold
+        self.rules = SignalRules(
+            buy=(rsi < rsi_oversold) & trending,
+            sell=(rsi > rsi_overbought) & trending,
+        )
+
     def calculate_indicators(self, df):
         # Calculate RSI and add it to the DataFrame
-        df = IndicatorUtils.calculate_rsi(
+        df = self.indicators.calculate_rsi(
             df=df,
             period=self.rsi_period,
             column_name='rsi'
         )
-        print(f"RSI ({self.rsi_period}):")
-        print(df[['rsi']].tail())
+        log.debug("RSI", period=self.rsi_period, tail=lambda: df[['rsi']].tail())
 
         # Calculate ADX and add it to the DataFrame
-        df = IndicatorUtils.calculate_adx(
+        df = self.indicators.calculate_adx(
             df=df,
             period=self.adx_period,
             column_name='adx'
         )
-        print(f"ADX ({self.adx_period}):")
-        print(df[['adx']].tail())
+        log.debug("ADX", period=self.adx_period, tail=lambda: df[['adx']].tail())
 
         return df
 
+    def lookback(self):
+        # ADX smooths twice with an EMA of its period; three spans each settle it
+        return max(self.rsi_period, 6 * self.adx_period)
+
     def generate_signals(self, df):
         # Calculate all required indicators
         df = self.calculate_indicators(df)
 
         # Ensure there is enough data to generate signals
         if len(df) < 1:
-            print("Not enough data to generate signals.")
+            log.info("Not enough data to generate signals.", bars=len(df))
             return False, False
 
-        # Get the last row of the DataFrame for signal generation
-        last_row = df.iloc[-1]
-
-        # Buy signal conditions:
-        # - RSI is below the oversold threshold
-        # - ADX is above the threshold (trend strength confirmation)
-        buy_signal = (
-            last_row['rsi'] < self.rsi_oversold
-            and last_row['adx'] > self.adx_threshold
-        )
-        if not buy_signal:
-            print("No buy signal conditions met.")
-
-        # Sell signal conditions:
-        # - RSI is above the overbought threshold
-        # - ADX is above the threshold (trend strength confirmation)
-        sell_signal = (
-            last_row['rsi'] > self.rsi_overbought
-            and last_row['adx'] > self.adx_threshold
-        )
-        if not sell_signal:
-            print("No sell signal conditions met.")
-
-        return buy_signal, sell_signal
+        return self.evaluate_rules(df)
 
     def get_name(self):
         # Return the name of the strategy
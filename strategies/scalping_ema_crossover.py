@@ -1,5 +1,9 @@
+from core.bars import values_of
+from core.rules import Col, SignalRules, crosses_above, crosses_below
 from core.strategy import TradingStrategy
-from core.indicators import IndicatorUtils
+from utils.log import get_logger
+
+log = get_logger("strategy")
 
 
 class ScalpingEMAStrategy(TradingStrategy):
@@ -11,81 +15,55 @@ class ScalpingEMAStrategy(TradingStrategy):
         self.adx_period = adx_period
         self.adx_threshold = adx_threshold
 
+        short_ema, long_ema, rsi = Col('short_ema'), Col('long_ema'), Col('rsi')
+        self.rules = SignalRules(
+            # Short EMA crosses above Long EMA, RSI > 20 (not extremely oversold)
+            buy=crosses_above(short_ema, long_ema) & (rsi > 20),
+            # Short EMA crosses below Long EMA, RSI < 80 (not extremely overbought)
+            sell=crosses_below(short_ema, long_ema) & (rsi < 80),
+        )
+
     def calculate_indicators(self, df):
         # Short EMA
-        df = IndicatorUtils.calculate_ema(
+        df = self.indicators.calculate_ema(
             df, self.short_ema_period, 'short_ema')
-        print(f"Short EMA ({self.short_ema_period}):")
-        print(df[['short_ema']].tail())
+        log.debug("Short EMA", period=self.short_ema_period, tail=lambda: df[['short_ema']].tail())
 
         # Long EMA
-        df = IndicatorUtils.calculate_ema(df, self.long_ema_period, 'long_ema')
-        print(f"Long EMA ({self.long_ema_period}):")
-        print(df[['long_ema']].tail())
+        df = self.indicators.calculate_ema(df, self.long_ema_period, 'long_ema')
+        log.debug("Long EMA", period=self.long_ema_period, tail=lambda: df[['long_ema']].tail())
 
         # RSI
-        df = IndicatorUtils.calculate_rsi(df, self.rsi_period, 'rsi')
-        print(f"RSI ({self.rsi_period}):")
-        print(df[['rsi']].tail())
+        df = self.indicators.calculate_rsi(df, self.rsi_period, 'rsi')
+        log.debug("RSI", period=self.rsi_period, tail=lambda: df[['rsi']].tail())
 
         # ADX (optional confirmation)
-        df = IndicatorUtils.calculate_adx(df, self.adx_period, 'adx')
-        print(f"ADX ({self.adx_period}):")
-        print(df[['adx']].tail())
+        df = self.indicators.calculate_adx(df, self.adx_period, 'adx')
+        log.debug("ADX", period=self.adx_period, tail=lambda: df[['adx']].tail())
 
         return df
 
+    def lookback(self):
+        # EMAs settle within about three spans; ADX smooths twice with its period
+        return max(3 * self.short_ema_period, 3 * self.long_ema_period, self.rsi_period,
+                   6 * self.adx_period)
+
     def generate_signals(self, df):
         df = self.calculate_indicators(df)
 
         if len(df) < 2:
-            print("Not enough data to generate signals.")
+            log.info("Not enough data to generate signals.", bars=len(df))
             return False, False
 
-        last_row = df.iloc[-1]
-        prev_row = df.iloc[-2]
-
-        # Buy signal:
-        # - Short EMA crosses above Long EMA
-        # - RSI > 20 (not extremely oversold)
-        # - ADX optional (if > threshold, stronger signal)
-        buy_signal = (
-            last_row['short_ema'] > last_row['long_ema']
-            and prev_row['short_ema'] <= prev_row['long_ema']
-            and last_row['rsi'] > 20
-        )
-        if buy_signal and last_row['adx'] > self.adx_threshold:
-            print("Buy signal strengthened by ADX.")
-        elif buy_signal:
-            print("Buy signal generated (ADX below threshold, but still valid).")
-        else:
-            if not (last_row['short_ema'] > last_row['long_ema']):
-                print("- Short EMA not above Long EMA.")
-            if not (prev_row['short_ema'] <= prev_row['long_ema']):
-                print("- No crossover detected.")
-            if not (last_row['rsi'] > 20):
-                print("- RSI too low (< 20).")
-
-        # Sell signal:
-        # - Short EMA crosses below Long EMA
-        # - RSI < 80 (not extremely overbought)
-        # - ADX optional (if > threshold, stronger signal)
-        sell_signal = (
-            last_row['short_ema'] < last_row['long_ema']
-            and prev_row['short_ema'] >= prev_row['long_ema']
-            and last_row['rsi'] < 80
-        )
-        if sell_signal and last_row['adx'] > self.adx_threshold:
-            print("Sell signal strengthened by ADX.")
-        elif sell_signal:
-            print("Sell signal generated (ADX below threshold, but still valid).")
-        else:
-            if not (last_row['short_ema'] < last_row['long_ema']):
-                print("- Short EMA not below Long EMA.")
-            if not (prev_row['short_ema'] >= prev_row['long_ema']):
-                print("- No crossover detected.")
-            if not (last_row['rsi'] < 80):
-                print("- RSI too high (> 80).")
+        buy_signal, sell_signal = self.evaluate_rules(df)
+
+        # ADX is optional: above the threshold it marks a stronger signal
+        if buy_signal or sell_signal:
+            side = "Buy" if buy_signal else "Sell"
+            if values_of(df, 'adx')[-1] > self.adx_threshold:
+                log.info(f"{side} signal strengthened by ADX.")
+            else:
+                log.info(f"{side} signal generated (ADX below threshold, but still valid).")
 
         return buy_signal, sell_signal
 
@@ -0,0 +1,6 @@
+import os
+
+# config.config reads the account settings when it is imported
+os.environ.setdefault("ACCOUNT_NUMBER", "0")
+os.environ.setdefault("PASSWORD", "")
+os.environ.setdefault("SERVER", "")
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from core.broker import SimulatedBroker
+from core.execution import ExecutionEngine
+from core.order import OrderManager
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def broker():
+    broker = SimulatedBroker()
+    # FOK and IOC, so an order can fall back FOK -> IOC -> RETURN
+    broker.add_symbol("EURUSD", START + np.arange(100), np.full(100, 1.1), spread_points=10,
+                      filling_mode=3)
+    broker.initialize()
+    return broker
+
+
+@pytest.fixture
+def order_manager(broker):
+    order_manager = OrderManager("EURUSD", 0.1, 10, 5, backend=broker)
+    assert order_manager.prepare()
+    return order_manager
+
+
+def test_fills_on_first_attempt(broker, order_manager):
+    report = ExecutionEngine(broker).execute(order_manager, 'buy')
+    assert report.ticket in broker.positions
+    assert report.retcode == broker.TRADE_RETCODE_DONE
+    assert report.attempts == 1
+    assert report.filling == broker.ORDER_FILLING_FOK
+    assert report.fill_price == pytest.approx(1.1001)
+    assert report.slippage_points == 0.0
+    assert report.error is None
+
+
+def test_requote_is_retried(broker, order_manager):
+    broker.queue_retcodes(broker.TRADE_RETCODE_REQUOTE, broker.TRADE_RETCODE_PRICE_CHANGED)
+    report = ExecutionEngine(broker).execute(order_manager, 'sell')
+    assert report.ticket
+    assert report.attempts == 3
+
+
+def test_retries_stop_at_max_attempts(broker, order_manager):
+    broker.queue_retcodes(*[broker.TRADE_RETCODE_REQUOTE] * 3)
+    report = ExecutionEngine(broker, max_attempts=3).execute(order_manager, 'buy')
+    assert report.ticket == 0
+    assert report.retcode == broker.TRADE_RETCODE_REQUOTE
+    assert report.attempts == 3
+    assert report.error == (broker.TRADE_RETCODE_REQUOTE, 'Scripted rejection')
+    assert not broker.positions
+
+
+def test_other_rejections_are_not_retried(broker, order_manager):
+    broker.queue_retcodes(broker.TRADE_RETCODE_NO_MONEY)
+    report = ExecutionEngine(broker).execute(order_manager, 'buy')
+    assert report.ticket == 0
+    assert report.retcode == broker.TRADE_RETCODE_NO_MONEY
+    assert report.attempts == 1
+
+
+def test_invalid_fill_falls_back_to_next_mode(broker, order_manager):
+    broker.queue_retcodes(broker.TRADE_RETCODE_INVALID_FILL)
+    symbol_info_calls = broker.calls['symbol_info']
+    report = ExecutionEngine(broker).execute(order_manager, 'buy')
+    assert report.ticket
+    assert report.attempts == 2
+    assert report.filling == broker.ORDER_FILLING_IOC
+    # The fallback handles it; the cached spec is still good
+    assert broker.calls['symbol_info'] == symbol_info_calls
+
+
+def test_fallback_stops_after_last_mode(broker, order_manager):
+    broker.queue_retcodes(*[broker.TRADE_RETCODE_INVALID_FILL] * 3)
+    report = ExecutionEngine(broker, max_attempts=5).execute(order_manager, 'buy')
+    assert report.ticket == 0
+    assert report.retcode == broker.TRADE_RETCODE_INVALID_FILL
+    assert report.attempts == 3
+    assert report.filling == broker.ORDER_FILLING_RETURN
+
+
+def test_submit_runs_on_pool(broker, order_manager):
+    engine = ExecutionEngine(broker, max_workers=2)
+    assert engine.executor is None
+    reports = engine.execute_many([(order_manager, 'buy'), (order_manager, 'sell')])
+    engine.shutdown()
+    assert [report.action for report in reports] == ['buy', 'sell']
+    assert all(report.ticket for report in reports)
+    assert engine.summary()["filled"] == 2
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from core.history import BAR_DTYPE, SECONDS_PER_DAY, TICK_DTYPE, HistoryStore
+
+M1 = 1
+DAY = 19723 * SECONDS_PER_DAY  # 2024-01-01
+
+
+def make_bars(start, count, step=60):
+    bars = np.zeros(count, dtype=BAR_DTYPE)
+    bars['time'] = start + np.arange(count) * step
+    bars['close'] = 1.1 + np.arange(count) * 1e-4
+    bars['tick_volume'] = np.arange(count) + 1
+    return bars
+
+
+def test_append_and_read_back(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = make_bars(DAY, 10)
+    assert store.append_bars("EURUSD", M1, bars) == 10
+    assert os.path.exists(tmp_path / "EURUSD" / "M1" / "2024-01-01.bars")
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1), bars)
+
+
+def test_append_skips_stored_bars(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = make_bars(DAY, 10)
+    store.append_bars("EURUSD", M1, bars[:6])
+    assert store.append_bars("EURUSD", M1, bars[3:]) == 4
+    # A new store finds the newest stored bar on disk
+    assert HistoryStore(str(tmp_path)).append_bars("EURUSD", M1, bars) == 0
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1), bars)
+
+
+def test_read_across_days(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = make_bars(DAY - 5 * 3600, 10, step=3600)
+    store.append_bars("EURUSD", M1, bars)
+    assert len(os.listdir(tmp_path / "EURUSD" / "M1")) == 2
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1), bars)
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1, count=7), bars[-7:])
+    start, end = bars['time'][2], bars['time'][8]
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1, start, end), bars[2:9])
+
+
+def test_interrupted_write_is_dropped_before_appending(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    bars = make_bars(DAY, 10)
+    store.append_bars("EURUSD", M1, bars[:5])
+    path = tmp_path / "EURUSD" / "M1" / "2024-01-01.bars"
+    # Half of the sixth record made it to disk before the process died
+    with open(path, 'ab') as f:
+        f.write(bars[5:6].tobytes()[:BAR_DTYPE.itemsize // 2])
+
+    store = HistoryStore(str(tmp_path))
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1), bars[:5])
+    assert store.append_bars("EURUSD", M1, bars) == 5
+    assert os.path.getsize(path) == 10 * BAR_DTYPE.itemsize
+    np.testing.assert_array_equal(store.read_bars("EURUSD", M1), bars)
+
+
+def test_ticks_append_by_time_msc(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    ticks = np.zeros(4, dtype=TICK_DTYPE)
+    ticks['time'] = DAY
+    ticks['time_msc'] = DAY * 1000 + np.arange(4) * 250
+    ticks['bid'] = [1.1, 1.2, 1.3, 1.4]
+    assert store.append_ticks("EURUSD", ticks[:2]) == 2
+    assert store.append_ticks("EURUSD", ticks) == 2
+    np.testing.assert_array_equal(store.read_ticks("EURUSD"), ticks)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from core.broker import SimulatedBroker
+from core.positions import PositionBook
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def broker():
+    broker = SimulatedBroker()
+    # Flat at 1.1000, then a jump that takes out any buy's take profit
+    bid = np.r_[np.full(10, 1.1), np.full(10, 1.105)]
+    broker.add_symbol("EURUSD", START + np.arange(20), bid, spread_points=10)
+    broker.add_symbol("GBPUSD", START + np.arange(20), np.full(20, 1.25), spread_points=10)
+    broker.initialize()
+    return broker
+
+
+def buy(broker, symbol="EURUSD", tp=1.102):
+    tick = broker.symbol_info_tick(symbol)
+    result = broker.order_send({
+        "action": broker.TRADE_ACTION_DEAL, "symbol": symbol, "volume": 0.1,
+        "type": broker.ORDER_TYPE_BUY, "price": tick.ask, "sl": 0.0, "tp": tp, "deviation": 10,
+        "type_filling": broker.ORDER_FILLING_FOK})
+    assert result.retcode == broker.TRADE_RETCODE_DONE
+    return result.order
+
+
+def kinds(events):
+    return [(event.kind, event.ticket) for event in events]
+
+
+def test_open_and_unchanged(broker):
+    book = PositionBook(backend=broker, since=0)
+    assert book.refresh() == []
+    ticket = buy(broker)
+    events = book.refresh()
+    assert kinds(events) == [('opened', ticket), ('deal', ticket)]
+    assert [position.ticket for position in book.open_positions("EURUSD")] == [ticket]
+    assert book.open_positions("GBPUSD") == []
+
+    deals_calls = broker.calls['history_deals_get']
+    assert book.refresh() == []
+    # Nothing changed, so history is not queried again
+    assert broker.calls['history_deals_get'] == deals_calls
+
+
+def test_modified(broker):
+    book = PositionBook(backend=broker, since=0)
+    ticket = buy(broker)
+    book.refresh()
+    position = broker.positions[ticket]
+    broker.positions[ticket] = position._replace(sl=1.09, time_update=position.time_update + 1)
+    events = book.refresh()
+    assert kinds(events) == [('modified', ticket)]
+    assert events[0].previous.sl == 0.0
+    assert events[0].position.sl == 1.09
+
+
+def test_closed_carries_closing_deal(broker):
+    book = PositionBook(backend=broker, since=0)
+    seen = []
+    book.subscribe(seen.append)
+    ticket = buy(broker)
+    book.refresh()
+    broker.advance(10)
+    events = book.refresh()
+    closed = [event for event in events if event.kind == 'closed']
+    assert [event.ticket for event in closed] == [ticket]
+    assert closed[0].previous.ticket == ticket
+    assert closed[0].deal.entry == broker.DEAL_ENTRY_OUT
+    assert closed[0].deal.profit == pytest.approx((1.105 - 1.1001) * 0.1 * 100000)
+    assert [event.kind for event in seen] == ['opened', 'deal', 'closed', 'deal']
+    assert book.open_positions() == []
+
+
+def test_symbol_filter(broker):
+    book = PositionBook(symbol="GBPUSD", backend=broker, since=0)
+    buy(broker, "EURUSD")
+    ticket = buy(broker, "GBPUSD", tp=0.0)
+    assert kinds(book.refresh()) == [('opened', ticket), ('deal', ticket)]
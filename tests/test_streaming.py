@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from core.indicators import IndicatorUtils
+from core.streaming import StreamingIndicators
+from utils.benchmark import make_frame, make_rates
+
+INDICATORS = [
+    ("ema", (10,)),
+    ("sma", (20,)),
+    ("rsi", (14,)),
+    ("adx", (14,)),
+    ("macd", ()),
+]
+
+
+def kernel_columns(df, name, args):
+    result = getattr(IndicatorUtils, f"calculate_{name}")(df.copy(), *args, engine="numpy")
+    return {column: result[column].to_numpy() for column in result.columns if column not in df.columns}
+
+
+def assert_columns_match(df, expected):
+    for column, values in expected.items():
+        np.testing.assert_allclose(np.asarray(df[column], dtype=float), values, rtol=1e-9, atol=1e-9,
+                                   err_msg=column)
+
+
+@pytest.mark.parametrize("name, args", INDICATORS)
+def test_whole_frame_matches_kernels(name, args):
+    df = make_frame(make_rates(300, 1))
+    streamed = getattr(StreamingIndicators(), f"calculate_{name}")(df.copy(), *args)
+    assert_columns_match(streamed, kernel_columns(df, name, args))
+
+
+@pytest.mark.parametrize("name, args", INDICATORS)
+def test_sliding_window_with_forming_bar_matches_kernels(name, args):
+    df = make_frame(make_rates(400, 2))
+    indicators = StreamingIndicators()
+    calculate = getattr(indicators, f"calculate_{name}")
+    for end in range(100, len(df) + 1, 9):
+        window = df.iloc[end - 100:end].reset_index(drop=True)
+        # The live loop first sees the last bar while it is still forming
+        forming = window.copy()
+        forming.loc[len(forming) - 1, ['high', 'close']] += 5e-5
+        calculate(forming, *args)
+        streamed = calculate(window.copy(), *args)
+        expected = kernel_columns(df.iloc[:end], name, args)
+        assert_columns_match(streamed, {column: values[-100:] for column, values in expected.items()})
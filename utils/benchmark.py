@@ -0,0 +1,287 @@
+"""Benchmark suite for the indicator, strategy, data and order paths, with regression tracking.
+
+Run from the repository root:
+
+    python -m utils.benchmark                       # run, write benchmark.json, compare
+    python -m utils.benchmark --save-baseline       # run and store the result as the baseline
+    python -m utils.benchmark --sizes 100 1000 --filter indicators
+    python -m utils.benchmark --filter screener --screen-symbols 500
+
+Every case is timed several times on synthetic bars and the fastest run is
+kept. When a baseline file exists, cases slower than ``--tolerance`` times
+their baseline (and by more than ``--min-delta-ms``) are listed and the run
+exits with status 1. Baselines are machine specific; save one per machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.broker import SimulatedBroker
+from core.data import MarketData
+from core.indicators import CachedIndicators, IndicatorUtils
+from core.order import OrderManager
+from core.screener import MarketScreener
+from strategies.moving_average_strategy import MovingAverageStrategy
+from strategies.rsi_adx_strategy import RSIADXStrategy
+from strategies.scalping_ema_crossover import ScalpingEMAStrategy
+
+SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+ENGINES = ("pandas", "numpy")
+SYMBOL = "EURUSD_i"
+TIMEFRAME_M1 = 1
+RATES_DTYPE = [('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+               ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')]
+
+
+def make_rates(n, seed=0):
+    """M1 bars shaped like ``copy_rates_from_pos`` output, from a seeded random walk."""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-4, n)).round(5)
+    rates = np.zeros(n, dtype=RATES_DTYPE)
+    rates['time'] = 1_700_000_000 + 60 * np.arange(n)
+    rates['open'] = np.r_[close[:1], close[:-1]]
+    rates['high'] = np.maximum(rates['open'], close) + rng.uniform(0, 2e-4, n).round(5)
+    rates['low'] = np.minimum(rates['open'], close) - rng.uniform(0, 2e-4, n).round(5)
+    rates['close'] = close
+    rates['tick_volume'] = rng.integers(1, 100, n)
+    rates['spread'] = 8
+    return rates
+
+
+def make_frame(rates):
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+def make_broker(n):
+    """SimulatedBroker with one tick per minute, so M1 requests see ``n`` bars."""
+    broker = SimulatedBroker(balance=1e12)
+    times = 1_700_000_000 + 60 * np.arange(n)
+    bids = 1.1 + np.cumsum(np.random.default_rng(0).normal(0, 1e-5, n)).round(5)
+    broker.add_symbol(SYMBOL, times, bids, spread_points=8, trade_stops_level=20)
+    broker.initialize()
+    broker.advance(n - 1)
+    return broker
+
+
+def timeit(run, setup=None, min_repeats=3, max_repeats=50, budget=0.5):
+    """Fastest and median wall time (ms) of ``run(setup())``; setup is not timed."""
+    samples = []
+    spent = 0.0
+    while len(samples) < max_repeats and (len(samples) < min_repeats or spent < budget):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(argument)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+    samples.sort()
+    return {"min_ms": samples[0] * 1000, "median_ms": samples[len(samples) // 2] * 1000,
+            "repeats": len(samples)}
+
+
+def indicator_cases(engine):
+    return {
+        "ema": lambda df: IndicatorUtils.calculate_ema(df, 14, engine=engine),
+        "sma": lambda df: IndicatorUtils.calculate_sma(df, 14, engine=engine),
+        "rsi": lambda df: IndicatorUtils.calculate_rsi(df, 14, engine=engine),
+        "macd": lambda df: IndicatorUtils.calculate_macd(df, engine=engine),
+        "adx": lambda df: IndicatorUtils.calculate_adx(df, 14, engine=engine),
+    }
+
+
+def strategy_cases():
+    return {
+        "moving_average": MovingAverageStrategy(SYMBOL, TIMEFRAME_M1, 10, 50),
+        "rsi_adx": RSIADXStrategy(SYMBOL, TIMEFRAME_M1, 14, 14, 70, 30, 25),
+        "scalping_ema": ScalpingEMAStrategy(SYMBOL, TIMEFRAME_M1),
+    }
+
+
+def bench_indicators(sizes, results):
+    for n in sizes:
+        df = make_frame(make_rates(n))
+        for engine in ENGINES:
+            for name, call in indicator_cases(engine).items():
+                results[f"indicators.{name}[{engine}]/{n}"] = timeit(call, df.copy)
+
+
+def bench_strategies(sizes, results):
+    for n in sizes:
+        df = make_frame(make_rates(n))
+        for name, strategy in strategy_cases().items():
+            results[f"strategies.{name}.generate_signals/{n}"] = timeit(
+                strategy.generate_signals, df.copy)
+
+
+def bench_fetch_rates(sizes, results):
+    for n in sizes:
+        data = MarketData(SYMBOL, TIMEFRAME_M1, backend=make_broker(n))
+        results[f"data.fetch_rates/{n}"] = timeit(lambda _: data.fetch_rates(n))
+        results[f"data.fetch_bars/{n}"] = timeit(lambda _: data.fetch_bars(n))
+        # The DataFrame construction alone, from rates already in memory
+        rates = data.mt5.copy_rates_from_pos(SYMBOL, TIMEFRAME_M1, 0, n)
+        results[f"data.fetch_rates.frame/{n}"] = timeit(lambda _: make_frame(rates))
+
+
+def bench_cycle(sizes, results):
+    """Fetch plus generate_signals with the numpy engine, on a DataFrame and on a BarSeries."""
+    for n in sizes:
+        data = MarketData(SYMBOL, TIMEFRAME_M1, backend=make_broker(n))
+        for name, strategy in strategy_cases().items():
+            strategy.indicators = CachedIndicators(0, "numpy")
+            results[f"cycle.{name}[frame]/{n}"] = timeit(
+                lambda _: strategy.generate_signals(data.fetch_rates(n)))
+            results[f"cycle.{name}[bars]/{n}"] = timeit(
+                lambda _: strategy.generate_signals(data.fetch_bars(n)))
+
+
+def bench_orders(orders, results):
+    broker = make_broker(1000)
+    manager = OrderManager(SYMBOL, 0.01, 10, 5, backend=broker)
+    manager.prepare()
+    actions = ('buy', 'sell')
+
+    def place(_):
+        for i in range(orders):
+            manager.place_order(actions[i & 1])
+            # Keep the simulated margin check from growing with every open position
+            broker.positions.clear()
+
+    timing = timeit(place)
+    # Reported per order so the figure does not depend on --orders
+    results["orders.place_order"] = {
+        "min_ms": timing["min_ms"] / orders, "median_ms": timing["median_ms"] / orders,
+        "repeats": timing["repeats"]}
+
+
+def bench_screener(symbols, results, bars=100):
+    """One full scan of ``symbols`` simulated symbols, fetch included."""
+    broker = SimulatedBroker()
+    for seed in range(symbols):
+        times, prices = broker.ticks_from_rates(make_rates(bars + 1, seed))
+        broker.add_symbol(f"SYM{seed:04d}", times, prices, spread_points=8 + seed % 20)
+    broker.initialize()
+    broker.advance(len(broker._timeline) - 2)
+    for engine in ENGINES:
+        strategy = ScalpingEMAStrategy(SYMBOL, TIMEFRAME_M1)
+        strategy.indicators = CachedIndicators(0, engine)
+        screener = MarketScreener(strategy, TIMEFRAME_M1, bars, backend=broker)
+        results[f"screener.scan[{engine}]/{symbols}"] = timeit(lambda _: screener.scan())
+        screener.shutdown()
+
+
+GROUPS = {
+    "indicators": bench_indicators,
+    "strategies": bench_strategies,
+    "fetch_rates": bench_fetch_rates,
+    "cycle": bench_cycle,
+}
+
+
+def run(sizes, groups, orders, screen_symbols=200):
+    results = {}
+    for group in groups:
+        if group == "orders":
+            bench_orders(orders, results)
+        elif group == "screener":
+            bench_screener(screen_symbols, results)
+        else:
+            GROUPS[group](sizes, results)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Return (case, baseline_ms, current_ms) for every case slower than allowed."""
+    regressions = []
+    for case, current in report["results"].items():
+        previous = baseline["results"].get(case)
+        if previous is None:
+            continue
+        before, after = previous["min_ms"], current["min_ms"]
+        if after > before * tolerance and after - before > min_delta_ms:
+            regressions.append((case, before, after))
+    return regressions
+
+
+def print_report(report, baseline):
+    print(f"{'case':<52}{'min ms':>12}{'median ms':>12}{'vs base':>9}")
+    for case, timing in report["results"].items():
+        previous = baseline["results"].get(case) if baseline else None
+        ratio = f"{timing['min_ms'] / previous['min_ms']:>8.2f}x" if previous else f"{'-':>9}"
+        print(f"{case:<52}{timing['min_ms']:>12.3f}{timing['median_ms']:>12.3f}{ratio}")
+
+
+def write_json(path, data):
+    # Atomic replace, so an interrupted run never leaves a truncated file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="bar counts to benchmark")
+    parser.add_argument("--filter", nargs="+", choices=[*GROUPS, "orders", "screener"],
+                        default=[*GROUPS, "orders", "screener"], help="groups to run")
+    parser.add_argument("--orders", type=int, default=1000, help="orders per place_order run")
+    parser.add_argument("--screen-symbols", type=int, default=200,
+                        help="symbols in the simulated universe the screener scans")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown factor before a case counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="ignore slowdowns smaller than this, which are mostly timer noise")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.filter, args.orders, args.screen_symbols)
+    write_json(args.output, report)
+
+    if args.save_baseline:
+        write_json(args.baseline, report)
+        print_report(report, None)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"Results written to {args.output}")
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION: {len(regressions)} case(s) slower than "
+              f"{args.tolerance:.2f}x the baseline")
+        for case, before, after in regressions:
+            print(f"  {case}: {before:.3f} ms -> {after:.3f} ms ({after / before:.2f}x)")
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
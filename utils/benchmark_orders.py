@@ -0,0 +1,95 @@
+"""Micro-benchmark of signal-to-order_send latency against the in-process SimulatedBroker.
+
+Run from the repository root: python -m utils.benchmark_orders [orders]
+"""
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+
+from core.broker import SimulatedBroker
+from core.order import OrderManager
+from utils.metrics import LatencyHistogram
+
+
+def make_broker(ticks=1000):
+    broker = SimulatedBroker(balance=1e12)
+    times = 1_700_000_000 + np.arange(ticks)
+    bids = 1.1 + np.cumsum(np.random.default_rng(0).normal(0, 1e-5, ticks)).round(5)
+    broker.add_symbol("EURUSD_i", times, bids, spread_points=8, trade_stops_level=20)
+    broker.initialize()
+    broker.advance(1)
+    return broker
+
+
+def per_call_order(broker, manager, action):
+    """The request-building path place_order used before templates, for comparison."""
+    symbol_info = broker.symbol_info(manager.symbol)
+    tick = broker.symbol_info_tick(manager.symbol)
+    price = tick.ask if action == 'buy' else tick.bid
+    print(f"Price: {price}")
+    print(f"Point: {symbol_info.point}")
+    print(f"Minimum Stop Distance: {symbol_info.trade_stops_level * symbol_info.point}")
+    tp_price, sl_price = manager.calculate_stops(
+        action, price, symbol_info.point, manager.tp_pips, manager.sl_pips,
+        symbol_info.trade_stops_level)
+    print(f"Calculated TP: {tp_price}, SL: {sl_price}")
+    request = {
+        "action": broker.TRADE_ACTION_DEAL,
+        "symbol": manager.symbol,
+        "volume": manager.lot_size,
+        "type": broker.ORDER_TYPE_BUY if action == 'buy' else broker.ORDER_TYPE_SELL,
+        "price": price,
+        "sl": sl_price,
+        "tp": tp_price,
+        "deviation": 50,
+        "magic": 123456,
+        "comment": f"{action.capitalize()} Order",
+        "type_time": broker.ORDER_TIME_GTC,
+        "type_filling": broker.ORDER_FILLING_FOK
+    }
+    result = broker.order_send(request)
+    print(f"{action.capitalize()} order placed: Ticket #{result.order}")
+    return result.order
+
+
+def measure(name, broker, send, orders, flush=None):
+    histogram = LatencyHistogram()
+    actions = ('buy', 'sell')
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(orders):
+            start = time.perf_counter()
+            send(actions[i & 1])
+            histogram.record(time.perf_counter() - start)
+            # Keep the simulated margin check from growing with every open position
+            broker.positions.clear()
+        # Deferred order logs are written outside the timed section, as in the bot
+        if flush is not None:
+            flush()
+    stats = histogram.summary()
+    print(f"{name:<28}{stats['p50_ms'] * 1000:>10.1f}{stats['p99_ms'] * 1000:>10.1f}"
+          f"{stats['mean_ms'] * 1000:>10.1f}")
+
+
+def main(orders=20000):
+    print(f"{orders} orders, latency in microseconds (p50/p99 are bucket upper bounds)")
+    print(f"{'path':<28}{'p50':>10}{'p99':>10}{'mean':>10}")
+
+    broker = make_broker()
+    manager = OrderManager("EURUSD_i", 0.01, 10, 5, backend=broker)
+    measure("per-call request", broker, lambda action: per_call_order(broker, manager, action), orders)
+
+    broker = make_broker()
+    manager = OrderManager("EURUSD_i", 0.01, 10, 5, backend=broker)
+    manager.prepare()
+    measure("submit (fetches tick)", broker, manager.submit, orders, manager.flush_log)
+
+    tick = broker.symbol_info_tick("EURUSD_i")
+    measure("submit (tick supplied)", broker, lambda action: manager.submit(action, tick),
+            orders, manager.flush_log)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,97 @@
+"""Compare the NumPy indicator kernels with the pandas implementations and time both.
+
+Run from the repository root: python -m utils.check_kernels
+Exits with status 1 if any series differs by more than the tolerance.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.indicators import IndicatorUtils
+
+SIZES = (1, 2, 13, 14, 15, 100, 1000, 10000, 100000)
+PERIODS = (7, 14, 50)
+# Relative to the magnitude of each series; RSI divides two rolling means
+TOLERANCE = 1e-8
+
+
+def make_rates(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-4, n)).round(5)
+    high = close + rng.uniform(0, 2e-4, n).round(5)
+    low = close - rng.uniform(0, 2e-4, n).round(5)
+    if n > 50:
+        # A flat stretch exercises the equal-window rule of rolling means
+        close[20:40] = high[20:40] = low[20:40] = close[20]
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close})
+
+
+def indicator_calls(period):
+    return {
+        f"ema({period})": lambda df, engine: IndicatorUtils.calculate_ema(df, period, engine=engine),
+        f"sma({period})": lambda df, engine: IndicatorUtils.calculate_sma(df, period, engine=engine),
+        f"rsi({period})": lambda df, engine: IndicatorUtils.calculate_rsi(df, period, engine=engine),
+        f"adx({period})": lambda df, engine: IndicatorUtils.calculate_adx(df, period, engine=engine),
+    }
+
+
+def compare(df, call):
+    expected = call(df.copy(), "pandas")
+    actual = call(df.copy(), "numpy")
+    worst = 0.0
+    for column in expected.columns.difference(df.columns):
+        a = expected[column].to_numpy()
+        b = actual[column].to_numpy()
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            return np.inf
+        mask = ~np.isnan(a)
+        if mask.any():
+            scale = max(1.0, np.abs(a[mask]).max())
+            worst = max(worst, np.abs(a[mask] - b[mask]).max() / scale)
+    return worst
+
+
+def timed(df, call, engine, repeat=20):
+    best = np.inf
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        call(frame, engine)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    failures = 0
+    for n in SIZES:
+        df = make_rates(n)
+        calls = {"macd": lambda frame, engine: IndicatorUtils.calculate_macd(frame, engine=engine)}
+        for period in PERIODS:
+            calls.update(indicator_calls(period))
+        for name, call in calls.items():
+            error = compare(df, call)
+            if error > TOLERANCE:
+                failures += 1
+                print(f"MISMATCH {name} on {n} bars: relative error {error:.3g}")
+
+    print(f"{'indicator':<12}{'bars':>8}{'pandas us':>12}{'numpy us':>12}{'speedup':>9}")
+    for n in (100, 1000, 100000):
+        df = make_rates(n)
+        calls = {"macd": lambda frame, engine: IndicatorUtils.calculate_macd(frame, engine=engine)}
+        calls.update(indicator_calls(14))
+        for name, call in calls.items():
+            pandas_us = timed(df, call, "pandas")
+            numpy_us = timed(df, call, "numpy")
+            print(f"{name:<12}{n:>8}{pandas_us:>12.1f}{numpy_us:>12.1f}{pandas_us / numpy_us:>8.1f}x")
+
+    if failures:
+        print(f"{failures} mismatches")
+        return 1
+    print("all kernels match pandas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
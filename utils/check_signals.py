@@ -0,0 +1,72 @@
+"""Check that the batch signal APIs agree with the live per-bar generate_signals.
+
+Run from the repository root: python -m utils.check_signals [bars]
+For every strategy, generate_signals is replayed on each prefix of the data
+(as the live loop sees it, bar by bar) and compared with
+generate_signal_arrays and generate_signal_batch. Exits with status 1 on
+any difference.
+"""
+import sys
+import time
+
+import numpy as np
+
+from strategies.moving_average_strategy import MovingAverageStrategy
+from strategies.rsi_adx_strategy import RSIADXStrategy
+from strategies.scalping_ema_crossover import ScalpingEMAStrategy
+from utils.benchmark import make_frame, make_rates
+
+SYMBOLS = ("EURUSD_i", "GBPUSD_i", "USDJPY_i")
+
+
+def strategies():
+    return [
+        MovingAverageStrategy("EURUSD_i", 1, 10, 50),
+        RSIADXStrategy("EURUSD_i", 1, 14, 14, 60, 40, 20),
+        ScalpingEMAStrategy("EURUSD_i", 1, 5, 20, 7, 14, 20),
+    ]
+
+
+def live_mismatches(strategy, df, buy, sell):
+    """Bars where generate_signals on the data up to that bar disagrees with the arrays."""
+    bad = []
+    for end in range(1, len(df) + 1):
+        live = strategy.generate_signals(df.iloc[:end].copy())
+        if (bool(live[0]), bool(live[1])) != (bool(buy[end - 1]), bool(sell[end - 1])):
+            bad.append(end - 1)
+    return bad
+
+
+def main(bars=200):
+    failures = 0
+    frames = {symbol: make_frame(make_rates(bars, seed)) for seed, symbol in enumerate(SYMBOLS)}
+    for strategy in strategies():
+        name = strategy.get_name()
+        arrays = {symbol: strategy.generate_signal_arrays(df.copy()) for symbol, df in frames.items()}
+        start = time.perf_counter()
+        batch = strategy.generate_signal_batch({symbol: df.copy() for symbol, df in frames.items()})
+        batch_ms = (time.perf_counter() - start) * 1000
+        live = {symbol: live_mismatches(strategy, df, *arrays[symbol])
+                for symbol, df in frames.items()}
+
+        for symbol in SYMBOLS:
+            buy, sell = arrays[symbol]
+            if not (np.array_equal(buy, batch[symbol][0]) and np.array_equal(sell, batch[symbol][1])):
+                failures += 1
+                print(f"MISMATCH {name} {symbol}: generate_signal_batch differs from generate_signal_arrays")
+            if live[symbol]:
+                failures += 1
+                print(f"MISMATCH {name} {symbol}: live signal differs on bars {live[symbol][:10]}")
+        signals = sum(int(buy.sum() + sell.sum()) for buy, sell in arrays.values())
+        print(f"{name:<30}{signals:>6} signals over {len(SYMBOLS)} x {bars} bars, "
+              f"batch {batch_ms:.1f} ms")
+
+    if failures:
+        print(f"{failures} mismatches")
+        return 1
+    print("batch signals match the live per-bar signals")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,38 @@
+"""Deferred imports for modules that are slow to load (pandas, requests).
+
+``pd = lazy_import("pandas")`` binds a placeholder that imports the module
+on first attribute access, so importing the bot does not pay for it up
+front. ``preload`` imports modules on a background thread, letting the load
+overlap with connecting to the terminal.
+"""
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported the first time an attribute is used."""
+
+    def _load(self):
+        module = importlib.import_module(self.__name__)
+        # Copy the module's namespace so later lookups never reach __getattr__
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def preload(*names):
+    """Import ``names`` on a daemon thread; returns the thread."""
+    def load():
+        for name in names:
+            importlib.import_module(name)
+
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,162 @@
+"""Structured, level-gated logging written by a background thread.
+
+Messages carry keyword fields (``log.info("Order placed", ticket=42)``). A
+call below the configured level returns before anything is formatted, and
+fields given as callables (``tail=lambda: df.tail()``) are only evaluated
+and rendered when the level is enabled. Enabled records are queued; a listener thread
+formats them and writes a size-rotated file and, optionally, the console.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+ROOT = "bot"
+
+# Field values passed to the writer thread as they are
+_SCALARS = (bool, int, float, str, type(None))
+
+
+class StructuredLogger:
+    """Thin wrapper over a stdlib logger that takes message fields as keywords."""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(f"{ROOT}.{name}")
+
+    def enabled(self, level):
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level, message, fields, exc_info=None):
+        if not self._logger.isEnabledFor(level):
+            return
+        # Rendered here, while the data they look at is still current: what they
+        # return may be a view (e.g. BarSeries.tail) that the next fetch overwrites
+        # before the writer thread formats the record
+        for key, value in fields.items():
+            if callable(value):
+                value = value()
+                fields[key] = value if isinstance(value, _SCALARS) else str(value)
+        self._logger.log(level, message, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, message, **fields):
+        self._log(DEBUG, message, fields)
+
+    def info(self, message, **fields):
+        self._log(INFO, message, fields)
+
+    def warning(self, message, **fields):
+        self._log(WARNING, message, fields)
+
+    def error(self, message, **fields):
+        self._log(ERROR, message, fields)
+
+    def exception(self, message, **fields):
+        self._log(ERROR, message, fields, exc_info=True)
+
+
+def get_logger(name):
+    return StructuredLogger(name)
+
+
+class TextFormatter(logging.Formatter):
+    """``time level logger: message key=value ...``; multi-line values follow on their own lines."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        blocks = []
+        for key, value in getattr(record, "fields", {}).items():
+            text = str(value)
+            if "\n" in text:
+                blocks.append(f"{key}:\n{text}")
+            else:
+                line += f" {key}={text}"
+        return "\n".join([line] + blocks)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, fields at the top level."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = value if isinstance(value, _SCALARS) else str(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock handler formats in the calling thread; leave that to the listener
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_handler = None
+
+
+def configure(level="INFO", path=None, max_bytes=10_000_000, backups=5, console=True,
+              json_file=False):
+    """Route every ``get_logger`` logger through one background writer.
+
+    ``path`` is the rotating log file (None for console only). Calling it
+    again replaces the previous configuration.
+    """
+    global _listener, _handler
+    shutdown()
+
+    handlers = []
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if json_file else TextFormatter())
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(TextFormatter())
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    _handler = _DeferredQueueHandler(records)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.addHandler(_handler)
+    root.propagate = False
+    return _listener
+
+
+def shutdown():
+    """Write out queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger(ROOT).removeHandler(_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = _handler = None
+
+
+atexit.register(shutdown)
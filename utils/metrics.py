@@ -0,0 +1,313 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.log import get_logger
+
+log = get_logger("metrics")
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from 1 µs to ~100 s (ten per decade).
+
+    Recording is a bisect over ~80 bounds, so it costs well under a
+    microsecond; percentiles are read from the bucket counts and are accurate
+    to the bucket width (~26%), while min, max and mean are exact. Not
+    thread-safe on its own; ``Metrics`` records and reads under its lock.
+    """
+
+    BOUNDS = [10 ** (exponent / 10) * 1e-6 for exponent in range(81)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q``-th percentile, capped at the max."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.BOUNDS[index] if index < len(self.BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """Milliseconds, which is the unit the rest of the bot reports latency in."""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "min_ms": self.min * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Instrumented:
+    """Proxy that times every method call on ``target`` and counts calls and errors.
+
+    Wrap the broker backend to get per-function MT5 call counts, latency and
+    failures (MT5 signals an error by returning None), or an indicator
+    provider to see where indicator time goes. Constants pass through untouched.
+    """
+
+    def __init__(self, target, metrics, prefix, none_is_error=True):
+        self._target = target
+        self._metrics = metrics
+        self._prefix = prefix
+        self._none_is_error = none_is_error
+        self._wrappers = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute) or name.startswith('_') or isinstance(attribute, type):
+            return attribute
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            wrapper = self._wrappers[name] = self._wrap(name)
+        return wrapper
+
+    def _wrap(self, name):
+        metrics = self._metrics
+        key = f"{self._prefix}.{name}"
+        target = self._target
+        # shutdown() returns None even when it succeeds
+        none_is_error = self._none_is_error and name != 'shutdown'
+
+        def call(*args, **kwargs):
+            if not metrics.enabled:
+                return getattr(target, name)(*args, **kwargs)
+            metrics.increment(key + ".calls")
+            start = time.perf_counter()
+            try:
+                result = getattr(target, name)(*args, **kwargs)
+            except Exception:
+                metrics.increment(key + ".errors")
+                raise
+            finally:
+                metrics.record(key, time.perf_counter() - start)
+            if result is None and none_is_error:
+                metrics.increment(key + ".errors")
+            return result
+
+        return call
+
+
+class SamplingProfiler:
+    """Periodically sample one thread's stack and count where it is.
+
+    Runs in a daemon thread, so the profiled loop pays nothing beyond the
+    GIL hand-off of each sample. ``report`` lists the hottest functions, both
+    as the innermost frame (self time) and anywhere on the stack (total time).
+    """
+
+    def __init__(self, interval=0.005, thread_id=None, max_depth=64):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.max_depth = max_depth
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[self._label(frame)] += 1
+            seen = set()
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                seen.add(self._label(frame))
+                frame = frame.f_back
+                depth += 1
+            self.total_counts.update(seen)
+
+    def report(self, top=15):
+        if not self.samples:
+            return {"samples": 0}
+        def share(counts):
+            return [{"function": label, "percent": count / self.samples * 100}
+                    for label, count in counts.most_common(top)]
+        return {"samples": self.samples, "self": share(self.self_counts),
+                "total": share(self.total_counts)}
+
+
+class Metrics:
+    """Per-stage latency histograms and counters for the trading loop.
+
+    Time a stage with ``with metrics.stage("fetch_rates"): ...``, wrap the
+    broker backend with ``instrument`` and call ``maybe_dump`` once per loop
+    iteration to write a JSON snapshot every ``dump_interval`` seconds.
+    ``serve`` exposes the same snapshot over HTTP.
+    """
+
+    def __init__(self, enabled=True, dump_interval=None, dump_path=None):
+        self.enabled = enabled
+        self.dump_interval = dump_interval
+        self.dump_path = dump_path
+        self.histograms = {}
+        self.counters = Counter()
+        self.profiler = None
+        self.started = time.time()
+        self._last_dump = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def record(self, name, seconds):
+        # Pool threads record and increment while snapshot() reads on the HTTP thread
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def instrument(self, target, prefix="mt5", none_is_error=True):
+        return Instrumented(target, self, prefix, none_is_error)
+
+    def start_profiler(self, interval=0.005, thread_id=None):
+        """Sample the calling thread (or ``thread_id``) until ``stop_profiler``."""
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval, thread_id)
+            self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+            counters = dict(sorted(self.counters.items()))
+        snapshot = {
+            "uptime_s": time.time() - self.started,
+            "stages": stages,
+            "counters": counters,
+        }
+        if self.profiler is not None:
+            snapshot["profile"] = self.profiler.report()
+        return snapshot
+
+    def report(self):
+        """Human-readable table of the stage latencies and counters."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<32}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, stats in snapshot["stages"].items():
+            if stats["count"]:
+                lines.append(f"{name:<32}{stats['count']:>8}{stats['p50_ms']:>10.3f}"
+                             f"{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}")
+        for name, value in snapshot["counters"].items():
+            lines.append(f"{name:<32}{value:>8}")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        if path is None:
+            log.info("Metrics\n" + self.report())
+            return
+        # Write then rename so readers never see a half-written file
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temporary, path)
+
+    def maybe_dump(self):
+        """Dump if ``dump_interval`` seconds have passed since the last dump."""
+        if self.dump_interval and time.monotonic() - self._last_dump >= self.dump_interval:
+            self._last_dump = time.monotonic()
+            try:
+                self.dump()
+            except OSError as e:
+                log.error("Failed to dump metrics", path=self.dump_path, error=e)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the snapshot as JSON on ``http://host:port/`` from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(metrics.snapshot(), indent=2).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def close(self):
+        self.stop_profiler()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.dump_interval:
+            try:
+                self.dump()
+            except OSError as e:
+                log.error("Failed to dump metrics", path=self.dump_path, error=e)
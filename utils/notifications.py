@@ -1,30 +1,156 @@
-import requests
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from collections import deque
+
+from config.env import load_env
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+requests = lazy_import("requests")
+
+log = get_logger("telegram")
 
 
 class TelegramNotifier:
-    def __init__(self):
-        load_dotenv()
+    """Send Telegram messages from a background thread.
+
+    ``send_message`` only enqueues, so a slow Telegram API never delays the
+    trading loop. HIGH priority messages (orders, errors) are sent as soon as
+    the worker is free; LOW priority status messages wait up to
+    ``batch_window`` seconds and are coalesced into a single message. Both
+    lanes are bounded; when full, the oldest message in that lane is dropped.
+    """
+
+    HIGH = 0
+    LOW = 1
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(self, api_url="https://api.telegram.org", queue_size=500, batch_window=2.0,
+                 min_interval=1.0, timeout=10, max_retries=3):
+        # No-op when Config has already loaded .env
+        load_env()
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.api_url = api_url
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.dropped = 0
+        self.sent = 0
+
+        # One pooled keep-alive connection for every request, opened by the worker
+        self.session = None
+        self._lanes = {self.HIGH: deque(maxlen=queue_size), self.LOW: deque(maxlen=queue_size)}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._last_send = 0.0
+        self._worker = None
+        if self.bot_token and self.chat_id:
+            self._worker = threading.Thread(
+                target=self._run, name="telegram-notifier", daemon=True)
+            self._worker.start()
 
-    def send_message(self, message):
-        """Send a message to the configured Telegram chat."""
+    def send_message(self, message, priority=HIGH):
+        """Queue a message for the configured Telegram chat."""
         if not self.bot_token or not self.chat_id:
-            print("Telegram bot token or chat ID not configured.")
+            log.warning("Telegram bot token or chat ID not configured.")
             return
 
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        with self._condition:
+            lane = self._lanes[priority]
+            if len(lane) == lane.maxlen:
+                self.dropped += 1
+            lane.append(message)
+            self._condition.notify()
+
+    def close(self, timeout=10):
+        """Flush queued messages and stop the worker.
+
+        Waits up to ``timeout`` seconds; a worker still draining the queue
+        after that finishes on its own and closes its session when done.
+        """
+        if self._worker is None:
+            return
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            log.warning("Telegram queue still draining at shutdown",
+                        queued=len(self._lanes[self.HIGH]) + len(self._lanes[self.LOW]))
+
+    def _next_batch(self):
+        """Block until something is due; return the text to send or None when closed."""
+        high, low = self._lanes[self.HIGH], self._lanes[self.LOW]
+        with self._condition:
+            while not high and not low:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            if high:
+                return high.popleft()
+
+            # Give more status messages a chance to arrive, unless urgent work shows up
+            deadline = time.monotonic() + self.batch_window
+            while not high and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if high:
+                return high.popleft()
+
+            parts = [low.popleft()]
+            length = len(parts[0])
+            while low and length + len(low[0]) + 2 <= self.MAX_MESSAGE_LENGTH:
+                length += len(low[0]) + 2
+                parts.append(low.popleft())
+            return "\n\n".join(parts)
+
+    def _run(self):
+        self.session = requests.Session()
+        try:
+            while True:
+                message = self._next_batch()
+                if message is None:
+                    return
+                self._post(message)
+        finally:
+            # Closed here, not in close(), so a slow drain never posts on a closed session
+            self.session.close()
+
+    def _post(self, message):
+        url = f"{self.api_url}/bot{self.bot_token}/sendMessage"
         payload = {
             "chat_id": self.chat_id,
-            "text": message,
+            "text": message[:self.MAX_MESSAGE_LENGTH],
             "parse_mode": "HTML"
         }
 
-        try:
-            response = requests.post(url, json=payload)
-            if response.status_code != 200:
-                print(f"Failed to send Telegram message: {response.text}")
-        except Exception as e:
-            print(f"Error sending Telegram message: {e}")
+        delay = 1.0
+        for _ in range(self.max_retries):
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self._last_send = time.monotonic()
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.sent += 1
+                    return
+                if response.status_code == 429:
+                    # Telegram says how long to back off
+                    retry_after = response.json().get("parameters", {}).get("retry_after", delay)
+                    time.sleep(retry_after)
+                    continue
+                if response.status_code < 500:
+                    log.error("Failed to send Telegram message", status=response.status_code,
+                              response=response.text)
+                    return
+            except Exception as e:
+                log.error("Error sending Telegram message", error=e)
+            time.sleep(delay)
+            delay *= 2
+        log.error("Giving up on Telegram message after retries.", retries=self.max_retries)
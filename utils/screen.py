@@ -0,0 +1,49 @@
+"""Scan every symbol on the account and print the best signal candidates.
+
+Run from the repository root: python -m utils.screen [group]
+The group is an MT5 symbol filter such as "*USD*,!*JPY*" (default
+Config.SCREENER_GROUP). Symbols are screened with the scheduler's scalping
+strategy (strategies.factory.build_strategy) on Config.TIMEFRAME closed bars
+and ranked by signal strength, ADX and spread.
+"""
+import sys
+
+from config.config import Config
+from core.connection import MT5Connection
+from core.indicators import CachedIndicators
+from core.screener import MarketScreener
+from strategies.factory import build_strategy
+from utils.log import configure
+
+
+def main(group=None):
+    configure(Config.LOG_LEVEL, None)
+    connection = MT5Connection(Config.ACCOUNT_NUMBER, Config.PASSWORD, Config.SERVER)
+    if not connection.connect():
+        return 1
+
+    # Same parameters as the pipelines that would trade the candidates
+    strategy = build_strategy(Config, Config.SYMBOL)
+    # Uncached: each symbol's bars are seen once per scan
+    strategy.indicators = CachedIndicators(0, Config.INDICATOR_ENGINE)
+    screener = MarketScreener(
+        strategy, Config.get_timeframe(), Config.SCREENER_BARS,
+        group=group or Config.SCREENER_GROUP, max_workers=Config.SCREENER_WORKERS,
+        max_spread_ratio=Config.SCREENER_MAX_SPREAD_RATIO)
+    try:
+        results = screener.scan()
+    finally:
+        screener.shutdown()
+        connection.disconnect()
+
+    candidates = screener.candidates(results, Config.SCREENER_TOP)
+    print(f"{'symbol':<16}{'action':<8}{'score':>8}{'adx':>8}{'spread':>8}{'spread/range':>14}")
+    for result in candidates:
+        print(f"{result.symbol:<16}{result.action:<8}{result.score:>8.3f}{result.adx:>8.1f}"
+              f"{result.spread_points:>8}{result.spread_ratio:>14.3f}")
+    print(f"{len(candidates)} candidates out of {len(results)} symbols")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else None))